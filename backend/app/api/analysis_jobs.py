@@ -0,0 +1,120 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import uuid
+import os
+from ..database import get_db
+from ..config import settings
+from ..models.analysis_job import AnalysisJob, AnalysisJobStatus
+from ..models.user import User
+from ..services.auth_service import get_current_user
+from ..services.analysis_job_service import analysis_job_queue
+from ..schemas.analysis_job import AnalysisJobResponse, AnalysisBatchResponse
+from ..utils.uploads import spool_upload
+
+router = APIRouter(prefix="/api/analysis-jobs", tags=["analysis-jobs"])
+
+
+@router.post("", response_model=AnalysisBatchResponse, status_code=202)
+async def submit_analysis_jobs(
+    files: List[UploadFile] = File(...),
+    mode: str = Form("single"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue images for AI analysis and return immediately.
+
+    Modes:
+    - single: all images show one item and are analyzed together (one job)
+    - each: every image is a separate item (one job per image, for bulk cataloging)
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if mode not in ("single", "each"):
+        raise HTTPException(status_code=400, detail="mode must be 'single' or 'each'")
+    if not analysis_job_queue.is_running():
+        raise HTTPException(status_code=503, detail="Analysis queue is not running")
+
+    batch_id = str(uuid.uuid4())
+    spool_dir = analysis_job_queue.get_spool_dir(batch_id)
+
+    # Spool uploads to disk so queued jobs survive a restart
+    image_paths = []
+    try:
+        for file in files:
+            path, _ = await spool_upload(file, settings.max_image_size_mb, spool_dir)
+            image_paths.append(path)
+    except HTTPException:
+        for path in image_paths:
+            os.remove(path)
+        os.rmdir(spool_dir)
+        raise
+
+    image_groups = [image_paths] if mode == "single" else [[path] for path in image_paths]
+    jobs = analysis_job_queue.submit(db, batch_id, image_groups)
+
+    return AnalysisBatchResponse(
+        batch_id=batch_id,
+        jobs=[AnalysisJobResponse.model_validate(job) for job in jobs]
+    )
+
+
+@router.get("", response_model=List[AnalysisJobResponse])
+async def get_analysis_jobs(
+    batch_id: Optional[str] = None,
+    status: Optional[AnalysisJobStatus] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List analysis jobs, newest first"""
+    query = db.query(AnalysisJob)
+    if batch_id:
+        query = query.filter(AnalysisJob.batch_id == batch_id)
+    if status:
+        query = query.filter(AnalysisJob.status == status)
+
+    return query.order_by(AnalysisJob.created_at.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=AnalysisJobResponse)
+async def get_analysis_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish (long polling)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get an analysis job, optionally waiting until it completes"""
+    job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+
+    if wait and job.status in (AnalysisJobStatus.PENDING, AnalysisJobStatus.RUNNING):
+        await analysis_job_queue.wait(job_id, wait)
+        db.refresh(job)
+
+    return job
+
+
+@router.delete("/{job_id}")
+async def delete_analysis_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Cancel a pending job, or remove a finished one"""
+    job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+
+    if job.status == AnalysisJobStatus.RUNNING:
+        raise HTTPException(status_code=409, detail="Job is already running")
+
+    if job.status == AnalysisJobStatus.PENDING:
+        analysis_job_queue.cancel(db, job)
+        return {"message": "Analysis job cancelled"}
+
+    db.delete(job)
+    db.commit()
+    return {"message": "Analysis job deleted"}
@@ -2,19 +2,22 @@
 Backup API endpoints.
 """
 import os
+import asyncio
 import logging
 import tempfile
-import shutil
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
 from ..models.user import User
 from ..services.auth_service import get_current_user
 from ..services.backup_service import backup_service
 from ..services.export_service import export_service
 from ..services.restore_service import restore_service
+from ..services.blob_store_service import blob_store_service
 from ..database import SessionLocal
+from ..utils.compression import compression_of, strip_compression_suffix, iter_decompressed
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +34,7 @@ async def create_backup(current_user: User = Depends(get_current_user)):
     logger.info(f"Manual backup triggered by user: {current_user.id}")
 
     try:
-        result = backup_service.create_backup()
+        result = await backup_service.create_backup_async()
         return {
             "success": True,
             "message": "Backup created successfully",
@@ -73,7 +76,10 @@ async def download_backup(
     """
     Download a specific backup file.
 
-    Validates filename to prevent path traversal attacks.
+    Compressed backups are decompressed on the fly and differential backups
+    are reassembled with their base, so the download is always a complete
+    database. Validates filename to prevent path
+    traversal attacks.
     """
     logger.info(f"Backup download requested by user {current_user.id}: {filename}")
 
@@ -87,10 +93,40 @@ async def download_backup(
             detail="Backup not found or invalid filename"
         )
 
+    if backup_service.backup_type(filename) == "full":
+        if compression_of(filename) is None:
+            return FileResponse(
+                path=filepath,
+                filename=filename,
+                media_type="application/x-sqlite3"
+            )
+
+        # Decompress on the fly; the stored file stays compressed
+        download_filename = strip_compression_suffix(filename)
+        return StreamingResponse(
+            iter_decompressed(filepath),
+            media_type="application/x-sqlite3",
+            headers={"Content-Disposition": f'attachment; filename="{download_filename}"'}
+        )
+
+    fd, snapshot_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, backup_service.materialize, filename, snapshot_path)
+    except (FileNotFoundError, ValueError) as e:
+        os.remove(snapshot_path)
+        logger.error(f"Failed to reassemble backup {filename}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to reassemble backup: {e}"
+        )
+
     return FileResponse(
-        path=filepath,
-        filename=filename,
-        media_type="application/x-sqlite3"
+        path=snapshot_path,
+        filename=os.path.splitext(strip_compression_suffix(filename))[0] + ".db",
+        media_type="application/x-sqlite3",
+        background=BackgroundTask(os.remove, snapshot_path)
     )
 
 
@@ -113,10 +149,25 @@ async def download_current_database(current_user: User = Depends(get_current_use
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     download_filename = f"homeregistry_current_{timestamp}.db"
 
+    # Serve a consistent snapshot rather than the live file (which misses the WAL)
+    fd, snapshot_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, backup_service.snapshot, snapshot_path)
+    except Exception as e:
+        os.remove(snapshot_path)
+        logger.error(f"Database snapshot failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database snapshot failed: {e}"
+        )
+
     return FileResponse(
-        path=db_path,
+        path=snapshot_path,
         filename=download_filename,
-        media_type="application/x-sqlite3"
+        media_type="application/x-sqlite3",
+        background=BackgroundTask(os.remove, snapshot_path)
     )
 
 
@@ -136,6 +187,26 @@ async def trigger_cleanup(current_user: User = Depends(get_current_user)):
     }
 
 
+@router.post("/storage-gc", status_code=202)
+async def trigger_storage_gc(current_user: User = Depends(get_current_user)):
+    """
+    Start garbage collection of stored image and document files in the background.
+
+    Deduplicates files stored before content addressing and removes files
+    no image or document references any more.
+    """
+    logger.info(f"Storage garbage collection triggered by user: {current_user.id}")
+
+    started = blob_store_service.start_gc()
+    return {"started": started, "running": blob_store_service.is_gc_running()}
+
+
+@router.get("/storage-gc")
+async def get_storage_gc_status(current_user: User = Depends(get_current_user)):
+    """Status and result of the last storage garbage collection"""
+    return {"running": blob_store_service.is_gc_running(), "last_result": blob_store_service.last_gc_result}
+
+
 @router.get("/status")
 async def get_backup_status(current_user: User = Depends(get_current_user)):
     """
@@ -152,7 +223,7 @@ async def get_backup_status(current_user: User = Depends(get_current_user)):
 @router.get("/export")
 async def export_all_data(current_user: User = Depends(get_current_user)):
     """
-    Export all data as a ZIP archive.
+    Export all data as a ZIP archive, streamed without staging on disk.
 
     Includes:
     - data.json: All structured data (items, categories, locations, properties, etc.)
@@ -162,27 +233,13 @@ async def export_all_data(current_user: User = Depends(get_current_user)):
     """
     logger.info(f"Full data export requested by user: {current_user.id}")
 
-    db = SessionLocal()
-    try:
-        zip_path = export_service.create_export_zip(db)
-
-        # Get filename from path
-        filename = os.path.basename(zip_path)
-
-        return FileResponse(
-            path=zip_path,
-            filename=filename,
-            media_type="application/zip",
-            background=None  # Don't delete file immediately
-        )
-    except Exception as e:
-        logger.error(f"Export failed: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Export failed: {e}"
-        )
-    finally:
-        db.close()
+    # Streamed as it is built; the generator opens its own database session
+    filename = export_service.get_export_filename()
+    return StreamingResponse(
+        export_service.iter_export_zip(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.post("/restore")
@@ -217,37 +274,26 @@ async def restore_from_backup(
             detail="File must be a ZIP archive"
         )
 
-    # Save uploaded file to temp location
-    temp_dir = tempfile.mkdtemp(prefix="homeregistry_upload_")
-    temp_zip_path = os.path.join(temp_dir, "upload.zip")
-
+    # The upload is already spooled to a seekable temp file; read the ZIP from it directly
+    db = SessionLocal()
     try:
-        # Write uploaded file to disk
-        with open(temp_zip_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-
-        # Perform restore
-        db = SessionLocal()
-        try:
-            result = restore_service.restore_from_zip(db, temp_zip_path, mode)
-            return {
-                "success": True,
-                "message": "Restore completed successfully",
-                "result": result
-            }
-        except ValueError as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=str(e)
-            )
-        except Exception as e:
-            logger.error(f"Restore failed: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Restore failed: {e}"
-            )
-        finally:
-            db.close()
+        loop = asyncio.get_event_loop()
+        result = await loop.run_in_executor(None, restore_service.restore_from_zip, db, file.file, mode)
+        return {
+            "success": True,
+            "message": "Restore completed successfully",
+            "result": result
+        }
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Restore failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Restore failed: {e}"
+        )
     finally:
-        # Clean up temp files
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        db.close()
@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+from collections import defaultdict
 from ..database import get_db
 from ..models.item import Item
 from ..models.category import Category
 from ..models.location import Location
 from ..models.property import Property
 from ..models.insurance_policy import InsurancePolicy
-from ..models.image import Image
-from ..models.document import Document
 from ..models.user import User
 from ..services.auth_service import get_current_user
+from ..services.dashboard_stats_service import dashboard_stats_service
+from ..services.coverage_service import coverage_service
 from .settings import get_setting_value
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
@@ -26,46 +27,38 @@ async def get_dashboard_stats(
 ):
     """Get dashboard statistics, optionally filtered by property"""
     # Base query filters
-    item_filter = Item.property_id == property_id if property_id else True
     location_filter = Location.property_id == property_id if property_id else True
 
     # Get high value threshold from settings
     high_value_threshold = get_setting_value(db, "high_value_threshold", 5000)
 
-    # Combined query for total items and total value
-    stats = db.query(
-        func.count(Item.id),
-        func.sum(Item.current_value)
-    ).filter(item_filter).first()
-    
-    total_items = stats[0] or 0
-    total_value = stats[1] or 0
+    # Materialized aggregates (maintained incrementally on item changes)
+    summary = dashboard_stats_service.get_summary(db, property_id)
 
-    # Items by category
-    items_by_category_query = db.query(
-        Category.name,
-        func.count(Item.id).label("count")
-    ).join(Item, Category.id == Item.category_id, isouter=True)
+    total_items = summary["total_items"]
+    total_value = summary["total_value"]
 
-    if property_id:
-        items_by_category_query = items_by_category_query.filter(Item.property_id == property_id)
-
-    items_by_category = items_by_category_query.group_by(Category.name).all()
+    # Items by category
+    categories = db.query(Category.id, Category.name).all()
+    category_totals = defaultdict(int)
+    for category_id, name in categories:
+        count = summary["category_counts"].get(category_id, 0)
+        if property_id and count == 0:
+            continue
+        category_totals[name] += count
 
-    category_data = [{"name": name or "Uncategorized", "count": count} for name, count in items_by_category]
+    category_data = [{"name": name or "Uncategorized", "count": count} for name, count in sorted(category_totals.items())]
 
     # Items by location
-    items_by_location_query = db.query(
-        Location.name,
-        func.count(Item.id).label("count")
-    ).join(Item, Location.id == Item.location_id, isouter=True)
-
+    locations_query = db.query(Location.id, Location.name)
     if property_id:
-        items_by_location_query = items_by_location_query.filter(Location.property_id == property_id)
+        locations_query = locations_query.filter(location_filter)
 
-    items_by_location = items_by_location_query.group_by(Location.name).all()
+    location_totals = defaultdict(int)
+    for location_id, name in locations_query.all():
+        location_totals[name] += summary["location_counts"].get(location_id, 0)
 
-    location_data = [{"name": name or "No Location", "count": count} for name, count in items_by_location]
+    location_data = [{"name": name or "No Location", "count": count} for name, count in sorted(location_totals.items())]
 
     # Recently added items (last 10)
     recent_items_query = db.query(Item)
@@ -110,84 +103,29 @@ async def get_dashboard_stats(
 
     # ============== COVERAGE GAPS ==============
 
-    # Get all item IDs that have documents
-    items_with_docs_subquery = db.query(Document.item_id).distinct()
-    # Get all item IDs that have images
-    items_with_images_subquery = db.query(Image.item_id).distinct()
-
-    # Items without documents
-    no_docs_query = db.query(Item).filter(item_filter).filter(
-        ~Item.id.in_(items_with_docs_subquery)
-    )
-    no_documents_count = no_docs_query.count()
-    no_documents_ids = [row[0] for row in no_docs_query.with_entities(Item.id).limit(50).all()]
-
-    # Items without images
-    no_images_query = db.query(Item).filter(item_filter).filter(
-        ~Item.id.in_(items_with_images_subquery)
-    )
-    no_images_count = no_images_query.count()
-    no_images_ids = [row[0] for row in no_images_query.with_entities(Item.id).limit(50).all()]
-
-    # High-value items without documentation
-    high_value_undoc_query = db.query(Item).filter(item_filter).filter(
-        Item.current_value >= high_value_threshold,
-        ~Item.id.in_(items_with_docs_subquery)
-    )
-    high_value_undoc_count = high_value_undoc_query.count()
-    high_value_undoc_ids = [row[0] for row in high_value_undoc_query.with_entities(Item.id).limit(50).all()]
-
-    # Items missing purchase info (no price OR no date)
-    no_purchase_query = db.query(Item).filter(item_filter).filter(
-        or_(
-            Item.purchase_price.is_(None),
-            Item.purchase_date.is_(None)
-        )
-    )
-    no_purchase_count = no_purchase_query.count()
-    no_purchase_ids = [row[0] for row in no_purchase_query.with_entities(Item.id).limit(50).all()]
+    # Counts and ID samples for every gap type in a single query
+    gaps = coverage_service.compute_gaps(db, property_id, high_value_threshold, sample_size=50)
 
     # Documentation score (% of items that have both images AND documents)
-    items_fully_documented = db.query(Item).filter(item_filter).filter(
-        Item.id.in_(items_with_docs_subquery),
-        Item.id.in_(items_with_images_subquery)
-    ).count()
+    items_fully_documented = summary["documented_items"]
 
     doc_score = round((items_fully_documented / total_items * 100) if total_items > 0 else 0)
 
     coverage_gaps = {
-        "no_documents": {
-            "count": no_documents_count,
-            "item_ids": no_documents_ids[:50]  # Limit to first 50 for performance
-        },
-        "no_images": {
-            "count": no_images_count,
-            "item_ids": no_images_ids[:50]
-        },
+        "no_documents": gaps["no_documents"],
+        "no_images": gaps["no_images"],
         "high_value_undocumented": {
-            "count": high_value_undoc_count,
-            "item_ids": high_value_undoc_ids[:50],
+            **gaps["high_value_undocumented"],
             "threshold": high_value_threshold
         },
-        "no_purchase_info": {
-            "count": no_purchase_count,
-            "item_ids": no_purchase_ids[:50]
-        },
+        "no_purchase_info": gaps["no_purchase_info"],
         "documentation_score": doc_score
     }
 
     # ============== INSURANCE COVERAGE ANALYSIS ==============
 
-    # Pre-calculate inventory values per property
-    prop_values_query = db.query(
-        Item.property_id,
-        func.sum(Item.current_value).label("total_value")
-    ).filter(Item.property_id.isnot(None))
-    
-    if property_id:
-        prop_values_query = prop_values_query.filter(Item.property_id == property_id)
-        
-    prop_values = {row[0]: float(row[1] or 0) for row in prop_values_query.group_by(Item.property_id).all()}
+    # Inventory values per property
+    prop_values = summary["property_values"]
 
     # Pre-calculate insurance coverage per property
     prop_coverage_query = db.query(
@@ -255,3 +193,17 @@ async def get_dashboard_stats(
         "insurance_analysis": insurance_analysis,
         "high_value_threshold": high_value_threshold
     }
+
+
+@router.post("/stats/rebuild")
+async def rebuild_dashboard_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Recompute the materialized dashboard statistics from scratch (drift correction)"""
+    result = dashboard_stats_service.rebuild(db)
+    return {
+        "success": True,
+        "message": "Dashboard statistics rebuilt",
+        "result": result
+    }
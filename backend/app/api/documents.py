@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from ..database import get_db
@@ -7,6 +7,13 @@ from ..models.user import User
 from ..services.auth_service import get_current_user
 from ..schemas.document import DocumentResponse
 from ..services.storage_service import StorageService
+from ..services.blob_store_service import blob_store_service, DOCUMENT
+from ..config import settings
+from ..utils.uploads import spool_upload
+from ..utils.file_responses import RangeFileResponse
+from ..utils.http_cache import IMMUTABLE_PRIVATE, make_etag, etag_matches, not_modified, cache_headers
+from ..services.file_lookup_cache import file_lookup_cache
+import os
 
 router = APIRouter(prefix="/api", tags=["documents"])
 
@@ -33,18 +40,23 @@ async def upload_document(
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Invalid document type: {document_type}")
 
-    # Read file content
-    content = await file.read()
+    # Stream upload to disk (size limit enforced while reading)
+    storage_service = StorageService()
+    spooled_path, _ = await spool_upload(file, settings.max_document_size_mb, storage_service.documents_path)
 
     # Save document
-    storage_service = StorageService()
-    filename, file_size = await storage_service.save_document(content, file.filename)
+    try:
+        filename, file_size, content_hash = await storage_service.save_document(spooled_path, file.filename)
+    finally:
+        if os.path.exists(spooled_path):
+            os.remove(spooled_path)
 
     # Create document record
     db_document = Document(
         item_id=item_id,
         filename=filename,
         original_filename=file.filename,
+        content_hash=content_hash,
         document_type=doc_type,
         file_size=file_size,
         mime_type=file.content_type or "application/octet-stream"
@@ -57,19 +69,50 @@ async def upload_document(
 
 
 @router.get("/documents/{document_id}", response_class=FileResponse)
-async def download_document(document_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Download a document"""
-    document = db.query(Document).filter(Document.id == document_id).first()
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+async def download_document(
+    document_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Download a document (cacheable; repeat requests with a known ETag get a 304).
+    Supports single byte-range requests so large files can be resumed or seeked.
+    """
+    entry = file_lookup_cache.get("document", document_id)
+    if entry is not None:
+        if entry.get("etag") and etag_matches(request, entry["etag"]):
+            return not_modified(entry["etag"], IMMUTABLE_PRIVATE)
+    else:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        entry = file_lookup_cache.set("document", document_id, {
+            "filename": document.filename,
+            "original_filename": document.original_filename,
+            "mime_type": document.mime_type,
+        })
 
     storage_service = StorageService()
-    filepath = storage_service.get_document_path(document.filename)
+    filepath = storage_service.get_document_path(entry["filename"])
+
+    try:
+        stat_result = os.stat(filepath)
+    except FileNotFoundError:
+        file_lookup_cache.invalidate("document", document_id)
+        raise HTTPException(status_code=404, detail="Document file not found")
 
-    return FileResponse(
+    entry["etag"] = make_etag(filepath, stat_result.st_size)
+    if etag_matches(request, entry["etag"]):
+        return not_modified(entry["etag"], IMMUTABLE_PRIVATE)
+
+    return RangeFileResponse(
         filepath,
-        filename=document.original_filename,
-        media_type=document.mime_type
+        request,
+        filename=entry["original_filename"],
+        media_type=entry["mime_type"],
+        stat_result=stat_result,
+        headers=cache_headers(entry["etag"], IMMUTABLE_PRIVATE)
     )
 
 
@@ -80,12 +123,16 @@ async def delete_document(document_id: str, db: Session = Depends(get_db), curre
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    # Delete file
-    storage_service = StorageService()
-    await storage_service.delete_document(document.filename)
+    filename = document.filename
 
     # Delete database record
     db.delete(document)
     db.commit()
+    file_lookup_cache.invalidate("document", document_id)
+
+    # Delete file once no other document shares it
+    if blob_store_service.release(DOCUMENT, filename):
+        storage_service = StorageService()
+        await storage_service.delete_document(filename)
 
     return {"message": "Document deleted successfully"}
@@ -1,16 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from typing import Optional
+import os
 from ..database import get_db
 from ..models.image import Image
 from ..models.user import User
 from ..services.auth_service import get_current_user
 from ..schemas.image import ImageResponse
-from ..services.image_service import ImageService
+from ..services.image_service import ImageService, thumbnail_filename_for
+from ..services.image_derivative_service import image_derivative_service
+from ..services.file_lookup_cache import file_lookup_cache
+from ..services.thumbnail_service import thumbnail_service
+from ..services.blob_store_service import blob_store_service, IMAGE
+from ..utils.http_cache import IMMUTABLE_PUBLIC, REVALIDATE_PUBLIC, make_etag, etag_matches, not_modified, cache_headers
 
 router = APIRouter(prefix="/api/images", tags=["images"])
 
 
+@router.post("/thumbnails/backfill", status_code=202)
+async def start_thumbnail_backfill(current_user: User = Depends(get_current_user)):
+    """Check all images and regenerate missing or misnamed thumbnails in the background"""
+    started = thumbnail_service.start_backfill()
+    return {"started": started, "running": thumbnail_service.is_running()}
+
+
+@router.get("/thumbnails/backfill")
+async def get_thumbnail_backfill_status(current_user: User = Depends(get_current_user)):
+    """Status and result of the last thumbnail backfill"""
+    return {"running": thumbnail_service.is_running(), "last_result": thumbnail_service.last_result}
+
+
 @router.delete("/{image_id}")
 async def delete_image(image_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Delete an image"""
@@ -18,14 +38,18 @@ async def delete_image(image_id: str, db: Session = Depends(get_db), current_use
     if not db_image:
         raise HTTPException(status_code=404, detail="Image not found")
 
-    # Delete file
-    image_service = ImageService()
-    thumbnail_filename = f"{db_image.filename.rsplit('.', 1)[0]}.webp"
-    await image_service.delete_image(db_image.filename, thumbnail_filename)
+    filename = db_image.filename
+    thumbnail_filename = db_image.thumbnail_filename or thumbnail_filename_for(filename)
 
     # Delete database record
     db.delete(db_image)
     db.commit()
+    file_lookup_cache.invalidate("image", image_id)
+
+    # Delete files once no other image shares them
+    if blob_store_service.release(IMAGE, filename):
+        image_service = ImageService()
+        await image_service.delete_image(filename, thumbnail_filename)
 
     return {"message": "Image deleted successfully"}
 
@@ -52,18 +76,80 @@ async def set_primary_image(image_id: str, db: Session = Depends(get_db), curren
 
 
 @router.get("/{image_id}/file")
-async def get_image_file(image_id: str, thumbnail: bool = False, db: Session = Depends(get_db)):
-    """Get image file. No auth required - image IDs are UUIDs obtained from authenticated endpoints."""
-    db_image = db.query(Image).filter(Image.id == image_id).first()
-    if not db_image:
-        raise HTTPException(status_code=404, detail="Image not found")
+async def get_image_file(
+    image_id: str,
+    request: Request,
+    thumbnail: bool = False,
+    w: Optional[int] = Query(None, ge=1, description="Desired width; rounded up to a cached size bucket, full size above the largest"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get image file. No auth required - image IDs are UUIDs obtained from authenticated endpoints.
+
+    Responses carry a strong ETag and an immutable Cache-Control; repeat
+    requests with a known ETag get a 304 straight from memory. A full image
+    still awaiting its background re-encode is served with a revalidating
+    Cache-Control instead, as its bytes are about to change.
+    """
+    if w:
+        bucket = image_derivative_service.get_bucket(w)
+        variant = f"w{bucket}" if bucket else "full"
+    else:
+        variant = "thumbnail" if thumbnail else "full"
 
-    image_service = ImageService()
+    entry = file_lookup_cache.get("image", image_id)
+    if entry is not None:
+        etag = entry["etags"].get(variant)
+        if etag and etag_matches(request, etag):
+            return not_modified(etag, IMMUTABLE_PUBLIC)
+    else:
+        db_image = db.query(Image).filter(Image.id == image_id).first()
+        if not db_image:
+            raise HTTPException(status_code=404, detail="Image not found")
+        entry = file_lookup_cache.set("image", image_id, {
+            "filename": db_image.filename,
+            "width": db_image.width,
+            "thumbnail_filename": db_image.thumbnail_filename,
+            "etags": {},
+        })
 
-    if thumbnail:
-        thumbnail_filename = f"{db_image.filename.rsplit('.', 1)[0]}.webp"
-        filepath = image_service.get_thumbnail_path(thumbnail_filename)
+    image_service = ImageService()
+    cacheable = True
+
+    if w:
+        try:
+            filepath = await image_derivative_service.get_path(entry["filename"], entry["width"], w)
+        except HTTPException:
+            # Image workers saturated - serve the full-size image instead
+            filepath = image_service.get_image_path(entry["filename"])
+            cacheable = False
+    elif thumbnail:
+        filepath = image_service.resolve_thumbnail_path(entry["filename"], entry["thumbnail_filename"])
+        if filepath is None:
+            # Not generated yet (the backfill job will create it) - serve the full image
+            filepath = image_service.get_image_path(entry["filename"])
+            cacheable = False
+    else:
+        filepath = image_service.get_image_path(entry["filename"])
+
+    if not cacheable:
+        return FileResponse(filepath, headers={"Cache-Control": "no-store"})
+
+    try:
+        stat_result = os.stat(filepath)
+    except FileNotFoundError:
+        file_lookup_cache.invalidate("image", image_id)
+        raise HTTPException(status_code=404, detail="Image file not found")
+
+    etag = make_etag(filepath, stat_result.st_size)
+    cache_control = IMMUTABLE_PUBLIC
+    if variant == "full" and image_service.is_reencode_pending(entry["filename"]):
+        # Not remembered, so the in-memory 304 path only ever answers for immutable files
+        cache_control = REVALIDATE_PUBLIC
     else:
-        filepath = image_service.get_image_path(db_image.filename)
+        entry["etags"][variant] = etag
+
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
 
-    return FileResponse(filepath)
+    return FileResponse(filepath, stat_result=stat_result, headers=cache_headers(etag, cache_control))
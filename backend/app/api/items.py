@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session, joinedload, subqueryload
-from sqlalchemy import or_
-from typing import List, Optional
-import tempfile
+from sqlalchemy import tuple_, type_coerce, String
+from typing import List, Optional, Tuple
+import base64
+import json
 import os
 from ..database import get_db
+from ..config import settings
 from ..models.item import Item
 from ..models.image import Image as ImageModel
-from ..models.document import Document
-from ..models.category import Category
 from ..models.user import User
 from ..services.auth_service import get_current_user
 from .settings import get_setting_value
@@ -19,108 +19,33 @@ from ..schemas.item import (
 from ..schemas.image import ImageResponse, ImageAnalysisResponse, AIAnalysisResult
 from ..schemas.document import DocumentResponse
 from ..services.image_service import ImageService
-from ..services.ai import ClaudeProvider, OpenAIProvider, OllamaProvider, GeminiProvider
-from ..utils.prompts import get_analysis_prompt
+from ..services.blob_store_service import blob_store_service
+from ..services.search_service import search_service
+from ..services.dashboard_stats_service import dashboard_stats_service
+from ..services.coverage_service import coverage_service
+from ..services.analysis_service import analysis_service
 from ..api.settings import get_setting_value
+from ..utils.uploads import spool_upload
 
 router = APIRouter(prefix="/api/items", tags=["items"])
 
 
-def normalize_category_name(name: str) -> str:
-    """Normalize category name for comparison"""
-    return name.lower().strip().replace("&", "and").replace("-", " ")
+def encode_item_cursor(created_at: str, item_id: str) -> str:
+    """Encode a keyset pagination position as an opaque URL-safe token"""
+    payload = json.dumps([created_at, item_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
 
 
-def get_word_stem(word: str) -> str:
-    """Simple stemming - remove common suffixes"""
-    if len(word) > 4:
-        if word.endswith('ics'):
-            return word[:-1]  # electronics -> electronic
-        if word.endswith('s') and not word.endswith('ss'):
-            return word[:-1]  # tools -> tool
-        if word.endswith('ing'):
-            return word[:-3]  # dining -> din
-        if word.endswith('ment'):
-            return word[:-4]  # equipment -> equip
-    return word
-
-
-def find_similar_category(suggested: str, existing_categories: List[Category]) -> Optional[Category]:
-    """
-    Find a similar existing category for the AI suggestion.
-    Returns the matching category if found, None if truly new.
-    """
-    suggested_normalized = normalize_category_name(suggested)
-    suggested_words = set(suggested_normalized.split())
-    suggested_stems = {get_word_stem(w) for w in suggested_words}
-
-    best_match = None
-    best_score = 0
-
-    for category in existing_categories:
-        cat_normalized = normalize_category_name(category.name)
-        cat_words = set(cat_normalized.split())
-        cat_stems = {get_word_stem(w) for w in cat_words}
-
-        # Exact match (case-insensitive)
-        if suggested_normalized == cat_normalized:
-            return category
-
-        # Check if one contains the other
-        if suggested_normalized in cat_normalized or cat_normalized in suggested_normalized:
-            return category
-
-        # Check stem overlap (handles electronics/electronic, tools/tool, etc.)
-        common_stems = suggested_stems & cat_stems
-        if common_stems:
-            # Score based on proportion of matching stems
-            score = len(common_stems) / max(len(suggested_stems), len(cat_stems))
-            if score > best_score:
-                best_score = score
-                best_match = category
-
-        # Also check word overlap
-        common_words = suggested_words & cat_words
-        if common_words:
-            score = len(common_words) / max(len(suggested_words), len(cat_words))
-            if score > best_score:
-                best_score = score
-                best_match = category
-
-    # Return match only if score is significant
-    if best_score >= 0.4:  # 40% overlap threshold
-        return best_match
-
-    return None
-
-
-def get_ai_provider(db: Session):
-    """Get configured AI provider"""
-    provider_name = get_setting_value(db, "ai_provider", "claude")
-
-    if provider_name == "claude":
-        api_key = get_setting_value(db, "claude_api_key")
-        if not api_key:
-            raise HTTPException(status_code=400, detail="Claude API key not configured")
-        return ClaudeProvider(api_key)
-    elif provider_name == "openai":
-        api_key = get_setting_value(db, "openai_api_key")
-        if not api_key:
-            raise HTTPException(status_code=400, detail="OpenAI API key not configured")
-        return OpenAIProvider(api_key)
-    elif provider_name == "gemini":
-        api_key = get_setting_value(db, "gemini_api_key")
-        if not api_key:
-            raise HTTPException(status_code=400, detail="Gemini API key not configured")
-        model_name = get_setting_value(db, "gemini_model")
-        if not model_name:
-            raise HTTPException(status_code=400, detail="Gemini model not configured. Please select a model in Settings.")
-        return GeminiProvider(api_key, model_name)
-    elif provider_name == "ollama":
-        endpoint = get_setting_value(db, "ollama_endpoint", "http://ollama:11434")
-        return OllamaProvider(endpoint)
-    else:
-        raise HTTPException(status_code=400, detail=f"Unknown AI provider: {provider_name}")
+def decode_item_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor produced by encode_item_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(created_at, str) or not isinstance(item_id, str):
+            raise ValueError("Malformed cursor")
+        return created_at, item_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
 
 
 @router.post("/analyze-images", response_model=ImageAnalysisResponse)
@@ -133,41 +58,15 @@ async def analyze_images(
     if not files:
         raise HTTPException(status_code=400, detail="No images provided")
 
-    # Fetch existing categories for the prompt
-    existing_categories = db.query(Category).all()
-    category_names = [cat.name for cat in existing_categories]
-
     temp_files = []
     try:
-        # Save images to temp files
+        # Stream images to temp files (size limit enforced while reading)
         for file in files:
-            content = await file.read()
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.filename.split('.')[-1]}")
-            temp_file.write(content)
-            temp_file.close()
-            temp_files.append(temp_file.name)
-
-        # Get AI provider and analyze with categories in prompt
-        provider = get_ai_provider(db)
-        prompt = get_analysis_prompt(category_names)
-
-        analysis_result = await provider.analyze_images(temp_files, prompt)
-
-        # Run similarity check on the suggested category
-        suggested_category = analysis_result.get("category", "")
-        category_is_new = analysis_result.get("category_is_new", False)
-
-        # Even if AI says it's not new, verify against our list
-        # Also check if AI said it's new but we have a similar one
-        similar_category = find_similar_category(suggested_category, existing_categories)
-
-        if similar_category:
-            # Found a match - use existing category name
-            analysis_result["category"] = similar_category.name
-            analysis_result["category_is_new"] = False
-        else:
-            # Truly new category
-            analysis_result["category_is_new"] = True
+            temp_file, _ = await spool_upload(file, settings.max_image_size_mb)
+            temp_files.append(temp_file)
+
+        # Analyze with existing categories in the prompt
+        analysis_result = await analysis_service.analyze_image_files(db, temp_files)
 
         # Convert to response format
         ai_result = AIAnalysisResult(**analysis_result)
@@ -179,6 +78,9 @@ async def analyze_images(
         )
 
     except Exception as e:
+        # Oversized uploads are rejected outright
+        if isinstance(e, HTTPException) and e.status_code == 413:
+            raise
         return ImageAnalysisResponse(
             success=False,
             error=str(e),
@@ -201,10 +103,27 @@ async def get_items(
     location_id: Optional[str] = None,
     condition: Optional[str] = None,
     gap_filter: Optional[str] = None,
+    pagination: str = "offset",
+    after: Optional[str] = None,
+    include_total: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all items with optional filters"""
+    """
+    Get all items with optional filters.
+
+    Pagination modes:
+    - offset (default): skip/limit pages
+    - cursor: keyset pages ordered by (created_at, id) newest first. Pass the
+      returned next_cursor as `after` to fetch the following page; the cost
+      stays constant regardless of depth. Passing `after` implies cursor mode.
+
+    Set include_total=false to skip the count query entirely.
+    """
+    if pagination not in ("offset", "cursor"):
+        raise HTTPException(status_code=400, detail="pagination must be 'offset' or 'cursor'")
+    cursor_mode = pagination == "cursor" or after is not None
+
     query = db.query(Item)
 
     # Apply filters
@@ -212,16 +131,8 @@ async def get_items(
         query = query.filter(Item.property_id == property_id)
 
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                Item.name.ilike(search_filter),
-                Item.description.ilike(search_filter),
-                Item.manufacturer.ilike(search_filter),
-                Item.model_number.ilike(search_filter),
-                Item.serial_number.ilike(search_filter)
-            )
-        )
+        # Full-text index lookup, ranked by relevance unless paging by keyset
+        query = search_service.apply_search(query, search, ranked=not cursor_mode)
 
     if category_id:
         query = query.filter(Item.category_id == category_id)
@@ -234,38 +145,44 @@ async def get_items(
 
     # Apply gap filters for documentation issues
     if gap_filter:
-        items_with_docs = db.query(Document.item_id).distinct()
-        items_with_images = db.query(ImageModel.item_id).distinct()
-
-        if gap_filter == "no_documents":
-            query = query.filter(~Item.id.in_(items_with_docs))
-        elif gap_filter == "no_images":
-            query = query.filter(~Item.id.in_(items_with_images))
-        elif gap_filter == "high_value_undocumented":
-            high_value_threshold = get_setting_value(db, "high_value_threshold", 5000)
-            query = query.filter(
-                Item.current_value >= high_value_threshold,
-                ~Item.id.in_(items_with_docs)
-            )
-        elif gap_filter == "no_purchase_info":
-            query = query.filter(
-                or_(
-                    Item.purchase_price.is_(None),
-                    Item.purchase_date.is_(None)
-                )
-            )
+        high_value_threshold = get_setting_value(db, "high_value_threshold", 5000)
+        gap_condition = coverage_service.gap_condition(gap_filter, high_value_threshold)
+        if gap_condition is not None:
+            query = query.filter(gap_condition)
 
     # Get total count
-    total = query.count()
+    total = query.count() if include_total else None
 
     # Get items with optimized relationship loading
-    items = query.options(
+    query = query.options(
         joinedload(Item.property),
         joinedload(Item.category),
         joinedload(Item.location),
         subqueryload(Item.images),
         subqueryload(Item.documents)
-    ).offset(skip).limit(limit).all()
+    )
+
+    next_cursor = None
+    if cursor_mode:
+        # Compare against the raw stored timestamp so rows written with
+        # different datetime string formats still page consistently
+        created_at_raw = type_coerce(Item.created_at, String)
+        if after:
+            after_created_at, after_id = decode_item_cursor(after)
+            query = query.filter(
+                tuple_(created_at_raw, Item.id) < tuple_(after_created_at, after_id)
+            )
+
+        # Fetch one extra row to know whether another page follows
+        items = query.order_by(Item.created_at.desc(), Item.id.desc()).limit(limit + 1).all()
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            last_created_at = db.query(created_at_raw).filter(Item.id == last.id).scalar()
+            next_cursor = encode_item_cursor(last_created_at, last.id)
+        skip = 0
+    else:
+        items = query.offset(skip).limit(limit).all()
 
     # Convert to response
     item_responses = []
@@ -282,7 +199,8 @@ async def get_items(
         items=item_responses,
         total=total,
         page=skip // limit + 1 if limit > 0 else 1,
-        page_size=limit
+        page_size=limit,
+        next_cursor=next_cursor
     )
 
 
@@ -322,10 +240,11 @@ async def batch_update_items(request: BatchUpdateRequest, db: Session = Depends(
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    # Update all matching items
-    updated_count = db.query(Item).filter(
-        Item.id.in_(request.item_ids)
-    ).update(update_data, synchronize_session=False)
+    # Update all matching items (bulk UPDATE bypasses flush events, so track stats explicitly)
+    with dashboard_stats_service.track_bulk_change(db, request.item_ids):
+        updated_count = db.query(Item).filter(
+            Item.id.in_(request.item_ids)
+        ).update(update_data, synchronize_session=False)
 
     db.commit()
 
@@ -351,6 +270,10 @@ async def batch_delete_items(request: BatchDeleteRequest, db: Session = Depends(
 
     db.commit()
 
+    # Remove stored files no other item shares
+    if deleted_ids:
+        blob_store_service.start_gc()
+
     return BatchDeleteResponse(
         deleted_count=len(deleted_ids),
         item_ids=deleted_ids
@@ -405,6 +328,9 @@ async def delete_item(item_id: str, db: Session = Depends(get_db), current_user:
     db.delete(db_item)
     db.commit()
 
+    # Remove stored files no other item shares
+    blob_store_service.start_gc()
+
     return {"message": "Item deleted successfully"}
 
 
@@ -420,14 +346,17 @@ async def add_item_image(
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    # Read file content
-    content = await file.read()
+    # Stream upload to disk (size limit enforced while reading)
+    spooled_path, _ = await spool_upload(file, settings.max_image_size_mb)
 
     # Save image
     image_service = ImageService()
-    filename, thumbnail_filename, file_size, width, height = await image_service.save_image(
-        content, file.filename
-    )
+    try:
+        filename, thumbnail_filename, file_size, width, height, content_hash = await image_service.save_image(
+            spooled_path, file.filename
+        )
+    finally:
+        os.remove(spooled_path)
 
     # Create image record
     is_primary = len(item.images) == 0  # First image is primary
@@ -435,10 +364,12 @@ async def add_item_image(
         item_id=item_id,
         filename=filename,
         original_filename=file.filename,
+        content_hash=content_hash,
         file_size=file_size,
         mime_type=file.content_type or "image/jpeg",
         width=width,
         height=height,
+        thumbnail_filename=thumbnail_filename,
         is_primary=is_primary
     )
     db.add(db_image)
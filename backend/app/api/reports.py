@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import Response
+import os
+import asyncio
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models.property import Property
-from ..models.insurance_policy import InsurancePolicy
-from ..models.item import Item
-from ..models.location import Location
+from ..models.report_job import ReportJob, ReportJobStatus
 from ..models.user import User
 from ..services.auth_service import get_current_user
 from ..services.report_service import ReportService
+from ..services.report_data_service import load_report_data
+from ..services.report_job_service import report_job_queue
+from ..schemas.report_job import ReportJobResponse
 
 router = APIRouter(prefix="/api/reports", tags=["reports"])
 
@@ -17,43 +22,117 @@ router = APIRouter(prefix="/api/reports", tags=["reports"])
 async def generate_insurance_report(property_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Generate an insurance inventory report PDF for a property."""
 
-    # Fetch property
+    # Fetch the property and everything the report shows, off the event loop
+    loop = asyncio.get_event_loop()
+    data = await loop.run_in_executor(None, load_report_data, db, property_id)
+    if not data:
+        raise HTTPException(status_code=404, detail="Property not found")
+
+    # Generate report into a temp file, streamed from disk and removed once sent
+    report_service = ReportService()
+    fd, report_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        await report_service.generate_insurance_report(data, report_path)
+    except Exception:
+        os.remove(report_path)
+        raise
+
+    # Generate filename
+    filename = report_service.get_report_filename(data.property["name"])
+
+    return FileResponse(
+        path=report_path,
+        filename=filename,
+        media_type="application/pdf",
+        background=BackgroundTask(os.remove, report_path)
+    )
+
+
+@router.post("/insurance/{property_id}/jobs", response_model=ReportJobResponse, status_code=202)
+async def create_insurance_report_job(
+    property_id: str,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue an insurance report for a property and return immediately.
+
+    When nothing in the property changed since an earlier report, that
+    report's job is returned (already completed) instead of a new one.
+    """
     property = db.query(Property).filter(Property.id == property_id).first()
     if not property:
         raise HTTPException(status_code=404, detail="Property not found")
+    if not report_job_queue.is_running():
+        raise HTTPException(status_code=503, detail="Report queue is not running")
 
-    # Fetch insurance policies for property
-    policies = db.query(InsurancePolicy).filter(
-        InsurancePolicy.property_id == property_id
-    ).all()
+    job = await report_job_queue.submit(db, property_id)
+    if job.status == ReportJobStatus.COMPLETED:
+        response.status_code = 200
+    return job
 
-    # Fetch all items for property with eager loading
-    items = db.query(Item).filter(
-        Item.property_id == property_id
-    ).all()
 
-    # Fetch locations for property
-    locations = db.query(Location).filter(
-        Location.property_id == property_id
-    ).all()
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish (long polling)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a report job, optionally waiting until it completes"""
+    job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
 
-    # Generate report
-    report_service = ReportService()
-    pdf_bytes = report_service.generate_insurance_report(
-        property=property,
-        policies=policies,
-        items=items,
-        locations=locations
-    )
+    if wait and job.status in (ReportJobStatus.PENDING, ReportJobStatus.RUNNING):
+        await report_job_queue.wait(job_id, wait)
+        db.refresh(job)
 
-    # Generate filename
-    safe_name = property.name.replace(" ", "_").replace("/", "-")
-    filename = f"insurance_report_{safe_name}.pdf"
+    return job
 
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+
+@router.get("/jobs/{job_id}/download")
+async def download_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download the PDF of a completed report job"""
+    job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    if job.status != ReportJobStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Report is {job.status.value}")
+
+    artifact_path = report_job_queue.get_artifact_path(job)
+    if not artifact_path:
+        raise HTTPException(status_code=410, detail="Report has expired")
+
+    property = db.query(Property).filter(Property.id == job.property_id).first()
+    filename = ReportService().get_report_filename(property.name) if property else "insurance_report.pdf"
+
+    return FileResponse(
+        path=artifact_path,
+        filename=filename,
+        media_type="application/pdf"
     )
+
+
+@router.delete("/jobs/{job_id}")
+async def expire_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Expire a finished report job, removing its PDF unless another job shares it"""
+    job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+
+    if job.status in (ReportJobStatus.PENDING, ReportJobStatus.RUNNING):
+        raise HTTPException(status_code=409, detail="Report is still being generated")
+
+    report_job_queue.expire(db, job)
+    return {"message": "Report job expired"}
@@ -6,7 +6,7 @@ from ..models.setting import Setting
 from ..models.user import User
 from ..services.auth_service import get_current_user
 from ..schemas.setting import SettingUpdate, SettingResponse, TestAIRequest, TestAIResponse, GeminiModel
-from ..services.ai import ClaudeProvider, OpenAIProvider, OllamaProvider, GeminiProvider
+from ..services.ai import GeminiProvider, provider_registry
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
@@ -84,6 +84,9 @@ async def update_settings(settings: SettingUpdate, db: Session = Depends(get_db)
     if settings.high_value_threshold is not None:
         set_setting_value(db, "high_value_threshold", settings.high_value_threshold)
 
+    # Rebuild providers with the new configuration on next use
+    provider_registry.invalidate()
+
     return await get_settings(db, current_user)
 
 
@@ -94,11 +97,11 @@ async def test_ai_connection(request: TestAIRequest, current_user: User = Depend
         if request.provider == "claude":
             if not request.api_key:
                 return TestAIResponse(success=False, message="API key required for Claude")
-            provider = ClaudeProvider(request.api_key)
+            provider = provider_registry.create("claude", api_key=request.api_key)
         elif request.provider == "openai":
             if not request.api_key:
                 return TestAIResponse(success=False, message="API key required for OpenAI")
-            provider = OpenAIProvider(request.api_key)
+            provider = provider_registry.create("openai", api_key=request.api_key)
         elif request.provider == "gemini":
             if not request.api_key:
                 return TestAIResponse(success=False, message="API key required for Gemini")
@@ -109,7 +112,7 @@ async def test_ai_connection(request: TestAIRequest, current_user: User = Depend
 
                 # If we successfully listed models, test with the first available model
                 if available_models:
-                    provider = GeminiProvider(request.api_key, available_models[0].name)
+                    provider = provider_registry.create("gemini", api_key=request.api_key, model_name=available_models[0].name)
                     success, message = await provider.test_connection()
                     return TestAIResponse(
                         success=success,
@@ -122,7 +125,7 @@ async def test_ai_connection(request: TestAIRequest, current_user: User = Depend
                 return TestAIResponse(success=False, message=f"Failed to list models: {str(e)}")
         elif request.provider == "ollama":
             endpoint = request.endpoint or "http://ollama:11434"
-            provider = OllamaProvider(endpoint)
+            provider = provider_registry.create("ollama", endpoint=endpoint)
         else:
             return TestAIResponse(success=False, message=f"Unknown provider: {request.provider}")
 
@@ -23,6 +23,19 @@ class Settings(BaseSettings):
     max_image_size_mb: int = 10
     max_document_size_mb: int = 50
 
+    # Image processing pool
+    image_workers: int = 2
+    image_queue_depth: int = 8  # Waiting uploads beyond the busy workers before 503
+    image_fast_encode_method: int = 2  # WebP effort on the upload path
+    image_final_encode_method: int = 6  # WebP effort for the background re-encode
+    image_background_reencode: bool = True
+    image_derivative_widths_str: str = "160,320,640,1280"
+    image_derivative_cache_mb: int = 512
+    file_lookup_cache_size: int = 10000  # Image/document IDs kept in memory for file requests
+
+    # Deduplicated file storage
+    blob_gc_grace_minutes: int = 60  # Unreferenced files younger than this are left alone
+
     # Server
     backend_host: str = "0.0.0.0"
     backend_port: int = 8000
@@ -41,6 +54,14 @@ class Settings(BaseSettings):
     backup_retention_daily: int = 7
     backup_retention_weekly: int = 4
     backup_retention_monthly: int = 12
+    backup_pages_per_step: int = 1024  # SQLite pages copied per online backup step
+    backup_step_sleep_ms: int = 10  # Pause between steps to spread out disk I/O
+    backup_max_restarts: int = 3  # Stepped copies restarted by writes before copying in one step
+    backup_incremental: bool = True  # Store only changed pages between full backups
+    backup_full_interval_hours: int = 24  # Age of the full base before a new one is taken
+    backup_diff_max_ratio: float = 0.5  # Take a full backup instead when more pages changed
+    backup_compression: str = "gzip"  # none, gzip or zstd (zstd needs the zstandard package)
+    backup_compression_level: Optional[int] = None  # Codec default when unset
 
     # Email settings (for backup failure alerts)
     email_host: str = ""
@@ -51,6 +72,29 @@ class Settings(BaseSettings):
     email_to: str = ""
     email_use_tls: bool = True
 
+    # Background AI analysis jobs
+    analysis_jobs_path: str = "/data/analysis_jobs"
+    analysis_workers: int = 4
+    analysis_provider_concurrency_str: str = "claude:4,openai:4,gemini:4,ollama:1"
+    analysis_job_retention_hours: int = 24
+    analysis_max_attempts: int = 3
+
+    # Image preprocessing before AI upload ("provider:max_edge,...")
+    ai_image_max_edge_str: str = "claude:1568,openai:2048,gemini:1536,ollama:1024"
+    ai_image_quality: int = 85
+
+    # AI analysis result cache
+    analysis_cache_enabled: bool = True
+    analysis_cache_ttl_hours: int = 720
+    analysis_cache_max_entries: int = 5000
+
+    # Insurance report rendering
+    report_workers: int = 2  # WeasyPrint processes rendering report sections
+    report_cache_path: str = "/data/report_cache"
+    report_cache_max_mb: int = 512  # Rendered sections kept for unchanged parts of later reports
+    report_job_workers: int = 1  # Reports generated at once (each renders its sections in parallel)
+    report_job_retention_hours: int = 24  # Finished report jobs and their PDFs are kept this long
+
     # Warranty alert settings
     warranty_alerts_enabled: bool = True
     warranty_alert_days_threshold: int = 30
@@ -66,11 +110,32 @@ settings = Settings()
 # Parse CORS origins
 cors_origins = [origin.strip() for origin in settings.cors_origins_str.split(',')]
 
+# Parse per-provider analysis concurrency limits ("provider:limit,...")
+analysis_provider_concurrency = {
+    name.strip(): int(limit)
+    for name, limit in (entry.split(':') for entry in settings.analysis_provider_concurrency_str.split(',') if ':' in entry)
+}
+
+# Parse per-provider max image edge for AI uploads ("provider:pixels,...")
+ai_image_max_edge = {
+    name.strip(): int(edge)
+    for name, edge in (entry.split(':') for entry in settings.ai_image_max_edge_str.split(',') if ':' in entry)
+}
+
+# Parse image derivative width buckets
+image_derivative_widths = sorted(
+    int(width) for width in settings.image_derivative_widths_str.split(',') if width.strip()
+)
+
 # Ensure directories exist
 db_dir = os.path.dirname(settings.database_url)
 if db_dir:
     os.makedirs(db_dir, exist_ok=True)
 os.makedirs(settings.images_path, exist_ok=True)
 os.makedirs(f"{settings.images_path}/thumbnails", exist_ok=True)
+os.makedirs(f"{settings.images_path}/pending", exist_ok=True)
+os.makedirs(f"{settings.images_path}/derivatives", exist_ok=True)
 os.makedirs(settings.documents_path, exist_ok=True)
 os.makedirs(settings.backup_dir, exist_ok=True)
+os.makedirs(settings.analysis_jobs_path, exist_ok=True)
+os.makedirs(settings.report_cache_path, exist_ok=True)
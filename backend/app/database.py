@@ -2,6 +2,7 @@ from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+import json
 import time
 
 # SQLite URL format
@@ -16,6 +17,9 @@ engine = create_engine(
     },
     pool_pre_ping=True,
     echo=False,
+    # Store JSON columns (e.g. item tags) as readable UTF-8 so the full-text
+    # index sees the real text rather than \uXXXX escapes
+    json_serializer=lambda obj: json.dumps(obj, ensure_ascii=False),
 )
 
 
@@ -66,6 +70,11 @@ def run_migrations():
         if 'property_id' not in columns:
             migrations.append("ALTER TABLE items ADD COLUMN property_id VARCHAR(36) REFERENCES properties(id)")
 
+        # Composite index used for keyset pagination of item listings
+        indexes = [index['name'] for index in inspector.get_indexes('items')]
+        if 'ix_items_created_at_id' not in indexes:
+            migrations.append("CREATE INDEX ix_items_created_at_id ON items (created_at, id)")
+
         # Execute migrations
         if migrations:
             with engine.connect() as conn:
@@ -74,6 +83,64 @@ def run_migrations():
                     conn.execute(text(migration))
                     conn.commit()
 
+    # Re-serialize tags written with \uXXXX escapes (before JSON was stored as
+    # UTF-8) so non-ASCII tags are searchable; the FTS triggers reindex the rows
+    if 'items' in table_names:
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT rowid, tags FROM items WHERE tags LIKE '%\\u%'"
+            )).fetchall()
+            for rowid, tags in rows:
+                conn.execute(
+                    text("UPDATE items SET tags = :tags WHERE rowid = :rowid"),
+                    {"tags": json.dumps(json.loads(tags), ensure_ascii=False), "rowid": rowid}
+                )
+            conn.commit()
+            if rows:
+                print(f"Re-encoded tags of {len(rows)} items")
+
+    # Track the stored thumbnail filename of each image
+    if 'images' in table_names:
+        columns = [col['name'] for col in inspector.get_columns('images')]
+        if 'thumbnail_filename' not in columns:
+            with engine.connect() as conn:
+                print("Running migration: ALTER TABLE images ADD COLUMN thumbnail_filename")
+                conn.execute(text("ALTER TABLE images ADD COLUMN thumbnail_filename VARCHAR(255)"))
+                conn.commit()
+
+    # Content hashes and filename indexes for the deduplicated blob store
+    for table in ('images', 'documents'):
+        if table not in table_names:
+            continue
+        columns = [col['name'] for col in inspector.get_columns(table)]
+        indexes = [index['name'] for index in inspector.get_indexes(table)]
+        migrations = []
+        if 'content_hash' not in columns:
+            migrations.append(f"ALTER TABLE {table} ADD COLUMN content_hash VARCHAR(64)")
+        if f'ix_{table}_content_hash' not in indexes:
+            migrations.append(f"CREATE INDEX ix_{table}_content_hash ON {table} (content_hash)")
+        if f'ix_{table}_filename' not in indexes:
+            migrations.append(f"CREATE INDEX ix_{table}_filename ON {table} (filename)")
+        if migrations:
+            with engine.connect() as conn:
+                for migration in migrations:
+                    print(f"Running migration: {migration}")
+                    conn.execute(text(migration))
+                    conn.commit()
+
+    # Image blobs used to be keyed by the hash of the upload rather than the
+    # stored file; forget them so garbage collection re-hashes the stored files
+    if 'stored_blobs' in table_names:
+        columns = [col['name'] for col in inspector.get_columns('stored_blobs')]
+        if 'source_hash' not in columns:
+            with engine.connect() as conn:
+                print("Running migration: ALTER TABLE stored_blobs ADD COLUMN source_hash")
+                conn.execute(text("ALTER TABLE stored_blobs ADD COLUMN source_hash VARCHAR(64)"))
+                conn.execute(text("CREATE INDEX ix_stored_blobs_source_hash ON stored_blobs (source_hash)"))
+                conn.execute(text("DELETE FROM stored_blobs WHERE kind = 'image'"))
+                conn.execute(text("UPDATE images SET content_hash = NULL"))
+                conn.commit()
+
     # Check if locations table exists and add property_id
     if 'locations' in table_names:
         columns = [col['name'] for col in inspector.get_columns('locations')]
@@ -182,3 +249,11 @@ def init_db():
     Base.metadata.create_all(bind=engine)
     run_migrations()
     seed_default_categories()
+
+    from .services.search_service import search_service
+    search_service.init_index()
+
+    # Recompute materialized dashboard stats to correct any drift from
+    # migrations or writes made outside the application
+    from .services.dashboard_stats_service import dashboard_stats_service
+    dashboard_stats_service.rebuild_all()
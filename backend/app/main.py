@@ -1,15 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from .database import init_db
 from .config import settings, cors_origins
 from .api import settings as settings_api
 from .api import locations, categories, items, images, documents, dashboard, init
-from .api import properties, insurance_policies, reports, auth, public, backup
+from .api import properties, insurance_policies, reports, auth, public, backup, analysis_jobs
 from .services.backup_scheduler import backup_scheduler
 from .services.warranty_scheduler import warranty_scheduler
+from .services.analysis_job_service import analysis_job_queue
+from .services.ai import provider_registry
+from .services.image_worker_pool import image_worker_pool
+from .services.image_service import ImageService
+from .services.thumbnail_service import thumbnail_service
+from .services.blob_store_service import blob_store_service
+from .services.report_pipeline import report_pipeline
+from .services.report_job_service import report_job_queue
+from .utils.file_responses import SelectiveGZipMiddleware
 
 
 @asynccontextmanager
@@ -18,7 +26,20 @@ async def lifespan(app: FastAPI):
     init_db()
     backup_scheduler.start()
     warranty_scheduler.start()
+    analysis_job_queue.start()
+    report_job_queue.start()
+    image_worker_pool.start()
+    ImageService().resume_pending_reencodes()
+    thumbnail_service.start_backfill(only_unrecorded=True)
+    blob_store_service.start_gc()
     yield
+    await blob_store_service.stop_gc()
+    await thumbnail_service.stop()
+    await image_worker_pool.stop()
+    await report_job_queue.stop()
+    report_pipeline.shutdown()
+    await analysis_job_queue.stop()
+    await provider_registry.close()
     warranty_scheduler.stop()
     backup_scheduler.stop()
 
@@ -38,10 +59,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Downloads take their filename from this header
+    expose_headers=["Content-Disposition"],
 )
 
-# Gzip compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Gzip compression (stored files are served as-is so Range and zero-copy responses pass through)
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=1000,
+    exclude_paths=[r"^/api/documents/[^/]+$", r"^/api/images/[^/]+/file$", r"^/api/backup/export$"],
+)
 
 # Include routers
 app.include_router(auth.router)
@@ -58,6 +85,7 @@ app.include_router(insurance_policies.router)
 app.include_router(reports.router)
 app.include_router(public.router)
 app.include_router(backup.router)
+app.include_router(analysis_jobs.router)
 
 
 @app.get("/api/health")
@@ -8,5 +8,10 @@ from .property import Property
 from .insurance_policy import InsurancePolicy
 from .user import User
 from .warranty_alert import WarrantyAlert
+from .dashboard_stat import DashboardStat
+from .analysis_job import AnalysisJob
+from .analysis_cache import AnalysisCacheEntry
+from .stored_blob import StoredBlob
+from .report_job import ReportJob
 
-__all__ = ["Location", "Category", "Item", "Image", "Document", "Setting", "Property", "InsurancePolicy", "User", "WarrantyAlert"]
+__all__ = ["Location", "Category", "Item", "Image", "Document", "Setting", "Property", "InsurancePolicy", "User", "WarrantyAlert", "DashboardStat", "AnalysisJob", "AnalysisCacheEntry", "StoredBlob", "ReportJob"]
@@ -0,0 +1,20 @@
+"""
+Model for cached AI image analysis results, keyed by image content.
+"""
+from sqlalchemy import Column, String, Integer, DateTime, JSON
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class AnalysisCacheEntry(Base):
+    """Parsed analysis result for one set of images, prompt and model."""
+    __tablename__ = "analysis_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # sha256 of images + prompt + provider/model
+    provider = Column(String(50), nullable=False)
+    model_name = Column(String(100), nullable=False, default="")
+    result = Column(JSON, nullable=False)  # AIAnalysisResult fields
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,35 @@
+"""
+Model for queued AI image analysis jobs.
+"""
+from sqlalchemy import Column, String, Text, Integer, DateTime, Enum, JSON
+from sqlalchemy.sql import func
+import uuid
+import enum
+
+from ..database import Base
+
+
+class AnalysisJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class AnalysisJob(Base):
+    """An image analysis request processed in the background."""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    batch_id = Column(String(36), nullable=False, index=True)  # Jobs submitted together
+    status = Column(Enum(AnalysisJobStatus), nullable=False, default=AnalysisJobStatus.PENDING, index=True)
+    image_paths = Column(JSON, nullable=False)  # Spooled image files awaiting analysis
+    image_count = Column(Integer, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    provider = Column(String(50), nullable=True)  # Provider that ran the analysis
+    result = Column(JSON, nullable=True)  # AIAnalysisResult fields
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,17 @@
+"""
+Model for materialized dashboard aggregates, maintained incrementally on item changes.
+"""
+from sqlalchemy import Column, String, Integer, Numeric
+
+from ..database import Base
+
+
+class DashboardStat(Base):
+    """Item count and value totals per property for one aggregate bucket."""
+    __tablename__ = "dashboard_stats"
+
+    property_id = Column(String(36), primary_key=True, default="")  # "" for items without a property
+    dimension = Column(String(20), primary_key=True)  # total | category | location | documented
+    key = Column(String(36), primary_key=True, default="")  # category/location id, "" otherwise
+    item_count = Column(Integer, nullable=False, default=0)
+    total_value = Column(Numeric(14, 2), nullable=False, default=0)
@@ -18,8 +18,9 @@ class Document(Base):
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     item_id = Column(String(36), ForeignKey("items.id", ondelete="CASCADE"), nullable=False, index=True)
-    filename = Column(String(255), nullable=False)  # Stored filename
+    filename = Column(String(255), nullable=False, index=True)  # Stored filename (shared by identical uploads)
     original_filename = Column(String(255), nullable=False)  # Original upload name
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the stored blob's content
     document_type = Column(Enum(DocumentType), nullable=False)
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String(100), nullable=False)
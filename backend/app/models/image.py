@@ -10,12 +10,14 @@ class Image(Base):
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     item_id = Column(String(36), ForeignKey("items.id", ondelete="CASCADE"), nullable=False, index=True)
-    filename = Column(String(255), nullable=False)  # Stored filename
+    filename = Column(String(255), nullable=False, index=True)  # Stored filename (shared by identical uploads)
     original_filename = Column(String(255), nullable=False)  # Original upload name
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the stored blob's content
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String(100), nullable=False)
     width = Column(Integer)
     height = Column(Integer)
+    thumbnail_filename = Column(String(255), nullable=True)  # Stored thumbnail filename
     is_primary = Column(Boolean, default=False)
     ai_analysis = Column(JSON, nullable=True)  # Stores AI response for this image
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Numeric, Integer, Date, Enum, JSON
+from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Numeric, Integer, Date, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -16,6 +16,10 @@ class ItemCondition(str, enum.Enum):
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # Keyset pagination order for item listings
+        Index("ix_items_created_at_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(255), nullable=False, index=True)
@@ -0,0 +1,33 @@
+"""
+Model for background insurance report generation jobs.
+"""
+from sqlalchemy import Column, String, Text, Integer, DateTime, Enum
+from sqlalchemy.sql import func
+import uuid
+import enum
+
+from ..database import Base
+
+
+class ReportJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ReportJob(Base):
+    """An insurance report rendered in the background and kept for download."""
+    __tablename__ = "report_jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    property_id = Column(String(36), nullable=False, index=True)
+    status = Column(Enum(ReportJobStatus), nullable=False, default=ReportJobStatus.PENDING, index=True)
+    fingerprint = Column(String(64), nullable=False, index=True)  # Hash of the data the report is built from
+    artifact_filename = Column(String(255), nullable=True)  # Rendered PDF in the report artifact cache
+    file_size = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Extended whenever the artifact is reused
@@ -0,0 +1,24 @@
+"""
+Model for content-addressed stored files shared between images or documents.
+"""
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class StoredBlob(Base):
+    """One stored file, referenced by every image or document row with identical content."""
+    __tablename__ = "stored_blobs"
+
+    kind = Column(String(20), primary_key=True)  # "image" or "document"
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the stored file
+    source_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the upload an image was transcoded from
+    filename = Column(String(255), nullable=False, index=True)
+    thumbnail_filename = Column(String(255), nullable=True)
+    file_size = Column(Integer, nullable=False)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -6,6 +6,7 @@ from .document import DocumentResponse, DocumentUpload
 from .setting import SettingUpdate, SettingResponse
 from .property import PropertyCreate, PropertyUpdate, PropertyResponse, PropertyListResponse
 from .insurance_policy import InsurancePolicyCreate, InsurancePolicyUpdate, InsurancePolicyResponse
+from .analysis_job import AnalysisJobResponse, AnalysisBatchResponse
 
 __all__ = [
     "LocationCreate", "LocationUpdate", "LocationResponse", "LocationTree",
@@ -16,4 +17,5 @@ __all__ = [
     "SettingUpdate", "SettingResponse",
     "PropertyCreate", "PropertyUpdate", "PropertyResponse", "PropertyListResponse",
     "InsurancePolicyCreate", "InsurancePolicyUpdate", "InsurancePolicyResponse",
+    "AnalysisJobResponse", "AnalysisBatchResponse",
 ]
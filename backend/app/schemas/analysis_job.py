@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+from ..models.analysis_job import AnalysisJobStatus
+from .image import AIAnalysisResult
+
+
+class AnalysisJobResponse(BaseModel):
+    id: str
+    batch_id: str
+    status: AnalysisJobStatus
+    image_count: int
+    attempts: int
+    provider: Optional[str] = None
+    result: Optional[AIAnalysisResult] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AnalysisBatchResponse(BaseModel):
+    """Jobs created by one submission"""
+    batch_id: str
+    jobs: List[AnalysisJobResponse]
@@ -71,9 +71,10 @@ class ItemResponse(ItemBase):
 
 class ItemListResponse(BaseModel):
     items: List[ItemResponse]
-    total: int
+    total: Optional[int] = None  # None when the count was skipped (include_total=false)
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Set in cursor pagination mode when more items follow
 
 
 class BatchUpdateRequest(BaseModel):
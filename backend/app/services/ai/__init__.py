@@ -3,5 +3,6 @@ from .claude import ClaudeProvider
 from .openai import OpenAIProvider
 from .ollama import OllamaProvider
 from .gemini import GeminiProvider
+from .registry import ProviderRegistry, provider_registry
 
-__all__ = ["AIProvider", "ClaudeProvider", "OpenAIProvider", "OllamaProvider", "GeminiProvider"]
+__all__ = ["AIProvider", "ClaudeProvider", "OpenAIProvider", "OllamaProvider", "GeminiProvider", "ProviderRegistry", "provider_registry"]
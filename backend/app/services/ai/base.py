@@ -1,12 +1,33 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+from PIL import Image, ImageOps
+import asyncio
 import base64
+import io
 import json
+from ...config import settings, ai_image_max_edge
+
+# Default longest edge for providers without a configured limit
+DEFAULT_MAX_IMAGE_EDGE = 1568
+
+MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp"
+}
 
 
 class AIProvider(ABC):
     """Base class for AI providers"""
 
+    # Provider key used for per-provider settings
+    name: str = ""
+
+    # Model identifier, part of the analysis cache key
+    model_name: str = ""
+
     @abstractmethod
     async def analyze_images(self, image_paths: List[str], prompt: str) -> Dict[str, Any]:
         """
@@ -31,10 +52,63 @@ class AIProvider(ABC):
         """
         pass
 
-    def _encode_image(self, image_path: str) -> str:
-        """Encode image to base64"""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
+    @property
+    def max_image_edge(self) -> int:
+        """Longest image edge (pixels) sent to this provider"""
+        return ai_image_max_edge.get(self.name, DEFAULT_MAX_IMAGE_EDGE)
+
+    def _prepare_image(self, image_path: str) -> Tuple[bytes, str]:
+        """
+        Downscale an image for upload: apply EXIF orientation, fit it within
+        max_image_edge and re-encode as JPEG (which also drops EXIF metadata).
+
+        Returns:
+            Tuple of (image bytes, media type)
+        """
+        try:
+            with Image.open(image_path) as img:
+                img = ImageOps.exif_transpose(img)
+
+                # Flatten transparency onto white, JPEG has no alpha
+                if img.mode in ("RGBA", "LA", "P"):
+                    img = img.convert("RGBA")
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    background.paste(img, mask=img.split()[-1])
+                    img = background
+                elif img.mode != "RGB":
+                    img = img.convert("RGB")
+
+                img.thumbnail((self.max_image_edge, self.max_image_edge), Image.Resampling.LANCZOS)
+
+                output = io.BytesIO()
+                img.save(output, format="JPEG", quality=settings.ai_image_quality, optimize=True)
+                return output.getvalue(), "image/jpeg"
+        except (OSError, ValueError):
+            # Unreadable by Pillow - send the original file as-is
+            ext = image_path.lower().split(".")[-1]
+            with open(image_path, "rb") as image_file:
+                return image_file.read(), MEDIA_TYPES.get(ext, "image/jpeg")
+
+    async def _prepare_images(self, image_paths: List[str]) -> List[Tuple[bytes, str]]:
+        """Prepare images for upload in the thread pool"""
+        loop = asyncio.get_event_loop()
+        return await asyncio.gather(*[
+            loop.run_in_executor(None, self._prepare_image, path)
+            for path in image_paths
+        ])
+
+    async def _encode_images(self, image_paths: List[str]) -> List[Tuple[str, str]]:
+        """
+        Prepare and base64-encode images
+
+        Returns:
+            List of (base64 data, media type) tuples
+        """
+        prepared = await self._prepare_images(image_paths)
+        return [
+            (base64.b64encode(data).decode("utf-8"), media_type)
+            for data, media_type in prepared
+        ]
 
     def _parse_json_response(self, response: str) -> Dict[str, Any]:
         """Parse JSON from AI response, handling markdown code blocks"""
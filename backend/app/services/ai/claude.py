@@ -1,4 +1,5 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import httpx
 import anthropic
 from .base import AIProvider
 
@@ -6,9 +7,12 @@ from .base import AIProvider
 class ClaudeProvider(AIProvider):
     """Anthropic Claude AI Provider"""
 
-    def __init__(self, api_key: str):
+    name = "claude"
+    model_name = "claude-3-5-sonnet-20241022"
+
+    def __init__(self, api_key: str, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
-        self.client = anthropic.AsyncAnthropic(api_key=api_key)
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client)
 
     async def analyze_images(self, image_paths: List[str], prompt: str) -> Dict[str, Any]:
         """Analyze images using Claude Vision"""
@@ -16,21 +20,8 @@ class ClaudeProvider(AIProvider):
             # Prepare image content
             content = []
 
-            for image_path in image_paths:
-                # Determine media type from file extension
-                ext = image_path.lower().split(".")[-1]
-                media_type_map = {
-                    "jpg": "image/jpeg",
-                    "jpeg": "image/jpeg",
-                    "png": "image/png",
-                    "gif": "image/gif",
-                    "webp": "image/webp"
-                }
-                media_type = media_type_map.get(ext, "image/jpeg")
-
-                # Encode image
-                image_data = self._encode_image(image_path)
-
+            # Downscaled, re-encoded images
+            for image_data, media_type in await self._encode_images(image_paths):
                 content.append({
                     "type": "image",
                     "source": {
@@ -48,7 +39,7 @@ class ClaudeProvider(AIProvider):
 
             # Make API call
             message = await self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
+                model=self.model_name,
                 max_tokens=1024,
                 messages=[{
                     "role": "user",
@@ -68,7 +59,7 @@ class ClaudeProvider(AIProvider):
         try:
             # Make a simple API call to test connection
             message = await self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
+                model=self.model_name,
                 max_tokens=10,
                 messages=[{
                     "role": "user",
@@ -1,12 +1,13 @@
 from typing import List, Dict, Any, Optional
 import google.generativeai as genai
-from PIL import Image
 from .base import AIProvider
 
 
 class GeminiProvider(AIProvider):
     """Google Gemini AI Provider"""
 
+    name = "gemini"
+
     def __init__(self, api_key: str, model_name: Optional[str] = None):
         self.api_key = api_key
         genai.configure(api_key=api_key)
@@ -23,11 +24,9 @@ class GeminiProvider(AIProvider):
             # Add text prompt first
             parts.append(prompt)
 
-            # Add images
-            for image_path in image_paths:
-                # Open image with PIL
-                img = Image.open(image_path)
-                parts.append(img)
+            # Add downscaled, re-encoded images as inline blobs
+            for image_data, media_type in await self._prepare_images(image_paths):
+                parts.append({"mime_type": media_type, "data": image_data})
 
             # Generate content
             response = await self.model.generate_content_async(parts)
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import httpx
 from .base import AIProvider
 
@@ -6,32 +6,37 @@ from .base import AIProvider
 class OllamaProvider(AIProvider):
     """Ollama Local AI Provider"""
 
-    def __init__(self, endpoint: str):
+    name = "ollama"
+    model_name = "llava"
+
+    def __init__(self, endpoint: str, http_client: Optional[httpx.AsyncClient] = None):
         self.endpoint = endpoint.rstrip("/")
+        # Keep-alive client reused across calls (shared by the provider registry)
+        self.http_client = http_client or httpx.AsyncClient()
 
     async def analyze_images(self, image_paths: List[str], prompt: str) -> Dict[str, Any]:
         """Analyze images using Ollama (llava model)"""
         try:
             # Prepare images (Ollama expects base64 encoded images)
-            images = [self._encode_image(path) for path in image_paths]
+            images = [image_data for image_data, _ in await self._encode_images(image_paths)]
 
             # Make API call to Ollama
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.endpoint}/api/generate",
-                    json={
-                        "model": "llava",
-                        "prompt": prompt,
-                        "images": images,
-                        "stream": False
-                    }
-                )
-                response.raise_for_status()
-
-                result = response.json()
-                response_text = result.get("response", "")
-
-                return self._parse_json_response(response_text)
+            response = await self.http_client.post(
+                f"{self.endpoint}/api/generate",
+                json={
+                    "model": self.model_name,
+                    "prompt": prompt,
+                    "images": images,
+                    "stream": False
+                },
+                timeout=60.0
+            )
+            response.raise_for_status()
+
+            result = response.json()
+            response_text = result.get("response", "")
+
+            return self._parse_json_response(response_text)
 
         except httpx.HTTPError as e:
             raise Exception(f"Ollama API error: {str(e)}")
@@ -41,19 +46,18 @@ class OllamaProvider(AIProvider):
     async def test_connection(self) -> tuple[bool, str]:
         """Test Ollama connection"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                # Check if Ollama is running
-                response = await client.get(f"{self.endpoint}/api/tags")
-                response.raise_for_status()
-
-                # Check if llava model is available
-                models = response.json().get("models", [])
-                model_names = [m.get("name", "") for m in models]
-
-                if any("llava" in name.lower() for name in model_names):
-                    return True, "Connection successful (llava model available)"
-                else:
-                    return False, "Connection successful but llava model not found. Please run: ollama pull llava"
+            # Check if Ollama is running
+            response = await self.http_client.get(f"{self.endpoint}/api/tags", timeout=10.0)
+            response.raise_for_status()
+
+            # Check if llava model is available
+            models = response.json().get("models", [])
+            model_names = [m.get("name", "") for m in models]
+
+            if any("llava" in name.lower() for name in model_names):
+                return True, "Connection successful (llava model available)"
+            else:
+                return False, "Connection successful but llava model not found. Please run: ollama pull llava"
 
         except httpx.HTTPError:
             return False, "Cannot connect to Ollama. Make sure Ollama is running."
@@ -1,4 +1,5 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import httpx
 import openai
 from .base import AIProvider
 
@@ -6,9 +7,12 @@ from .base import AIProvider
 class OpenAIProvider(AIProvider):
     """OpenAI GPT-4 Vision Provider"""
 
-    def __init__(self, api_key: str):
+    name = "openai"
+    model_name = "gpt-4o"
+
+    def __init__(self, api_key: str, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+        self.client = openai.AsyncOpenAI(api_key=api_key, http_client=http_client)
 
     async def analyze_images(self, image_paths: List[str], prompt: str) -> Dict[str, Any]:
         """Analyze images using GPT-4 Vision"""
@@ -16,21 +20,8 @@ class OpenAIProvider(AIProvider):
             # Prepare content
             content = []
 
-            for image_path in image_paths:
-                # Determine media type
-                ext = image_path.lower().split(".")[-1]
-                media_type_map = {
-                    "jpg": "image/jpeg",
-                    "jpeg": "image/jpeg",
-                    "png": "image/png",
-                    "gif": "image/gif",
-                    "webp": "image/webp"
-                }
-                media_type = media_type_map.get(ext, "image/jpeg")
-
-                # Encode image
-                image_data = self._encode_image(image_path)
-
+            # Downscaled, re-encoded images
+            for image_data, media_type in await self._encode_images(image_paths):
                 content.append({
                     "type": "image_url",
                     "image_url": {
@@ -46,7 +37,7 @@ class OpenAIProvider(AIProvider):
 
             # Make API call
             response = await self.client.chat.completions.create(
-                model="gpt-4o",
+                model=self.model_name,
                 messages=[{
                     "role": "user",
                     "content": content
@@ -66,7 +57,7 @@ class OpenAIProvider(AIProvider):
         try:
             # Make a simple API call to test connection
             response = await self.client.chat.completions.create(
-                model="gpt-4o",
+                model=self.model_name,
                 messages=[{
                     "role": "user",
                     "content": "Hi"
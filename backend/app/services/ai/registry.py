@@ -0,0 +1,81 @@
+"""
+Registry of long-lived AI provider instances.
+
+Providers are cached per configuration and share one connection-pooled
+HTTP client (HTTP/2 when the h2 package is installed), so consecutive
+analyses reuse open TLS connections instead of reconnecting each time.
+"""
+import logging
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from .base import AIProvider
+from .claude import ClaudeProvider
+from .openai import OpenAIProvider
+from .ollama import OllamaProvider
+from .gemini import GeminiProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ProviderRegistry:
+    """Caches provider instances keyed by provider name and settings."""
+
+    def __init__(self):
+        self._providers: Dict[Tuple, AIProvider] = {}
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client used by the HTTP-based providers."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(120.0, connect=10.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120.0)
+            )
+        return self._http_client
+
+    def create(self, provider_name: str, **config) -> AIProvider:
+        """Build a new provider bound to the shared HTTP client (not cached)."""
+        if provider_name == "claude":
+            return ClaudeProvider(config["api_key"], http_client=self.http_client)
+        elif provider_name == "openai":
+            return OpenAIProvider(config["api_key"], http_client=self.http_client)
+        elif provider_name == "gemini":
+            return GeminiProvider(config["api_key"], config.get("model_name"))
+        elif provider_name == "ollama":
+            return OllamaProvider(config["endpoint"], http_client=self.http_client)
+        raise ValueError(f"Unknown AI provider: {provider_name}")
+
+    def get(self, provider_name: str, **config) -> AIProvider:
+        """Return the cached provider for this configuration, creating it if needed."""
+        key = (provider_name, tuple(sorted(config.items())))
+        provider = self._providers.get(key)
+        if provider is None:
+            provider = self.create(provider_name, **config)
+            self._providers[key] = provider
+        return provider
+
+    def invalidate(self) -> None:
+        """Drop cached providers (called when AI settings change)."""
+        self._providers.clear()
+
+    async def close(self) -> None:
+        """Close the shared HTTP client on shutdown."""
+        self._providers.clear()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            logger.info("AI provider HTTP client closed")
+
+
+# Singleton instance
+provider_registry = ProviderRegistry()
@@ -0,0 +1,115 @@
+"""
+Content-addressed cache for AI image analysis results.
+
+Entries are keyed by the SHA-256 of the image bytes together with the prompt
+(which embeds the category list) and the provider/model, so resubmitting the
+same photos returns the stored result without another vision-model call.
+Entries expire after a TTL and the least recently used ones are evicted once
+the cache grows past its size limit.
+"""
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.analysis_cache import AnalysisCacheEntry
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+class AnalysisCacheService:
+    """Service for looking up and storing cached analysis results."""
+
+    def _hash_file(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def compute_key(self, image_paths: List[str], prompt: str, provider: str, model_name: str) -> str:
+        """
+        Build the cache key for an analysis request.
+
+        Image hashes are sorted so the same photos submitted in a different
+        order hit the same entry.
+        """
+        image_hashes = sorted(self._hash_file(path) for path in image_paths)
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+        digest = hashlib.sha256()
+        for part in [provider, model_name or "", prompt_hash, *image_hashes]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, db: Session, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a key, or None if missing or expired."""
+        if not settings.analysis_cache_enabled:
+            return None
+
+        entry = db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.cache_key == cache_key).first()
+        if not entry:
+            return None
+
+        cutoff = datetime.utcnow() - timedelta(hours=settings.analysis_cache_ttl_hours)
+        if entry.created_at and entry.created_at.replace(tzinfo=None) < cutoff:
+            db.delete(entry)
+            db.commit()
+            return None
+
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+
+        return dict(entry.result)
+
+    def put(self, db: Session, cache_key: str, provider: str, model_name: str, result: Dict[str, Any]) -> None:
+        """Store a result, replacing any previous entry, then evict old entries."""
+        if not settings.analysis_cache_enabled:
+            return
+
+        now = datetime.utcnow()
+        stmt = sqlite_insert(AnalysisCacheEntry.__table__).values(
+            cache_key=cache_key,
+            provider=provider,
+            model_name=model_name or "",
+            result=result,
+            hit_count=0,
+            created_at=now,
+            last_used_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["cache_key"],
+            set_={"result": stmt.excluded.result, "created_at": now, "last_used_at": now}
+        )
+        db.execute(stmt)
+        self.evict(db)
+        db.commit()
+
+    def evict(self, db: Session) -> int:
+        """Delete expired entries and trim the cache to its maximum size (LRU)."""
+        table = AnalysisCacheEntry.__table__
+        cutoff = datetime.utcnow() - timedelta(hours=settings.analysis_cache_ttl_hours)
+
+        removed = db.execute(delete(table).where(table.c.created_at < cutoff)).rowcount
+
+        overflow = db.query(func.count()).select_from(table).scalar() - settings.analysis_cache_max_entries
+        if overflow > 0:
+            oldest = select(table.c.cache_key).order_by(table.c.last_used_at).limit(overflow)
+            removed += db.execute(delete(table).where(table.c.cache_key.in_(oldest))).rowcount
+
+        if removed:
+            logger.info(f"Evicted {removed} analysis cache entries")
+        return removed
+
+
+# Singleton instance
+analysis_cache_service = AnalysisCacheService()
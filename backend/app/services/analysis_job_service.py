@@ -0,0 +1,266 @@
+"""
+Background queue for AI image analysis jobs.
+
+Jobs are persisted in the analysis_jobs table and their images spooled to
+disk, so pending work survives restarts. A bounded pool of asyncio workers
+processes the queue, with a per-provider concurrency limit on top.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import settings, analysis_provider_concurrency
+from ..database import SessionLocal
+from ..models.analysis_job import AnalysisJob, AnalysisJobStatus
+from ..schemas.image import AIAnalysisResult
+from ..api.settings import get_setting_value
+from .analysis_service import analysis_service
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = (AnalysisJobStatus.COMPLETED, AnalysisJobStatus.FAILED, AnalysisJobStatus.CANCELLED)
+
+
+class AnalysisJobQueue:
+    """Worker pool processing persisted analysis jobs."""
+
+    def __init__(self):
+        self.jobs_path = settings.analysis_jobs_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._provider_limits: Dict[str, asyncio.Semaphore] = {}
+        self._waiters: Dict[str, list] = {}  # job ID -> [event, number of waiters]
+        self._is_running = False
+
+    # ============== LIFECYCLE ==============
+
+    def start(self) -> None:
+        """Start the worker pool and re-queue unfinished jobs (must run inside the event loop)."""
+        if self._is_running:
+            logger.warning("Analysis job queue already running")
+            return
+
+        self._queue = asyncio.Queue()
+        worker_count = max(1, settings.analysis_workers)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"analysis-worker-{n}")
+            for n in range(worker_count)
+        ]
+        self._is_running = True
+
+        self._recover_jobs()
+        logger.info(f"Analysis job queue started ({worker_count} workers)")
+
+    async def stop(self) -> None:
+        """Stop the workers. Interrupted jobs are picked up again on next start."""
+        if not self._is_running:
+            return
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        self._workers = []
+        self._is_running = False
+        logger.info("Analysis job queue stopped")
+
+    def is_running(self) -> bool:
+        """Check if the worker pool is running."""
+        return self._is_running
+
+    def _recover_jobs(self) -> None:
+        """Purge expired jobs and re-queue jobs left pending or running by a restart."""
+        db = SessionLocal()
+        try:
+            self.purge_expired(db)
+
+            unfinished = db.query(AnalysisJob).filter(
+                AnalysisJob.status.in_([AnalysisJobStatus.PENDING, AnalysisJobStatus.RUNNING])
+            ).order_by(AnalysisJob.created_at).all()
+
+            for job in unfinished:
+                if job.attempts >= settings.analysis_max_attempts:
+                    self._finish(job, error="Analysis interrupted too many times")
+                    continue
+                job.status = AnalysisJobStatus.PENDING
+                self._queue.put_nowait(job.id)
+
+            db.commit()
+            if unfinished:
+                logger.info(f"Recovered {len(unfinished)} unfinished analysis job(s)")
+        finally:
+            db.close()
+
+    # ============== SUBMISSION ==============
+
+    def get_spool_dir(self, batch_id: str) -> str:
+        """Directory holding the uploaded images of a batch until analyzed."""
+        path = os.path.join(self.jobs_path, batch_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def submit(self, db: Session, batch_id: str, image_groups: List[List[str]]) -> List[AnalysisJob]:
+        """
+        Persist and enqueue one job per group of spooled image paths.
+
+        Returns:
+            The created jobs, in submission order
+        """
+        if not self._is_running:
+            raise RuntimeError("Analysis job queue is not running")
+
+        self.purge_expired(db)
+
+        jobs = [
+            AnalysisJob(
+                batch_id=batch_id,
+                status=AnalysisJobStatus.PENDING,
+                image_paths=paths,
+                image_count=len(paths),
+                attempts=0
+            )
+            for paths in image_groups
+        ]
+        db.add_all(jobs)
+        db.commit()
+
+        for job in jobs:
+            self._queue.put_nowait(job.id)
+
+        logger.info(f"Queued {len(jobs)} analysis job(s) in batch {batch_id}")
+        return jobs
+
+    def cancel(self, db: Session, job: AnalysisJob) -> bool:
+        """Cancel a pending job. Returns False if it already started."""
+        if job.status != AnalysisJobStatus.PENDING:
+            return False
+
+        self._finish(job, status=AnalysisJobStatus.CANCELLED)
+        db.commit()
+        self._notify(job.id)
+        return True
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete finished jobs older than the retention window."""
+        cutoff = datetime.utcnow() - timedelta(hours=settings.analysis_job_retention_hours)
+        expired = db.query(AnalysisJob).filter(
+            AnalysisJob.status.in_(FINISHED_STATUSES),
+            AnalysisJob.created_at < cutoff
+        ).all()
+
+        for job in expired:
+            self._remove_files(job.image_paths)
+            db.delete(job)
+        db.commit()
+        return len(expired)
+
+    # ============== WAITING ==============
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for a job to finish (long polling)."""
+        entry = self._waiters.setdefault(job_id, [asyncio.Event(), 0])
+        entry[1] += 1
+        try:
+            await asyncio.wait_for(entry[0].wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Drop the event with its last waiter, e.g. when the job finished
+            # before anyone could be notified
+            entry[1] -= 1
+            if entry[1] == 0 and self._waiters.get(job_id) is entry:
+                del self._waiters[job_id]
+
+    def _notify(self, job_id: str) -> None:
+        entry = self._waiters.pop(job_id, None)
+        if entry:
+            entry[0].set()
+
+    # ============== PROCESSING ==============
+
+    def _provider_limit(self, provider_name: str) -> asyncio.Semaphore:
+        """Semaphore capping concurrent requests to one provider."""
+        if provider_name not in self._provider_limits:
+            limit = analysis_provider_concurrency.get(provider_name, 2)
+            self._provider_limits[provider_name] = asyncio.Semaphore(max(1, limit))
+        return self._provider_limits[provider_name]
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                logger.error(f"Analysis job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            if not job or job.status != AnalysisJobStatus.PENDING:
+                return
+
+            provider_name = get_setting_value(db, "ai_provider", "claude")
+
+            async with self._provider_limit(provider_name):
+                # Re-check: the job may have been cancelled while waiting for a slot
+                db.refresh(job)
+                if job.status != AnalysisJobStatus.PENDING:
+                    return
+
+                job.status = AnalysisJobStatus.RUNNING
+                job.provider = provider_name
+                job.attempts += 1
+                job.started_at = datetime.utcnow()
+                db.commit()
+
+                try:
+                    analysis = await analysis_service.analyze_image_files(db, job.image_paths)
+                    result = AIAnalysisResult(**analysis).model_dump()
+                    self._finish(job, status=AnalysisJobStatus.COMPLETED, result=result)
+                except Exception as e:
+                    error = getattr(e, "detail", None) or str(e)
+                    logger.warning(f"Analysis job {job_id} failed: {error}")
+                    self._finish(job, error=error)
+
+                db.commit()
+        finally:
+            db.close()
+            self._notify(job_id)
+
+    def _finish(
+        self,
+        job: AnalysisJob,
+        status: AnalysisJobStatus = AnalysisJobStatus.FAILED,
+        result: Optional[dict] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Mark a job finished and release its spooled images."""
+        job.status = status
+        job.result = result
+        job.error = error
+        job.completed_at = datetime.utcnow()
+        self._remove_files(job.image_paths)
+
+    def _remove_files(self, image_paths: List[str]) -> None:
+        """Delete spooled images, and their batch directory once empty."""
+        for path in image_paths or []:
+            if os.path.exists(path):
+                os.remove(path)
+
+            batch_dir = os.path.dirname(path)
+            if os.path.realpath(os.path.dirname(batch_dir)) == os.path.realpath(self.jobs_path):
+                try:
+                    os.rmdir(batch_dir)
+                except OSError:
+                    pass  # Other jobs in the batch still pending
+
+
+# Singleton instance
+analysis_job_queue = AnalysisJobQueue()
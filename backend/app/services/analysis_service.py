@@ -0,0 +1,172 @@
+"""
+Service for running AI image analysis against the configured provider.
+"""
+from typing import List, Optional, Dict, Any
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from ..models.category import Category
+from ..api.settings import get_setting_value
+from ..schemas.image import AIAnalysisResult
+from ..utils.prompts import get_analysis_prompt
+from .ai import provider_registry
+from .analysis_cache_service import analysis_cache_service
+
+
+def normalize_category_name(name: str) -> str:
+    """Normalize category name for comparison"""
+    return name.lower().strip().replace("&", "and").replace("-", " ")
+
+
+def get_word_stem(word: str) -> str:
+    """Simple stemming - remove common suffixes"""
+    if len(word) > 4:
+        if word.endswith('ics'):
+            return word[:-1]  # electronics -> electronic
+        if word.endswith('s') and not word.endswith('ss'):
+            return word[:-1]  # tools -> tool
+        if word.endswith('ing'):
+            return word[:-3]  # dining -> din
+        if word.endswith('ment'):
+            return word[:-4]  # equipment -> equip
+    return word
+
+
+def find_similar_category(suggested: str, existing_categories: List[Category]) -> Optional[Category]:
+    """
+    Find a similar existing category for the AI suggestion.
+    Returns the matching category if found, None if truly new.
+    """
+    suggested_normalized = normalize_category_name(suggested)
+    suggested_words = set(suggested_normalized.split())
+    suggested_stems = {get_word_stem(w) for w in suggested_words}
+
+    best_match = None
+    best_score = 0
+
+    for category in existing_categories:
+        cat_normalized = normalize_category_name(category.name)
+        cat_words = set(cat_normalized.split())
+        cat_stems = {get_word_stem(w) for w in cat_words}
+
+        # Exact match (case-insensitive)
+        if suggested_normalized == cat_normalized:
+            return category
+
+        # Check if one contains the other
+        if suggested_normalized in cat_normalized or cat_normalized in suggested_normalized:
+            return category
+
+        # Check stem overlap (handles electronics/electronic, tools/tool, etc.)
+        common_stems = suggested_stems & cat_stems
+        if common_stems:
+            # Score based on proportion of matching stems
+            score = len(common_stems) / max(len(suggested_stems), len(cat_stems))
+            if score > best_score:
+                best_score = score
+                best_match = category
+
+        # Also check word overlap
+        common_words = suggested_words & cat_words
+        if common_words:
+            score = len(common_words) / max(len(suggested_words), len(cat_words))
+            if score > best_score:
+                best_score = score
+                best_match = category
+
+    # Return match only if score is significant
+    if best_score >= 0.4:  # 40% overlap threshold
+        return best_match
+
+    return None
+
+
+def get_ai_provider(db: Session):
+    """Get the configured AI provider (cached per configuration)"""
+    provider_name = get_setting_value(db, "ai_provider", "claude")
+
+    if provider_name == "claude":
+        api_key = get_setting_value(db, "claude_api_key")
+        if not api_key:
+            raise HTTPException(status_code=400, detail="Claude API key not configured")
+        return provider_registry.get("claude", api_key=api_key)
+    elif provider_name == "openai":
+        api_key = get_setting_value(db, "openai_api_key")
+        if not api_key:
+            raise HTTPException(status_code=400, detail="OpenAI API key not configured")
+        return provider_registry.get("openai", api_key=api_key)
+    elif provider_name == "gemini":
+        api_key = get_setting_value(db, "gemini_api_key")
+        if not api_key:
+            raise HTTPException(status_code=400, detail="Gemini API key not configured")
+        model_name = get_setting_value(db, "gemini_model")
+        if not model_name:
+            raise HTTPException(status_code=400, detail="Gemini model not configured. Please select a model in Settings.")
+        return provider_registry.get("gemini", api_key=api_key, model_name=model_name)
+    elif provider_name == "ollama":
+        endpoint = get_setting_value(db, "ollama_endpoint", "http://ollama:11434")
+        return provider_registry.get("ollama", endpoint=endpoint)
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown AI provider: {provider_name}")
+
+
+class AnalysisService:
+    """Service for analyzing item photos and matching the suggested category."""
+
+    async def analyze_image_files(self, db: Session, image_paths: List[str]) -> Dict[str, Any]:
+        """
+        Analyze image files with the configured provider.
+
+        Existing categories are included in the prompt, and the suggested
+        category is mapped onto a similar existing one where possible.
+        Results are cached by image content, prompt and provider/model, so
+        resubmitting the same photos does not call the provider again.
+
+        Returns:
+            Dict with analysis results (AIAnalysisResult fields)
+        """
+        # Fetch existing categories for the prompt
+        existing_categories = db.query(Category).all()
+        category_names = [cat.name for cat in existing_categories]
+
+        # Get AI provider and analyze with categories in prompt
+        provider = get_ai_provider(db)
+        prompt = get_analysis_prompt(category_names)
+
+        provider_name = get_setting_value(db, "ai_provider", "claude")
+        cache_key = analysis_cache_service.compute_key(image_paths, prompt, provider_name, provider.model_name)
+        cached_result = analysis_cache_service.get(db, cache_key)
+        if cached_result is not None:
+            return cached_result
+
+        analysis_result = await provider.analyze_images(image_paths, prompt)
+
+        # Run similarity check on the suggested category
+        suggested_category = analysis_result.get("category", "")
+
+        # Even if AI says it's not new, verify against our list
+        # Also check if AI said it's new but we have a similar one
+        similar_category = find_similar_category(suggested_category, existing_categories)
+
+        if similar_category:
+            # Found a match - use existing category name
+            analysis_result["category"] = similar_category.name
+            analysis_result["category_is_new"] = False
+        else:
+            # Truly new category
+            analysis_result["category_is_new"] = True
+
+        # Only cache results that form a valid analysis
+        try:
+            AIAnalysisResult(**analysis_result)
+        except ValidationError:
+            return analysis_result
+
+        analysis_cache_service.put(db, cache_key, provider_name, provider.model_name, analysis_result)
+        return analysis_result
+
+
+# Singleton instance
+analysis_service = AnalysisService()
@@ -1,44 +1,71 @@
 """
 Database backup service with tiered retention policy.
+
+Backups use SQLite's online backup API, copying a bounded number of pages
+per step and pausing between steps, so the snapshot is consistent (WAL
+contents included) while writers keep going.
+
+With incremental backups enabled, a full copy (.db) is taken every
+backup_full_interval_hours; backups in between are differentials (.diff)
+holding only the pages that changed since that full base. Restoring a
+differential reassembles base + diff into a complete database.
+
+Backup files are optionally gzip/zstd compressed while they are written
+(.db.gz, .diff.zst, ...) and decompressed on the fly when downloaded.
 """
 import os
-import shutil
+import time
+import asyncio
+import sqlite3
 import logging
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
 from collections import defaultdict
 
 from ..config import settings
+from ..utils.page_diff import write_page_diff, read_diff_header, apply_page_diff
+from ..utils.compression import (
+    SUFFIXES, resolve_compression, compression_of, strip_compression_suffix, compress_file, decompress_file
+)
 
 logger = logging.getLogger(__name__)
 
 
+class _TooManyRestarts(Exception):
+    """Raised from the backup progress callback to abandon a stepped copy."""
+
+
 class BackupService:
     """Service for managing database backups with tiered retention."""
 
     APP_NAME = "homeregistry"
+    FULL_EXT = ".db"
+    DIFF_EXT = ".diff"
 
     def __init__(self):
         self.db_path = settings.database_url
         self.backup_dir = settings.backup_dir
         self._last_backup_time: Optional[datetime] = None
         self._last_backup_error: Optional[str] = None
+        self._last_backup_metrics: Optional[Dict] = None
+        self._backup_lock = threading.Lock()
 
     def _ensure_backup_dir(self) -> None:
         """Create backup directory if it doesn't exist."""
         os.makedirs(self.backup_dir, exist_ok=True)
 
-    def _generate_filename(self) -> str:
+    def _generate_filename(self, ext: str = FULL_EXT) -> str:
         """Generate timestamped backup filename."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return f"{self.APP_NAME}_backup_{timestamp}.db"
+        return f"{self.APP_NAME}_backup_{timestamp}{ext}"
 
     def _parse_backup_datetime(self, filename: str) -> Optional[datetime]:
         """Parse datetime from backup filename."""
         try:
-            # Expected format: homeregistry_backup_YYYYmmdd_HHMMSS.db
-            parts = filename.replace(".db", "").split("_")
+            # Expected format: homeregistry_backup_YYYYmmdd_HHMMSS.db (or .diff), optionally .gz/.zst
+            parts = os.path.splitext(strip_compression_suffix(filename))[0].split("_")
             if len(parts) >= 4:
                 date_str = parts[-2]
                 time_str = parts[-1]
@@ -51,16 +78,117 @@ class BackupService:
         """Check if filename matches expected backup pattern."""
         return (
             filename.startswith(f"{self.APP_NAME}_backup_") and
-            filename.endswith(".db") and
+            strip_compression_suffix(filename).endswith((self.FULL_EXT, self.DIFF_EXT)) and
             self._parse_backup_datetime(filename) is not None
         )
 
+    def backup_type(self, filename: str) -> str:
+        """'differential' for page diffs, 'full' for complete database copies."""
+        return "differential" if strip_compression_suffix(filename).endswith(self.DIFF_EXT) else "full"
+
+    def get_base_filename(self, filename: str) -> Optional[str]:
+        """Full backup a differential was taken against (None for full backups)."""
+        if self.backup_type(filename) == "full":
+            return None
+        try:
+            return read_diff_header(os.path.join(self.backup_dir, filename))["base"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _latest_base(self) -> Optional[str]:
+        """Newest full backup that differentials may still be taken against."""
+        cutoff = datetime.now() - timedelta(hours=settings.backup_full_interval_hours)
+        fulls = [
+            b for b in self.list_backups()
+            if b["type"] == "full" and b["created_at"] and datetime.fromisoformat(b["created_at"]) >= cutoff
+        ]
+        return fulls[0]["filename"] if fulls else None
+
+    def snapshot(self, dest_path: str) -> Dict:
+        """
+        Write a consistent copy of the live database to dest_path.
+
+        Copies settings.backup_pages_per_step pages at a time and sleeps
+        settings.backup_step_sleep_ms between steps so the copy does not
+        monopolise disk I/O. SQLite restarts a stepped copy whenever another
+        connection writes; after settings.backup_max_restarts restarts the
+        rest is copied in a single step, which holds one read transaction -
+        in WAL mode that does not block writers.
+
+        Returns:
+            Dict with timing metrics (duration_seconds, pages, steps, restarts,
+            bytes, mb_per_second, mode)
+        """
+        started = time.perf_counter()
+        stats = {"steps": 0, "restarts": 0}
+
+        try:
+            mode = "incremental"
+            pages = self._copy(dest_path, settings.backup_pages_per_step, stats)
+        except _TooManyRestarts:
+            mode = "single_step"
+            pages = self._copy(dest_path, -1, stats)
+
+        duration = time.perf_counter() - started
+        size = os.path.getsize(dest_path)
+
+        return {
+            "duration_seconds": round(duration, 3),
+            "pages": pages,
+            "steps": stats["steps"],
+            "restarts": stats["restarts"],
+            "bytes": size,
+            "mb_per_second": round(size / duration / (1024 * 1024), 2) if duration else None,
+            "mode": mode
+        }
+
+    def _copy(self, dest_path: str, pages_per_step: int, stats: Dict) -> int:
+        """Run one sqlite3 backup into dest_path. Returns the number of pages copied."""
+        step_sleep = settings.backup_step_sleep_ms / 1000
+        last_remaining = None
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            nonlocal last_remaining
+            stats["steps"] += 1
+            if last_remaining is not None and remaining > last_remaining:
+                # Source changed underneath us and SQLite started over
+                stats["restarts"] += 1
+                if pages_per_step > 0 and stats["restarts"] > settings.backup_max_restarts:
+                    raise _TooManyRestarts()
+            last_remaining = remaining
+            if remaining and step_sleep:
+                time.sleep(step_sleep)
+
+        partial_path = f"{dest_path}.partial"
+        source = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            dest = sqlite3.connect(partial_path)
+            try:
+                source.backup(dest, pages=pages_per_step, progress=progress)
+                pages = dest.execute("PRAGMA page_count").fetchone()[0]
+                # A standalone file is easier to copy around than one in WAL mode
+                dest.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                dest.close()
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        finally:
+            source.close()
+
+        os.replace(partial_path, dest_path)
+        return pages
+
     def create_backup(self) -> Dict:
         """
         Create a backup of the database.
 
+        Blocks for the duration of the copy; use create_backup_async from
+        the event loop.
+
         Returns:
-            Dict with backup metadata (filename, path, size, created_at)
+            Dict with backup metadata (filename, path, size, created_at, metrics)
 
         Raises:
             FileNotFoundError: If source database doesn't exist
@@ -75,13 +203,10 @@ class BackupService:
         # Ensure backup directory exists
         self._ensure_backup_dir()
 
-        # Generate filename and destination path
-        filename = self._generate_filename()
-        dest_path = os.path.join(self.backup_dir, filename)
-
         try:
-            # Copy database file
-            shutil.copy2(self.db_path, dest_path)
+            # One backup at a time (scheduled and manual runs may overlap)
+            with self._backup_lock:
+                filename, dest_path, metrics = self._write_backup()
 
             # Get file stats
             stat = os.stat(dest_path)
@@ -89,8 +214,12 @@ class BackupService:
 
             self._last_backup_time = created_at
             self._last_backup_error = None
+            self._last_backup_metrics = metrics
 
-            logger.info(f"Backup created: {filename} ({stat.st_size} bytes)")
+            logger.info(
+                f"Backup created: {filename} ({metrics['type']}, {stat.st_size} bytes in "
+                f"{metrics['duration_seconds']}s, {metrics['steps']} steps)"
+            )
 
             # Run cleanup after successful backup
             self.cleanup_old_backups()
@@ -99,7 +228,10 @@ class BackupService:
                 "filename": filename,
                 "path": dest_path,
                 "size": stat.st_size,
-                "created_at": created_at.isoformat()
+                "created_at": created_at.isoformat(),
+                "type": metrics["type"],
+                "base": metrics.get("base"),
+                "metrics": metrics
             }
 
         except Exception as e:
@@ -107,6 +239,85 @@ class BackupService:
             logger.error(f"Backup failed: {e}")
             raise IOError(f"Failed to create backup: {e}")
 
+    def _write_backup(self) -> tuple:
+        """
+        Write a full or differential backup, compressed as configured.
+
+        Returns:
+            Tuple of (filename, path, metrics)
+        """
+        compression = resolve_compression(settings.backup_compression)
+        suffix = SUFFIXES[compression] if compression else ""
+        level = settings.backup_compression_level
+        base = self._latest_base() if settings.backup_incremental else None
+
+        # Snapshot next to the backups, then compress it or keep only the changed pages
+        filename = self._generate_filename() + suffix
+        dest_path = os.path.join(self.backup_dir, filename)
+        snapshot_path = f"{dest_path}.snapshot"
+        metrics = self.snapshot(snapshot_path)
+        try:
+            diff = None
+            if base is not None:
+                diff_filename = self._generate_filename(self.DIFF_EXT) + suffix
+                diff_path = os.path.join(self.backup_dir, diff_filename)
+                diff = write_page_diff(
+                    os.path.join(self.backup_dir, base), snapshot_path, diff_path, base,
+                    max_ratio=settings.backup_diff_max_ratio, level=level
+                )
+
+            if diff is not None:
+                filename, dest_path = diff_filename, diff_path
+                metrics.update(type="differential", base=base, changed_pages=diff["changed_pages"])
+            else:
+                # No base yet, or too much changed for a differential to pay off
+                if compression:
+                    compress_file(snapshot_path, dest_path, compression, level)
+                else:
+                    os.replace(snapshot_path, dest_path)
+                metrics["type"] = "full"
+        finally:
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+
+        stored = os.path.getsize(dest_path)
+        metrics.update(
+            compression=compression,
+            stored_bytes=stored,
+            compression_ratio=round(metrics["bytes"] / stored, 2) if stored else None
+        )
+        return filename, dest_path, metrics
+
+    def materialize(self, filename: str, dest_path: str) -> str:
+        """
+        Write the complete database a backup represents to dest_path.
+
+        Full backups are copied (decompressed); differentials are reassembled
+        from their base.
+
+        Raises:
+            FileNotFoundError: If the backup or its base is missing
+        """
+        path = self.get_backup_path(filename)
+        if path is None:
+            raise FileNotFoundError(f"Backup not found: {filename}")
+
+        if self.backup_type(filename) == "full":
+            decompress_file(path, dest_path)
+            return dest_path
+
+        base = self.get_base_filename(filename)
+        base_path = self.get_backup_path(base) if base else None
+        if base_path is None:
+            raise FileNotFoundError(f"Base backup {base} of {filename} not found")
+        apply_page_diff(base_path, path, dest_path)
+        return dest_path
+
+    async def create_backup_async(self) -> Dict:
+        """Create a backup in a worker thread without blocking the event loop."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.create_backup)
+
     def list_backups(self) -> List[Dict]:
         """
         List all available backups with metadata.
@@ -133,7 +344,10 @@ class BackupService:
             backups.append({
                 "filename": filename,
                 "size": stat.st_size,
-                "created_at": backup_time.isoformat() if backup_time else None
+                "created_at": backup_time.isoformat() if backup_time else None,
+                "type": self.backup_type(filename),
+                "base": self.get_base_filename(filename),
+                "compression": compression_of(filename)
             })
 
         # Sort by creation time, newest first
@@ -268,6 +482,13 @@ class BackupService:
             best = min(month_list, key=lambda b: abs(b["time"].day - 1))
             to_keep.add(best["filename"])
 
+        # Differentials are useless without their base
+        for backup in backups:
+            if backup["filename"] in to_keep:
+                base = self.get_base_filename(backup["filename"])
+                if base:
+                    to_keep.add(base)
+
         # Delete backups not in keep list
         deleted = 0
         errors = 0
@@ -308,12 +529,30 @@ class BackupService:
         elif self._last_backup_time:
             last_backup = self._last_backup_time.isoformat()
 
+        # Current chain: newest full backup and the differentials taken against it
+        chain = None
+        base = next((b for b in backups if b["type"] == "full"), None)
+        if base:
+            differentials = [b for b in backups if b["base"] == base["filename"]]
+            chain = {
+                "base": base["filename"],
+                "base_size": base["size"],
+                "differentials": len(differentials),
+                "differentials_size": sum(b["size"] for b in differentials),
+                "latest": differentials[0]["filename"] if differentials else base["filename"]
+            }
+
         return {
             "enabled": settings.backup_enabled,
+            "incremental": settings.backup_incremental,
+            "full_interval_hours": settings.backup_full_interval_hours,
+            "chain": chain,
+            "compression": resolve_compression(settings.backup_compression),
             "interval_hours": settings.backup_interval_hours,
             "backup_dir": self.backup_dir,
             "last_backup": last_backup,
             "last_error": self._last_backup_error,
+            "last_backup_metrics": self._last_backup_metrics,
             "count": len(backups),
             "total_size": total_size,
             "retention": {
@@ -0,0 +1,444 @@
+"""
+Content-addressed, reference-counted storage for image and document files.
+
+Stored files are keyed by the SHA-256 of their bytes, the one hash that can
+be recomputed from any stored file (uploads, restores and files stored before
+deduplication alike). A file whose content is already stored reuses the
+existing one instead of writing another copy. Image and document rows keep
+pointing at plain filenames, so identical files simply share one.
+
+Images are transcoded on upload, so their blobs also record the hash of the
+upload they were made from: uploading the same photo again reuses the stored
+WebP and thumbnail without transcoding.
+
+Reference counts are kept on the stored_blobs table and verified against the
+referencing rows before a file is removed. Garbage collection reconciles the
+counts, removes files nothing references any more (e.g. after an item and
+its attachments were cascade-deleted) and folds files stored before
+deduplication existed into the store.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.stored_blob import StoredBlob
+from ..models.image import Image
+from ..models.document import Document
+from .file_lookup_cache import file_lookup_cache
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK_SIZE = 1024 * 1024
+_BATCH_SIZE = 200
+
+IMAGE = "image"
+DOCUMENT = "document"
+
+_MODELS = {IMAGE: Image, DOCUMENT: Document}
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _blob_info(blob: StoredBlob) -> Dict[str, Any]:
+    return {
+        "content_hash": blob.content_hash,
+        "filename": blob.filename,
+        "thumbnail_filename": blob.thumbnail_filename,
+        "file_size": blob.file_size,
+        "width": blob.width,
+        "height": blob.height,
+    }
+
+
+class BlobStoreService:
+    """Service for sharing stored files between rows with identical content."""
+
+    def __init__(self):
+        self._locks: Dict[Tuple[str, str], list] = {}
+        self._gc_task: Optional[asyncio.Task] = None
+        self._gc_timer: Optional[asyncio.TimerHandle] = None
+        self.last_gc_result: Optional[Dict] = None
+
+    def _grace_cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(minutes=settings.blob_gc_grace_minutes)
+
+    def _file_path(self, kind: str, filename: str) -> str:
+        return os.path.join(settings.images_path if kind == IMAGE else settings.documents_path, filename)
+
+    async def hash_file(self, path: str) -> str:
+        """Hash a file without blocking the event loop"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, hash_file, path)
+
+    @asynccontextmanager
+    async def lock(self, kind: str, content_hash: str):
+        """Serialize saves of the same content so concurrent uploads store it once"""
+        key = (kind, content_hash)
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(key, None)
+
+    def claim(self, kind: str, content_hash: str, db: Optional[Session] = None) -> Optional[Dict[str, Any]]:
+        """
+        Take a reference on stored content.
+
+        Args:
+            db: Session to record the reference in (flushed, not committed);
+                a short-lived session is used when omitted
+
+        Returns:
+            The stored file's content_hash, filename, thumbnail_filename,
+            file_size, width and height, or None when the content is not stored (yet)
+        """
+        session = db or SessionLocal()
+        try:
+            info = self._claim(session, session.get(StoredBlob, (kind, content_hash)))
+            self._save(session, db)
+            return info
+        finally:
+            if db is None:
+                session.close()
+
+    def claim_source(self, kind: str, source_hash: str) -> Optional[Dict[str, Any]]:
+        """Like claim, but finds the stored file by the hash of the upload it was made from"""
+        db = SessionLocal()
+        try:
+            blob = db.query(StoredBlob).filter(
+                StoredBlob.kind == kind, StoredBlob.source_hash == source_hash
+            ).first()
+            info = self._claim(db, blob)
+            db.commit()
+            return info
+        finally:
+            db.close()
+
+    def _claim(self, session: Session, blob: Optional[StoredBlob]) -> Optional[Dict[str, Any]]:
+        if blob is not None and not os.path.exists(self._file_path(blob.kind, blob.filename)):
+            session.delete(blob)
+            blob = None
+
+        if blob is None:
+            return None
+
+        blob.ref_count = (blob.ref_count or 0) + 1
+        blob.last_used_at = datetime.utcnow()
+        return _blob_info(blob)
+
+    def register(
+        self,
+        kind: str,
+        content_hash: str,
+        filename: str,
+        file_size: int,
+        thumbnail_filename: Optional[str] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        source_hash: Optional[str] = None,
+        db: Optional[Session] = None
+    ) -> None:
+        """Record newly stored content with a single reference"""
+        session = db or SessionLocal()
+        try:
+            now = datetime.utcnow()
+            session.merge(StoredBlob(
+                kind=kind,
+                content_hash=content_hash,
+                source_hash=source_hash,
+                filename=filename,
+                thumbnail_filename=thumbnail_filename,
+                file_size=file_size,
+                width=width,
+                height=height,
+                ref_count=1,
+                created_at=now,
+                last_used_at=now
+            ))
+            self._save(session, db)
+        finally:
+            if db is None:
+                session.close()
+
+    def _save(self, session: Session, caller_db: Optional[Session]) -> None:
+        # Leave the transaction to callers that passed their own session
+        if caller_db is None:
+            session.commit()
+        else:
+            session.flush()
+
+    def update_stored_file(self, kind: str, filename: str, file_size: int, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Record new content of a stored file that was rewritten (an image's background re-encode).
+
+        Updates the blob and every row pointing at the file. If the new content
+        is already stored under another file, the rows are moved to that file.
+
+        Returns:
+            The blob the rows were moved to (the caller then removes the
+            rewritten file), or None
+        """
+        model = _MODELS[kind]
+        db = SessionLocal()
+        try:
+            blob = db.query(StoredBlob).filter(StoredBlob.kind == kind, StoredBlob.filename == filename).first()
+            rows = db.query(model).filter(model.filename == filename)
+
+            existing = db.get(StoredBlob, (kind, content_hash))
+            if existing is not None and existing is not blob:
+                if os.path.exists(self._file_path(kind, existing.filename)):
+                    moved = {"filename": existing.filename, "file_size": existing.file_size,
+                             "content_hash": content_hash}
+                    if kind == IMAGE:
+                        moved["thumbnail_filename"] = existing.thumbnail_filename
+                    existing.ref_count = (existing.ref_count or 0) + rows.update(moved, synchronize_session=False)
+                    existing.last_used_at = datetime.utcnow()
+                    if blob is not None:
+                        existing.source_hash = existing.source_hash or blob.source_hash
+                        db.delete(blob)
+                    db.commit()
+                    return _blob_info(existing)
+
+                db.delete(existing)
+                db.flush()
+
+            if blob is not None:
+                blob.content_hash = content_hash
+                blob.file_size = file_size
+            rows.update({"file_size": file_size, "content_hash": content_hash}, synchronize_session=False)
+            db.commit()
+            return None
+        finally:
+            db.close()
+
+    def release(self, kind: str, filename: str) -> bool:
+        """
+        Drop a reference after a row pointing at the file was deleted (and committed).
+
+        Returns:
+            True when nothing references the file any more and it can be removed
+        """
+        model = _MODELS[kind]
+        db = SessionLocal()
+        try:
+            remaining = db.query(func.count(model.id)).filter(model.filename == filename).scalar()
+            blob = db.query(StoredBlob).filter(StoredBlob.kind == kind, StoredBlob.filename == filename).first()
+
+            if blob is None:
+                # Stored before deduplication: one file per row
+                return remaining == 0
+
+            if remaining > 0:
+                blob.ref_count = remaining
+                db.commit()
+                return False
+
+            # A claim in the grace window may belong to an upload whose row is not committed yet;
+            # collect the file once the window has passed
+            last_used_at = blob.last_used_at.replace(tzinfo=None) if blob.last_used_at else None
+            if last_used_at and last_used_at > self._grace_cutoff():
+                blob.ref_count = 0
+                db.commit()
+                self._schedule_gc(last_used_at)
+                return False
+
+            db.delete(blob)
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+    def clear(self, db: Session) -> int:
+        """Forget all stored content (the caller removes the files)"""
+        return db.query(StoredBlob).delete()
+
+    # Garbage collection
+
+    def is_gc_running(self) -> bool:
+        return self._gc_task is not None and not self._gc_task.done()
+
+    def start_gc(self) -> bool:
+        """Start garbage collection in the background. Returns False if already running."""
+        if self.is_gc_running():
+            return False
+        self._gc_task = asyncio.create_task(self.collect_garbage())
+        return True
+
+    def _schedule_gc(self, last_used_at: datetime) -> None:
+        """Run garbage collection once the grace window of a blob used at ``last_used_at`` has passed"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Outside the event loop (e.g. a script); the next collection picks it up
+            return
+
+        delay = (last_used_at - self._grace_cutoff()).total_seconds() + 1
+        when = loop.time() + max(delay, 0)
+        if self._gc_timer is not None and not self._gc_timer.cancelled() and self._gc_timer.when() <= when:
+            return
+        if self._gc_timer is not None:
+            self._gc_timer.cancel()
+        self._gc_timer = loop.call_at(when, self._run_scheduled_gc)
+
+    def _run_scheduled_gc(self) -> None:
+        self._gc_timer = None
+        if not self.start_gc():
+            # A collection is already running; go again once it is done
+            self._gc_task.add_done_callback(lambda _: self.start_gc())
+
+    async def stop_gc(self) -> None:
+        if self._gc_timer is not None:
+            self._gc_timer.cancel()
+            self._gc_timer = None
+        if self.is_gc_running():
+            self._gc_task.cancel()
+            await asyncio.gather(self._gc_task, return_exceptions=True)
+
+    async def collect_garbage(self) -> Dict:
+        """
+        Reconcile reference counts and remove unreferenced files.
+
+        Returns:
+            Counts of legacy files adopted into the store, duplicate files
+            merged, blobs and orphan files removed and bytes freed
+        """
+        result = {"adopted": 0, "merged": 0, "removed_blobs": 0, "removed_orphans": 0, "bytes_freed": 0}
+        started_at = datetime.utcnow()
+
+        for kind in (IMAGE, DOCUMENT):
+            await self._adopt_legacy(kind, result)
+            await self._remove_unreferenced(kind, result)
+
+        result["duration_seconds"] = round((datetime.utcnow() - started_at).total_seconds(), 2)
+        self.last_gc_result = result
+        logger.info(f"Blob garbage collection finished: {result}")
+        return result
+
+    async def _adopt_legacy(self, kind: str, result: Dict) -> None:
+        """Hash rows stored before deduplication and point duplicates at one file"""
+        model = _MODELS[kind]
+        last_id = ""
+        while True:
+            db = SessionLocal()
+            try:
+                rows = db.query(model).filter(model.content_hash.is_(None), model.id > last_id) \
+                    .order_by(model.id).limit(_BATCH_SIZE).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                for row in rows:
+                    path = self._file_path(kind, row.filename)
+                    if not os.path.exists(path):
+                        continue
+                    content_hash = await self.hash_file(path)
+                    blob = db.get(StoredBlob, (kind, content_hash))
+
+                    if blob is None:
+                        db.add(StoredBlob(
+                            kind=kind,
+                            content_hash=content_hash,
+                            filename=row.filename,
+                            thumbnail_filename=getattr(row, "thumbnail_filename", None),
+                            file_size=row.file_size,
+                            width=getattr(row, "width", None),
+                            height=getattr(row, "height", None),
+                            ref_count=1
+                        ))
+                        # Make the new blob visible to the next rows of this batch
+                        db.flush()
+                        result["adopted"] += 1
+                    elif blob.filename != row.filename and os.path.exists(self._file_path(kind, blob.filename)):
+                        old_filename = row.filename
+                        old_thumbnail = getattr(row, "thumbnail_filename", None)
+                        row.filename = blob.filename
+                        row.file_size = blob.file_size
+                        if kind == IMAGE:
+                            row.thumbnail_filename = blob.thumbnail_filename
+                        blob.ref_count = (blob.ref_count or 0) + 1
+                        db.commit()
+                        result["bytes_freed"] += await self._delete_files(kind, old_filename, old_thumbnail)
+                        result["merged"] += 1
+
+                    row.content_hash = content_hash
+                    file_lookup_cache.invalidate(kind, row.id)
+                db.commit()
+            finally:
+                db.close()
+
+    async def _remove_unreferenced(self, kind: str, result: Dict) -> None:
+        """Delete blobs and stored files that no row references"""
+        model = _MODELS[kind]
+        cutoff = self._grace_cutoff()
+        db = SessionLocal()
+        try:
+            counts = dict(db.query(model.filename, func.count(model.id)).group_by(model.filename).all())
+            unreferenced = []
+            for blob in db.query(StoredBlob).filter(StoredBlob.kind == kind).all():
+                blob.ref_count = counts.get(blob.filename, 0)
+                last_used_at = blob.last_used_at.replace(tzinfo=None) if blob.last_used_at else None
+                if blob.ref_count == 0 and (last_used_at is None or last_used_at < cutoff):
+                    unreferenced.append((blob.filename, blob.thumbnail_filename))
+                    db.delete(blob)
+                elif blob.ref_count == 0:
+                    # Still in its grace window - come back for it
+                    self._schedule_gc(last_used_at)
+            db.commit()
+
+            known = set(counts) | {filename for filename, in db.query(StoredBlob.filename).filter(StoredBlob.kind == kind)}
+        finally:
+            db.close()
+
+        for filename, thumbnail_filename in unreferenced:
+            result["bytes_freed"] += await self._delete_files(kind, filename, thumbnail_filename)
+            result["removed_blobs"] += 1
+
+        # Files left behind by deletes made before deduplication existed
+        base = settings.images_path if kind == IMAGE else settings.documents_path
+        min_age = time.time() - settings.blob_gc_grace_minutes * 60
+        for entry in os.scandir(base):
+            if not entry.is_file() or entry.name.endswith(".tmp") or entry.name in known:
+                continue
+            if entry.stat().st_mtime >= min_age:
+                # Possibly an upload still in progress
+                continue
+            result["bytes_freed"] += await self._delete_files(kind, entry.name, None)
+            result["removed_orphans"] += 1
+
+    async def _delete_files(self, kind: str, filename: str, thumbnail_filename: Optional[str]) -> int:
+        """Remove a stored file (and an image's thumbnail and derivatives). Returns bytes freed."""
+        path = self._file_path(kind, filename)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+
+        if kind == IMAGE:
+            from .image_service import ImageService, thumbnail_filename_for
+            await ImageService().delete_image(filename, thumbnail_filename or thumbnail_filename_for(filename))
+        else:
+            from .storage_service import StorageService
+            await StorageService().delete_document(filename)
+        return size
+
+
+# Singleton instance
+blob_store_service = BlobStoreService()
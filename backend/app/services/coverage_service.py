@@ -0,0 +1,108 @@
+"""
+Coverage gap detection (items missing documents, images or purchase info).
+
+All gap types are computed in a single pass over the items table using
+correlated EXISTS checks and conditional aggregation; the same conditions
+drive the gap_filter parameter of the items listing.
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, exists, case, func, and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from ..models.item import Item
+from ..models.image import Image
+from ..models.document import Document
+
+GAP_TYPES = ["no_documents", "no_images", "high_value_undocumented", "no_purchase_info"]
+
+
+class CoverageService:
+    """Service for computing documentation coverage gaps."""
+
+    def gap_conditions(self, high_value_threshold: float) -> Dict[str, ColumnElement]:
+        """Boolean SQL expressions (over Item) selecting the items in each gap."""
+        has_documents = exists().where(Document.item_id == Item.id)
+        has_images = exists().where(Image.item_id == Item.id)
+
+        return {
+            "no_documents": ~has_documents,
+            "no_images": ~has_images,
+            "high_value_undocumented": and_(
+                Item.current_value >= high_value_threshold,
+                ~has_documents
+            ),
+            "no_purchase_info": or_(
+                Item.purchase_price.is_(None),
+                Item.purchase_date.is_(None)
+            ),
+        }
+
+    def gap_condition(self, gap_type: str, high_value_threshold: float) -> Optional[ColumnElement]:
+        """Condition for a single gap type, or None if the type is unknown."""
+        return self.gap_conditions(high_value_threshold).get(gap_type)
+
+    def compute_gaps(
+        self,
+        db: Session,
+        property_id: Optional[str],
+        high_value_threshold: float,
+        sample_size: int = 50
+    ) -> Dict[str, Dict]:
+        """
+        Count the items in every gap type and sample up to ``sample_size``
+        item IDs of each (newest first) with one query.
+
+        Gap flags are computed once per item; window functions then provide
+        the per-gap totals and row numbers, so only the sampled rows are
+        returned.
+        """
+        conditions = self.gap_conditions(high_value_threshold)
+
+        flags = select(
+            Item.id,
+            Item.created_at,
+            *[case((condition, 1), else_=0).label(gap) for gap, condition in conditions.items()]
+        )
+        if property_id:
+            flags = flags.where(Item.property_id == property_id)
+        flags = flags.subquery("gap_flags")
+
+        ranked = select(
+            flags.c.id,
+            *[flags.c[gap] for gap in GAP_TYPES],
+            *[func.sum(flags.c[gap]).over().label(f"{gap}_count") for gap in GAP_TYPES],
+            *[
+                func.row_number().over(
+                    partition_by=flags.c[gap],
+                    order_by=(flags.c.created_at.desc(), flags.c.id.desc())
+                ).label(f"{gap}_rank")
+                for gap in GAP_TYPES
+            ]
+        ).subquery("gap_ranks")
+
+        rows = db.execute(
+            select(ranked).where(or_(*[
+                and_(ranked.c[gap] == 1, ranked.c[f"{gap}_rank"] <= sample_size)
+                for gap in GAP_TYPES
+            ])).order_by(ranked.c.id)
+        ).mappings().all()
+
+        gaps = {gap: {"count": 0, "item_ids": []} for gap in GAP_TYPES}
+        samples: Dict[str, List[tuple]] = {gap: [] for gap in GAP_TYPES}
+
+        for row in rows:
+            for gap in GAP_TYPES:
+                gaps[gap]["count"] = int(row[f"{gap}_count"] or 0)
+                if row[gap] == 1 and row[f"{gap}_rank"] <= sample_size:
+                    samples[gap].append((row[f"{gap}_rank"], row["id"]))
+
+        for gap in GAP_TYPES:
+            gaps[gap]["item_ids"] = [item_id for _, item_id in sorted(samples[gap])]
+
+        return gaps
+
+
+# Singleton instance
+coverage_service = CoverageService()
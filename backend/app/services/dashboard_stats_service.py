@@ -0,0 +1,275 @@
+"""
+Materialized dashboard statistics.
+
+Aggregates (item counts/values per property, category and location, plus the
+number of fully documented items) live in the dashboard_stats table. They are
+kept current by diffing the contribution of every item touched by a session
+flush, so reading the dashboard never has to scan the items table.
+"""
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select, exists, func, and_, literal, delete, inspect as sa_inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.dashboard_stat import DashboardStat
+from ..models.item import Item
+from ..models.image import Image
+from ..models.document import Document
+
+logger = logging.getLogger(__name__)
+
+# Max IDs per IN (...) clause when snapshotting items
+_CHUNK_SIZE = 500
+
+StatKey = Tuple[str, str, str]  # (property_id, dimension, key)
+
+
+class DashboardStatsService:
+    """Service for maintaining and reading materialized dashboard aggregates."""
+
+    # ============== CONTRIBUTIONS ==============
+
+    def _snapshot(self, session: Session, item_ids: Iterable[str]) -> Dict[str, tuple]:
+        """Load the stat-relevant state of the given items as stored in the database."""
+        item_ids = [item_id for item_id in set(item_ids) if item_id]
+        has_images = exists().where(Image.item_id == Item.id)
+        has_documents = exists().where(Document.item_id == Item.id)
+
+        snapshot = {}
+        connection = session.connection()
+        for start in range(0, len(item_ids), _CHUNK_SIZE):
+            chunk = item_ids[start:start + _CHUNK_SIZE]
+            rows = connection.execute(
+                select(
+                    Item.id,
+                    Item.property_id,
+                    Item.category_id,
+                    Item.location_id,
+                    Item.current_value,
+                    and_(has_images, has_documents)
+                ).where(Item.id.in_(chunk))
+            )
+            for row in rows:
+                snapshot[row[0]] = tuple(row[1:])
+        return snapshot
+
+    def _contributions(self, snapshot: Dict[str, tuple], sign: int, deltas: Dict[StatKey, list]) -> None:
+        """Add (sign=1) or remove (sign=-1) items' contributions to a delta map."""
+        for property_id, category_id, location_id, current_value, documented in snapshot.values():
+            prop = property_id or ""
+            value = float(current_value or 0) * sign
+
+            for key in [(prop, "total", ""), (prop, "category", category_id or ""), (prop, "location", location_id or "")]:
+                deltas[key][0] += sign
+                deltas[key][1] += value
+
+            if documented:
+                deltas[(prop, "documented", "")][0] += sign
+
+    def _apply_deltas(self, session: Session, deltas: Dict[StatKey, list]) -> None:
+        """Upsert non-zero deltas into the stats table."""
+        rows = [
+            {
+                "property_id": prop,
+                "dimension": dimension,
+                "key": key,
+                "item_count": count,
+                "total_value": value,
+            }
+            for (prop, dimension, key), (count, value) in deltas.items()
+            if count or value
+        ]
+        if not rows:
+            return
+
+        stmt = sqlite_insert(DashboardStat.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["property_id", "dimension", "key"],
+            set_={
+                "item_count": DashboardStat.__table__.c.item_count + stmt.excluded.item_count,
+                "total_value": DashboardStat.__table__.c.total_value + stmt.excluded.total_value,
+            }
+        )
+        session.connection().execute(stmt, rows)
+
+    def _apply_change(self, session: Session, before: Dict[str, tuple], item_ids: Set[str]) -> None:
+        """Diff the pre-change snapshot against the current state and apply it."""
+        after = self._snapshot(session, item_ids)
+        deltas = defaultdict(lambda: [0, 0.0])
+        self._contributions(before, -1, deltas)
+        self._contributions(after, 1, deltas)
+        self._apply_deltas(session, deltas)
+
+    @contextmanager
+    def track_bulk_change(self, session: Session, item_ids: List[str]):
+        """
+        Keep stats current around bulk statements that bypass the flush
+        events (e.g. Query.update). The session is flushed before exit.
+        """
+        before = self._snapshot(session, item_ids)
+        yield
+        session.flush()
+        self._apply_change(session, before, set(item_ids))
+
+    # ============== SESSION EVENTS ==============
+
+    def _affected_item_ids(self, session: Session) -> Set[str]:
+        """IDs of items whose stats may change in the pending flush."""
+        item_ids = set()
+
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, Item):
+                if obj.id:
+                    item_ids.add(obj.id)
+            elif isinstance(obj, (Image, Document)):
+                if obj.item_id:
+                    item_ids.add(obj.item_id)
+                elif obj.item is not None and obj.item.id:
+                    item_ids.add(obj.item.id)
+                # Images/documents moved to another item affect the old one too
+                history = sa_inspect(obj).attrs.item_id.history
+                item_ids.update(value for value in history.deleted if value)
+
+        return item_ids
+
+    def _before_flush(self, session: Session, flush_context, instances) -> None:
+        if not any(
+            isinstance(obj, (Item, Image, Document))
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        ):
+            return
+
+        item_ids = self._affected_item_ids(session)
+        session.info["dashboard_stats_pending"] = {
+            "before": self._snapshot(session, item_ids),
+            # New items get their IDs during the flush, so keep the objects around
+            "objects": [
+                obj for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+                if isinstance(obj, (Item, Image, Document))
+            ],
+        }
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        pending = session.info.pop("dashboard_stats_pending", None)
+        if not pending:
+            return
+
+        item_ids = set(pending["before"])
+        for obj in pending["objects"]:
+            item_id = obj.id if isinstance(obj, Item) else obj.item_id
+            if item_id:
+                item_ids.add(item_id)
+
+        self._apply_change(session, pending["before"], item_ids)
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop("dashboard_stats_pending", None)
+
+    def register_events(self) -> None:
+        """Hook incremental maintenance into every application session."""
+        event.listen(SessionLocal, "before_flush", self._before_flush)
+        event.listen(SessionLocal, "after_flush", self._after_flush)
+        event.listen(SessionLocal, "after_rollback", self._after_rollback)
+
+    # ============== REBUILD ==============
+
+    def rebuild(self, db: Session) -> Dict[str, int]:
+        """
+        Recompute all aggregates from the items table.
+
+        Used at startup and for drift correction after writes that bypass the
+        ORM (raw SQL migrations, bulk deletes/inserts).
+        """
+        table = DashboardStat.__table__
+        columns = ["property_id", "dimension", "key", "item_count", "total_value"]
+        prop = func.coalesce(Item.property_id, "")
+        value = func.coalesce(func.sum(Item.current_value), 0)
+
+        selects = [
+            select(prop, literal("total"), literal(""), func.count(Item.id), value)
+            .group_by(prop),
+            select(prop, literal("category"), func.coalesce(Item.category_id, ""), func.count(Item.id), value)
+            .group_by(prop, func.coalesce(Item.category_id, "")),
+            select(prop, literal("location"), func.coalesce(Item.location_id, ""), func.count(Item.id), value)
+            .group_by(prop, func.coalesce(Item.location_id, "")),
+            select(prop, literal("documented"), literal(""), func.count(Item.id), value)
+            .where(
+                exists().where(Image.item_id == Item.id),
+                exists().where(Document.item_id == Item.id)
+            )
+            .group_by(prop),
+        ]
+
+        db.execute(delete(table))
+        for stmt in selects:
+            db.execute(table.insert().from_select(columns, stmt))
+        db.commit()
+
+        row_count = db.query(func.count()).select_from(table).scalar()
+        logger.info(f"Dashboard stats rebuilt ({row_count} rows)")
+        return {"rows": row_count}
+
+    def rebuild_all(self) -> Dict[str, int]:
+        """Rebuild using a fresh session (startup)."""
+        db = SessionLocal()
+        try:
+            return self.rebuild(db)
+        finally:
+            db.close()
+
+    # ============== READ ==============
+
+    def get_summary(self, db: Session, property_id: Optional[str] = None) -> Dict:
+        """
+        Read the materialized aggregates.
+
+        Returns totals, counts per category/location id, inventory value per
+        property and the number of fully documented items. Location counts
+        span all properties since locations are filtered by their own
+        property by the caller.
+        """
+        summary = {
+            "total_items": 0,
+            "total_value": 0.0,
+            "documented_items": 0,
+            "category_counts": defaultdict(int),
+            "location_counts": defaultdict(int),
+            "property_values": defaultdict(float),
+        }
+
+        for stat in db.query(DashboardStat).all():
+            in_scope = not property_id or stat.property_id == property_id
+            count = stat.item_count or 0
+            value = float(stat.total_value or 0)
+
+            if stat.dimension == "location":
+                if stat.key:
+                    summary["location_counts"][stat.key] += count
+                continue
+
+            if not in_scope:
+                if stat.dimension == "total" and stat.property_id:
+                    summary["property_values"][stat.property_id] += value
+                continue
+
+            if stat.dimension == "total":
+                summary["total_items"] += count
+                summary["total_value"] += value
+                if stat.property_id:
+                    summary["property_values"][stat.property_id] += value
+            elif stat.dimension == "category" and stat.key:
+                summary["category_counts"][stat.key] += count
+            elif stat.dimension == "documented":
+                summary["documented_items"] += count
+
+        return summary
+
+
+# Singleton instance
+dashboard_stats_service = DashboardStatsService()
+dashboard_stats_service.register_events()
@@ -1,20 +1,26 @@
 """
 Service for exporting all data to a ZIP archive.
+
+The archive is produced as a stream: ZIP entries are written straight into
+an in-memory buffer that is drained after every chunk, table rows are read
+with yield_per and serialized one at a time, and stored files are copied in
+chunks. Memory stays flat regardless of the size of the inventory, and
+nothing is staged on disk.
 """
 import json
 import csv
 import io
 import os
-import shutil
 import tempfile
 import zipfile
 import logging
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, Optional, Set
 
 from sqlalchemy.orm import Session
 
 from ..config import settings
+from ..database import SessionLocal
 from ..models.item import Item
 from ..models.category import Category
 from ..models.location import Location
@@ -25,6 +31,99 @@ from ..models.document import Document
 
 logger = logging.getLogger(__name__)
 
+# Tables with stored files, and the archive folder of their files
+_FILE_FOLDERS = {Image: "images", Document: "documents"}
+
+# Tables in data.json, in the order the restore expects them
+_TABLES = [
+    ("properties", Property),
+    ("categories", Category),
+    ("locations", Location),
+    ("items", Item),
+    ("insurance_policies", InsurancePolicy),
+    ("images", Image),
+    ("documents", Document),
+]
+
+# Already-compressed formats are stored as-is instead of being deflated again
+_STORED_EXTENSIONS = {
+    ".webp", ".jpg", ".jpeg", ".png", ".gif", ".heic", ".pdf",
+    ".zip", ".gz", ".docx", ".xlsx", ".pptx", ".mp4", ".mov",
+}
+
+_YIELD_PER = 500
+_CHUNK_SIZE = 256 * 1024
+
+_ITEMS_CSV_FIELDS = [
+    'id', 'name', 'description', 'property_name', 'category_name',
+    'location_name', 'manufacturer', 'model_number', 'serial_number',
+    'condition', 'quantity', 'purchase_date', 'purchase_price',
+    'current_value', 'currency', 'warranty_expiration', 'barcode',
+    'tags', 'notes', 'created_at'
+]
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """
+    Write-only, non-seekable sink for ZipFile.
+
+    ZipFile falls back to data descriptors when it cannot seek, so entries
+    can be emitted as soon as they are written. Writers drain it once
+    _CHUNK_SIZE bytes are pending, so the response goes out in full chunks.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    @property
+    def full(self) -> bool:
+        return self._size >= _CHUNK_SIZE
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self._size = 0
+        return data
+
+
+class _ArchiveNamer:
+    """
+    Names stored files in the archive: <folder>/<item_id>/<original filename>,
+    numbered on repeats within an item. Rows must come ordered by item.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._item_id = None
+        self._used: Set[str] = set()
+
+    def name(self, item_id: Optional[str], filename: Optional[str], original_filename: Optional[str]) -> Optional[str]:
+        if not item_id or not filename:
+            return None
+        if item_id != self._item_id:
+            self._item_id = item_id
+            self._used = set()
+
+        # Use original filename if available; number duplicates within an item
+        dst_filename = original_filename or filename
+        arcname = f"{self.folder}/{item_id}/{dst_filename}"
+        counter = 1
+        base, ext = os.path.splitext(dst_filename)
+        while arcname in self._used:
+            arcname = f"{self.folder}/{item_id}/{base}_{counter}{ext}"
+            counter += 1
+        self._used.add(arcname)
+        return arcname
+
 
 class ExportService:
     """Service for exporting all data to ZIP archive."""
@@ -43,200 +142,158 @@ class ExportService:
             result[column.name] = value
         return result
 
-    def _get_all_data(self, db: Session) -> Dict[str, Any]:
-        """Query all data from the database."""
-        # Get all records
-        properties = db.query(Property).all()
-        categories = db.query(Category).all()
-        locations = db.query(Location).all()
-        items = db.query(Item).all()
-        insurance_policies = db.query(InsurancePolicy).all()
-        images = db.query(Image).all()
-        documents = db.query(Document).all()
-
-        # Build lookup maps for names
-        property_map = {p.id: p.name for p in properties}
-        category_map = {c.id: c.name for c in categories}
-        location_map = {l.id: l.name for l in locations}
-
-        # Serialize all data
+    def _items_csv_row(self, item: Dict[str, Any], lookups: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+        """Flatten a serialized item into an items.csv row."""
         return {
-            "export_date": datetime.utcnow().isoformat() + "Z",
-            "version": "1.0",
-            "properties": [self._serialize_model(p) for p in properties],
-            "categories": [self._serialize_model(c) for c in categories],
-            "locations": [self._serialize_model(l) for l in locations],
-            "items": [self._serialize_model(i) for i in items],
-            "insurance_policies": [self._serialize_model(p) for p in insurance_policies],
-            "images": [self._serialize_model(img) for img in images],
-            "documents": [self._serialize_model(doc) for doc in documents],
-            "_lookups": {
-                "properties": property_map,
-                "categories": category_map,
-                "locations": location_map,
-            }
+            'id': item.get('id'),
+            'name': item.get('name'),
+            'description': item.get('description'),
+            'property_name': lookups["properties"].get(item.get('property_id'), ''),
+            'category_name': lookups["categories"].get(item.get('category_id'), ''),
+            'location_name': lookups["locations"].get(item.get('location_id'), ''),
+            'manufacturer': item.get('manufacturer'),
+            'model_number': item.get('model_number'),
+            'serial_number': item.get('serial_number'),
+            'condition': item.get('condition'),
+            'quantity': item.get('quantity'),
+            'purchase_date': item.get('purchase_date'),
+            'purchase_price': item.get('purchase_price'),
+            'current_value': item.get('current_value'),
+            'currency': item.get('currency'),
+            'warranty_expiration': item.get('warranty_expiration'),
+            'barcode': item.get('barcode'),
+            'tags': ','.join(item.get('tags') or []) if item.get('tags') else '',
+            'notes': item.get('notes'),
+            'created_at': item.get('created_at'),
         }
 
-    def _generate_items_csv(self, data: Dict[str, Any]) -> str:
-        """Generate CSV content for items."""
-        output = io.StringIO()
-
-        fieldnames = [
-            'id', 'name', 'description', 'property_name', 'category_name',
-            'location_name', 'manufacturer', 'model_number', 'serial_number',
-            'condition', 'quantity', 'purchase_date', 'purchase_price',
-            'current_value', 'currency', 'warranty_expiration', 'barcode',
-            'tags', 'notes', 'created_at'
-        ]
-
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-
-        lookups = data.get("_lookups", {})
-        property_map = lookups.get("properties", {})
-        category_map = lookups.get("categories", {})
-        location_map = lookups.get("locations", {})
-
-        for item in data.get("items", []):
-            row = {
-                'id': item.get('id'),
-                'name': item.get('name'),
-                'description': item.get('description'),
-                'property_name': property_map.get(item.get('property_id'), ''),
-                'category_name': category_map.get(item.get('category_id'), ''),
-                'location_name': location_map.get(item.get('location_id'), ''),
-                'manufacturer': item.get('manufacturer'),
-                'model_number': item.get('model_number'),
-                'serial_number': item.get('serial_number'),
-                'condition': item.get('condition'),
-                'quantity': item.get('quantity'),
-                'purchase_date': item.get('purchase_date'),
-                'purchase_price': item.get('purchase_price'),
-                'current_value': item.get('current_value'),
-                'currency': item.get('currency'),
-                'warranty_expiration': item.get('warranty_expiration'),
-                'barcode': item.get('barcode'),
-                'tags': ','.join(item.get('tags') or []) if item.get('tags') else '',
-                'notes': item.get('notes'),
-                'created_at': item.get('created_at'),
-            }
-            writer.writerow(row)
-
-        return output.getvalue()
+    def get_export_filename(self) -> str:
+        """Timestamped filename for an export archive."""
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        return f"homeregistry_export_{timestamp}.zip"
 
-    def create_export_zip(self, db: Session) -> str:
+    def iter_export_zip(self, db: Optional[Session] = None) -> Iterator[bytes]:
         """
-        Create a ZIP archive with all data.
+        Generate a ZIP archive with all data, chunk by chunk.
 
-        Returns the path to the created ZIP file.
+        Contents:
+        - data.json: All structured data, one table after another
+        - items.csv: Spreadsheet-friendly flat export of items
+        - images/<item_id>/: Item images under their original filenames
+        - documents/<item_id>/: Item documents under their original filenames
+
+        Args:
+            db: Session to read from; a dedicated session is opened (and
+                closed) when omitted, which is what streaming responses need
         """
         logger.info("Starting data export...")
+        session = db or SessionLocal()
+        sink = _ChunkBuffer()
+        try:
+            with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                yield from self._write_data_json(zipf, sink, session)
+                yield from self._write_items_csv(zipf, sink, session)
+                yield from self._write_files(zipf, sink, session, Image, settings.images_path)
+                yield from self._write_files(zipf, sink, session, Document, settings.documents_path)
+            # The last partial chunk and the central directory
+            yield sink.drain()
+            logger.info("Export finished")
+        finally:
+            if db is None:
+                session.close()
+
+    def _write_data_json(self, zipf: zipfile.ZipFile, sink: _ChunkBuffer, db: Session) -> Iterator[bytes]:
+        with zipf.open("data.json", "w", force_zip64=True) as entry:
+            header = {"export_date": datetime.utcnow().isoformat() + "Z", "version": "1.0"}
+            # Open the top-level object; each table is appended as its own array
+            entry.write(json.dumps(header, ensure_ascii=False)[:-1].encode("utf-8"))
+
+            for key, model in _TABLES:
+                entry.write(f', "{key}": ['.encode("utf-8"))
+                separator = "\n  "
+
+                # Rows with files record the name of their file in the archive
+                query = db.query(model)
+                namer = None
+                if model in _FILE_FOLDERS:
+                    query = query.order_by(model.item_id, model.id)
+                    namer = _ArchiveNamer(_FILE_FOLDERS[model])
+
+                for row in query.yield_per(_YIELD_PER):
+                    data = self._serialize_model(row)
+                    if namer is not None:
+                        data["archive_name"] = namer.name(row.item_id, row.filename, row.original_filename)
+                    record = json.dumps(data, ensure_ascii=False)
+                    entry.write((separator + record).encode("utf-8"))
+                    separator = ",\n  "
+                    if sink.full:
+                        yield sink.drain()
+                entry.write(b"]")
+                db.expunge_all()
+
+            entry.write(b"}\n")
+
+    def _write_items_csv(self, zipf: zipfile.ZipFile, sink: _ChunkBuffer, db: Session) -> Iterator[bytes]:
+        # Name lookups for the flat item rows (small tables)
+        lookups = {
+            "properties": dict(db.query(Property.id, Property.name).all()),
+            "categories": dict(db.query(Category.id, Category.name).all()),
+            "locations": dict(db.query(Location.id, Location.name).all()),
+        }
 
-        # Get all data
-        data = self._get_all_data(db)
+        with zipf.open("items.csv", "w", force_zip64=True) as entry:
+            text = io.TextIOWrapper(entry, encoding="utf-8", newline="", write_through=True)
+            writer = csv.DictWriter(text, fieldnames=_ITEMS_CSV_FIELDS)
+            writer.writeheader()
+            for item in db.query(Item).yield_per(_YIELD_PER):
+                writer.writerow(self._items_csv_row(self._serialize_model(item), lookups))
+                if sink.full:
+                    yield sink.drain()
+            text.flush()
+            text.detach()
+        db.expunge_all()
+
+    def _write_files(self, zipf: zipfile.ZipFile, sink: _ChunkBuffer, db: Session,
+                     model, base_path: str) -> Iterator[bytes]:
+        """Copy stored files under the archive names data.json records for them."""
+        namer = _ArchiveNamer(_FILE_FOLDERS[model])
+        rows = db.query(model.item_id, model.filename, model.original_filename) \
+            .order_by(model.item_id, model.id).yield_per(_YIELD_PER)
+
+        for item_id, filename, original_filename in rows:
+            # Named before the existence check, so a missing file does not shift the others
+            arcname = namer.name(item_id, filename, original_filename)
+            if arcname is None:
+                continue
+
+            src_path = os.path.join(base_path, filename)
+            if not os.path.exists(src_path):
+                logger.warning(f"Export file not found: {src_path}")
+                continue
+
+            info = zipfile.ZipInfo.from_file(src_path, arcname)
+            stored = os.path.splitext(filename)[1].lower() in _STORED_EXTENSIONS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+
+            with open(src_path, "rb") as src, zipf.open(info, "w", force_zip64=True) as entry:
+                for chunk in iter(lambda: src.read(_CHUNK_SIZE), b""):
+                    entry.write(chunk)
+                    if sink.full:
+                        yield sink.drain()
 
-        # Create temp directory for building the archive
-        temp_dir = tempfile.mkdtemp(prefix="homeregistry_export_")
+    def create_export_zip(self, db: Session) -> str:
+        """
+        Write the export archive to a file in the temp directory.
 
-        try:
-            # Create data.json (without internal lookups)
-            json_data = {k: v for k, v in data.items() if not k.startswith('_')}
-            json_path = os.path.join(temp_dir, "data.json")
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2, ensure_ascii=False)
-
-            # Create items.csv
-            csv_content = self._generate_items_csv(data)
-            csv_path = os.path.join(temp_dir, "items.csv")
-            with open(csv_path, 'w', encoding='utf-8') as f:
-                f.write(csv_content)
-
-            # Create images directory and copy files
-            images_dir = os.path.join(temp_dir, "images")
-            os.makedirs(images_dir, exist_ok=True)
-
-            for image in data.get("images", []):
-                item_id = image.get("item_id")
-                filename = image.get("filename")
-                original_filename = image.get("original_filename", filename)
-
-                if item_id and filename:
-                    # Create item subdirectory
-                    item_images_dir = os.path.join(images_dir, item_id)
-                    os.makedirs(item_images_dir, exist_ok=True)
-
-                    # Source path
-                    src_path = os.path.join(settings.images_path, filename)
-
-                    if os.path.exists(src_path):
-                        # Use original filename if available, otherwise use stored filename
-                        dst_filename = original_filename or filename
-                        dst_path = os.path.join(item_images_dir, dst_filename)
-
-                        # Handle duplicate filenames
-                        counter = 1
-                        base, ext = os.path.splitext(dst_filename)
-                        while os.path.exists(dst_path):
-                            dst_filename = f"{base}_{counter}{ext}"
-                            dst_path = os.path.join(item_images_dir, dst_filename)
-                            counter += 1
-
-                        shutil.copy2(src_path, dst_path)
-                    else:
-                        logger.warning(f"Image file not found: {src_path}")
-
-            # Create documents directory and copy files
-            documents_dir = os.path.join(temp_dir, "documents")
-            os.makedirs(documents_dir, exist_ok=True)
-
-            for document in data.get("documents", []):
-                item_id = document.get("item_id")
-                filename = document.get("filename")
-                original_filename = document.get("original_filename", filename)
-
-                if item_id and filename:
-                    # Create item subdirectory
-                    item_docs_dir = os.path.join(documents_dir, item_id)
-                    os.makedirs(item_docs_dir, exist_ok=True)
-
-                    # Source path
-                    src_path = os.path.join(settings.documents_path, filename)
-
-                    if os.path.exists(src_path):
-                        # Use original filename if available
-                        dst_filename = original_filename or filename
-                        dst_path = os.path.join(item_docs_dir, dst_filename)
-
-                        # Handle duplicate filenames
-                        counter = 1
-                        base, ext = os.path.splitext(dst_filename)
-                        while os.path.exists(dst_path):
-                            dst_filename = f"{base}_{counter}{ext}"
-                            dst_path = os.path.join(item_docs_dir, dst_filename)
-                            counter += 1
-
-                        shutil.copy2(src_path, dst_path)
-                    else:
-                        logger.warning(f"Document file not found: {src_path}")
-
-            # Create the ZIP file
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-            zip_filename = f"homeregistry_export_{timestamp}.zip"
-            zip_path = os.path.join(tempfile.gettempdir(), zip_filename)
-
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, temp_dir)
-                        zipf.write(file_path, arcname)
-
-            logger.info(f"Export created: {zip_path}")
-            return zip_path
+        Returns the path to the created ZIP file.
+        """
+        zip_path = os.path.join(tempfile.gettempdir(), self.get_export_filename())
+        with open(zip_path, "wb") as f:
+            for chunk in self.iter_export_zip(db):
+                f.write(chunk)
 
-        finally:
-            # Clean up temp directory
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        logger.info(f"Export created: {zip_path}")
+        return zip_path
 
 
 # Singleton instance
@@ -0,0 +1,50 @@
+"""
+In-memory LRU of file metadata for the file-serving endpoints.
+
+Maps image/document IDs to what is needed to serve them (stored filename,
+dimensions, known ETags), so conditional requests for files the browser
+already has are answered without touching the database or the disk.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+
+CacheKey = Tuple[str, str]  # (kind, id)
+
+
+class FileLookupCache:
+    """Bounded, thread-safe LRU keyed by (kind, id)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, record_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get((kind, record_id))
+            if entry is not None:
+                self._entries.move_to_end((kind, record_id))
+            return entry
+
+    def set(self, kind: str, record_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._entries[(kind, record_id)] = entry
+            self._entries.move_to_end((kind, record_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def invalidate(self, kind: str, record_id: str) -> None:
+        with self._lock:
+            self._entries.pop((kind, record_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Singleton instance
+file_lookup_cache = FileLookupCache(settings.file_lookup_cache_size)
@@ -0,0 +1,140 @@
+"""
+Resized image derivatives, generated on first request.
+
+Requested widths are rounded up to a fixed set of buckets so a handful of
+files per image cover every screen. Derivatives are encoded in the image
+worker pool and cached on disk; once the cache exceeds its size budget the
+least recently served files are evicted (file mtime is the LRU clock).
+"""
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from ..config import settings, image_derivative_widths
+from .image_worker_pool import image_worker_pool
+
+logger = logging.getLogger(__name__)
+
+
+def create_derivative(source_path: str, dest_path: str, width: int) -> int:
+    """
+    Write a WebP copy of an image scaled to the given width.
+    Runs in the image worker processes, so it must stay a module-level function.
+
+    Returns:
+        Size of the derivative in bytes
+    """
+    with Image.open(source_path) as image:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+
+    temp_path = f"{dest_path}.tmp"
+    resized.save(temp_path, "WEBP", quality=80, method=4)
+    os.replace(temp_path, dest_path)
+    return os.path.getsize(dest_path)
+
+
+class ImageDerivativeService:
+    """Service for serving width-bucketed image variants."""
+
+    def __init__(self):
+        self.images_path = settings.images_path
+        self.derivatives_path = os.path.join(settings.images_path, "derivatives")
+        self._generating: Dict[str, asyncio.Future] = {}
+        self._total_bytes: Optional[int] = None
+
+    def get_bucket(self, width: int) -> Optional[int]:
+        """Smallest bucket at least as wide as requested, None above the largest."""
+        for bucket in sorted(image_derivative_widths):
+            if bucket >= width:
+                return bucket
+        return None
+
+    def _derivative_filename(self, filename: str, width: int) -> str:
+        return f"{filename.rsplit('.', 1)[0]}_w{width}.webp"
+
+    async def get_path(self, filename: str, original_width: Optional[int], width: int) -> str:
+        """
+        Path of the image served at (at least) the requested width.
+
+        Falls back to the main image when the bucket would not be smaller
+        than the stored image.
+        """
+        source_path = os.path.join(self.images_path, filename)
+        bucket = self.get_bucket(width)
+        if bucket is None or (original_width and bucket >= original_width):
+            return source_path
+
+        dest_path = os.path.join(self.derivatives_path, self._derivative_filename(filename, bucket))
+        if os.path.exists(dest_path):
+            # Mark as recently used for LRU eviction
+            os.utime(dest_path)
+            return dest_path
+
+        # Share a single generation between concurrent requests
+        future = self._generating.get(dest_path)
+        if future is None:
+            future = asyncio.ensure_future(self._generate(source_path, dest_path, bucket))
+            self._generating[dest_path] = future
+            future.add_done_callback(lambda _: self._generating.pop(dest_path, None))
+
+        await asyncio.shield(future)
+        return dest_path
+
+    async def _generate(self, source_path: str, dest_path: str, width: int) -> None:
+        os.makedirs(self.derivatives_path, exist_ok=True)
+        size = await image_worker_pool.run(create_derivative, source_path, dest_path, width)
+
+        if self._total_bytes is None:
+            self._total_bytes = self._scan_total_bytes()
+        else:
+            self._total_bytes += size
+
+        if self._total_bytes > settings.image_derivative_cache_mb * 1024 * 1024:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._evict)
+
+    def _list_files(self) -> List[os.DirEntry]:
+        if not os.path.isdir(self.derivatives_path):
+            return []
+        return [entry for entry in os.scandir(self.derivatives_path) if entry.is_file()]
+
+    def _scan_total_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in self._list_files())
+
+    def _evict(self) -> None:
+        """Delete least recently used derivatives until 90% of the budget."""
+        target = settings.image_derivative_cache_mb * 1024 * 1024 * 0.9
+        entries = sorted(self._list_files(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+
+        removed = 0
+        for entry in entries:
+            if total <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        self._total_bytes = total
+        if removed:
+            logger.info(f"Evicted {removed} image derivative(s)")
+
+    def delete_derivatives(self, filename: str) -> None:
+        """Remove all cached derivatives of an image."""
+        for width in image_derivative_widths:
+            path = os.path.join(self.derivatives_path, self._derivative_filename(filename, width))
+            if os.path.exists(path):
+                os.remove(path)
+        self._total_bytes = None
+
+
+# Singleton instance
+image_derivative_service = ImageDerivativeService()
@@ -1,11 +1,112 @@
 from PIL import Image
 import os
 import uuid
-from typing import Tuple
-import io
+import shutil
+import logging
+from typing import Optional, Tuple
 import asyncio
-import functools
 from ..config import settings
+from ..database import SessionLocal
+from .image_worker_pool import image_worker_pool
+from .image_derivative_service import image_derivative_service
+from .file_lookup_cache import file_lookup_cache
+from .blob_store_service import blob_store_service, hash_file, IMAGE
+
+logger = logging.getLogger(__name__)
+
+# Main images are scaled down to this width
+MAX_IMAGE_WIDTH = 1920
+
+# Thumbnails fit within this box
+THUMBNAIL_SIZE = (300, 300)
+
+
+def thumbnail_filename_for(filename: str) -> str:
+    """Thumbnail filename belonging to a stored image filename"""
+    return f"{filename.rsplit('.', 1)[0]}_thumb.webp"
+
+
+def create_thumbnail(source_path: str, thumbnail_path: str) -> None:
+    """
+    Write a WebP thumbnail of an image file.
+    Runs in the image worker processes, so it must stay a module-level function.
+    """
+    with Image.open(source_path) as image:
+        _save_thumbnail(image, thumbnail_path)
+
+
+def _save_thumbnail(image: Image.Image, thumbnail_path: str) -> None:
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    thumbnail.save(thumbnail_path, "WEBP", quality=75)
+
+
+def _load_resized(source_path: str) -> Image.Image:
+    """Open an image and scale it down to MAX_IMAGE_WIDTH if needed"""
+    image = Image.open(source_path)
+    image.load()
+
+    width, height = image.size
+    if width > MAX_IMAGE_WIDTH:
+        ratio = MAX_IMAGE_WIDTH / width
+        new_height = int(height * ratio)
+        image = image.resize((MAX_IMAGE_WIDTH, new_height), Image.Resampling.LANCZOS)
+
+    return image
+
+
+def transcode_image(source_path: str, filepath: str, thumbnail_path: str, method: int) -> Tuple[int, int, int]:
+    """
+    Resize and save an uploaded image as WebP, plus its thumbnail.
+    Runs in the image worker processes, so it must stay a module-level function.
+
+    Args:
+        method: WebP encoder effort (0 = fastest, 6 = smallest output)
+
+    Returns:
+        Tuple of (file_size, width, height)
+    """
+    image = _load_resized(source_path)
+    width, height = image.size
+
+    # Save as WebP for best compression/quality ratio
+    image.save(filepath, "WEBP", quality=80, method=method)
+    file_size = os.path.getsize(filepath)
+
+    _save_thumbnail(image, thumbnail_path)
+
+    return file_size, width, height
+
+
+def reencode_image(source_path: str, filepath: str, method: int) -> Tuple[int, Optional[str]]:
+    """
+    Re-encode a stored image from its original upload at higher compression.
+    The stored file is replaced atomically and the original removed. Until
+    then the image is served without an immutable Cache-Control (see
+    ImageService.is_reencode_pending).
+
+    Returns:
+        Tuple of (new file size, SHA-256 of the new content); (0, None) if the
+        image was deleted in the meantime, the size and None if it was kept
+    """
+    try:
+        if not os.path.exists(filepath):
+            return 0, None
+
+        image = _load_resized(source_path)
+        temp_path = f"{filepath}.tmp"
+        image.save(temp_path, "WEBP", quality=80, method=method)
+
+        # Only keep the result if it is actually smaller
+        if os.path.getsize(temp_path) >= os.path.getsize(filepath):
+            os.remove(temp_path)
+            return os.path.getsize(filepath), None
+
+        os.replace(temp_path, filepath)
+        return os.path.getsize(filepath), hash_file(filepath)
+    finally:
+        if os.path.exists(source_path):
+            os.remove(source_path)
 
 
 class ImageService:
@@ -14,82 +115,168 @@ class ImageService:
     def __init__(self):
         self.images_path = settings.images_path
         self.thumbnails_path = os.path.join(settings.images_path, "thumbnails")
+        self.pending_path = os.path.join(settings.images_path, "pending")
 
-    async def save_image(self, file_content: bytes, original_filename: str) -> Tuple[str, str, int, int, int]:
+    async def save_image(self, source_path: str, original_filename: str) -> Tuple[str, str, int, int, int, str]:
         """
-        Save image and create thumbnail using run_in_executor to avoid blocking
+        Save image and create thumbnail in the image worker pool
+
+        Uploads are deduplicated by content: if the same bytes were uploaded
+        before, the stored WebP and thumbnail are reused without transcoding.
+        The returned content_hash is that of the stored WebP, like for
+        restored images, so identical stored files are shared too.
+
+        The image is first encoded with a fast WebP setting so the request
+        returns quickly; when background re-encoding is enabled, a copy of the
+        original is kept and re-encoded at maximum compression later.
+
+        Args:
+            source_path: Path to the uploaded (spooled) image file; left in place
+            original_filename: Original filename
+
+        Returns:
+            Tuple of (filename, thumbnail_filename, file_size, width, height, content_hash)
+
+        Raises:
+            HTTPException(503): When the image worker pool is saturated
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, 
-            self._process_and_save, 
-            file_content, 
-            original_filename
-        )
+        source_hash = await blob_store_service.hash_file(source_path)
+
+        async with blob_store_service.lock(IMAGE, source_hash):
+            blob = blob_store_service.claim_source(IMAGE, source_hash)
+            if blob is not None:
+                return (
+                    blob["filename"], blob["thumbnail_filename"], blob["file_size"],
+                    blob["width"], blob["height"], blob["content_hash"]
+                )
+
+            # Generate unique filename - prefer webp for efficiency
+            filename = f"{uuid.uuid4()}.webp"
+            filepath = os.path.join(self.images_path, filename)
+            thumbnail_filename = thumbnail_filename_for(filename)
+            thumbnail_path = os.path.join(self.thumbnails_path, thumbnail_filename)
+
+            background = settings.image_background_reencode
+            method = settings.image_fast_encode_method if background else settings.image_final_encode_method
 
-    def _process_and_save(self, file_content: bytes, original_filename: str) -> Tuple[str, str, int, int, int]:
-        """Synchronous part of image processing"""
-        # Generate unique filename - prefer webp for efficiency
-        filename = f"{uuid.uuid4()}.webp"
+            file_size, width, height = await image_worker_pool.run(
+                transcode_image, source_path, filepath, thumbnail_path, method
+            )
+            content_hash = await blob_store_service.hash_file(filepath)
+
+            # A different upload may have produced the very same file
+            blob = blob_store_service.claim(IMAGE, content_hash)
+            if blob is not None:
+                await self.delete_image(filename, thumbnail_filename)
+                return (
+                    blob["filename"], blob["thumbnail_filename"], blob["file_size"],
+                    blob["width"], blob["height"], content_hash
+                )
+
+            blob_store_service.register(
+                IMAGE, content_hash, filename, file_size,
+                thumbnail_filename=thumbnail_filename, width=width, height=height,
+                source_hash=source_hash
+            )
+
+        if background:
+            pending_source = os.path.join(self.pending_path, filename)
+            await asyncio.get_event_loop().run_in_executor(None, self._keep_original, source_path, pending_source)
+            self._schedule_reencode(filename)
+
+        return filename, thumbnail_filename, file_size, width, height, content_hash
+
+    def _keep_original(self, source_path: str, pending_source: str) -> None:
+        """Keep the original upload for the background re-encode (hard link when possible)"""
+        os.makedirs(self.pending_path, exist_ok=True)
+        try:
+            os.link(source_path, pending_source)
+        except OSError:
+            shutil.copyfile(source_path, pending_source)
+
+    def _schedule_reencode(self, filename: str) -> None:
+        pending_source = os.path.join(self.pending_path, filename)
         filepath = os.path.join(self.images_path, filename)
 
-        # Open image
-        image = Image.open(io.BytesIO(file_content))
+        queued = image_worker_pool.run_in_background(
+            reencode_image, pending_source, filepath, settings.image_final_encode_method,
+            on_done=lambda result: self._record_reencode(filename, *result)
+        )
+        if not queued:
+            logger.warning(f"Background re-encode unavailable, keeping fast encode for {filename}")
+            os.remove(pending_source)
 
-        # Get original dimensions
-        width, height = image.size
+    def _record_reencode(self, filename: str, file_size: int, content_hash: Optional[str]) -> None:
+        """Store the re-encoded size and content hash on the image records and blob"""
+        from ..models.image import Image as ImageModel
 
-        # Optimize and resize main image if too large
-        max_width = 1920
-        if width > max_width:
-            ratio = max_width / width
-            new_height = int(height * ratio)
-            image = image.resize((max_width, new_height), Image.Resampling.LANCZOS)
-            width, height = image.size
+        if not file_size or not content_hash:
+            return
 
-        # Convert RGBA to RGB if needed (WebP supports alpha, but we might want to flatten)
-        if image.mode == "RGBA":
-            # If we want to keep alpha, we can. But usually for photos it's not needed.
-            # Let's keep it for WebP, but flatten for specific use cases if needed.
-            pass
+        db = SessionLocal()
+        try:
+            image_ids = [image_id for (image_id,) in db.query(ImageModel.id).filter(ImageModel.filename == filename)]
+        finally:
+            db.close()
 
-        # Save as WebP for best compression/quality ratio
-        image.save(filepath, "WEBP", quality=80, method=6) # method 6 is slowest but best compression
+        moved_to = blob_store_service.update_stored_file(IMAGE, filename, file_size, content_hash)
 
-        # Get file size
-        file_size = os.path.getsize(filepath)
+        # The stored bytes (or file) changed, so drop the cached ETags
+        for image_id in image_ids:
+            file_lookup_cache.invalidate("image", image_id)
 
-        # Create thumbnail
-        thumbnail_filename = self._sync_create_thumbnail(image, filename)
+        if moved_to is not None:
+            # Identical content was already stored - the rows now share that file
+            asyncio.ensure_future(self.delete_image(filename, thumbnail_filename_for(filename)))
 
-        return filename, thumbnail_filename, file_size, width, height
+    def is_reencode_pending(self, filename: str) -> bool:
+        """Whether a stored image is still to be replaced by its background re-encode"""
+        return os.path.exists(os.path.join(self.pending_path, filename))
 
-    def _sync_create_thumbnail(self, image: Image.Image, filename: str) -> str:
-        """Create thumbnail from image (synchronous)"""
-        # Create thumbnail (300x300)
-        thumbnail = image.copy()
-        thumbnail.thumbnail((300, 300), Image.Resampling.LANCZOS)
+    def resume_pending_reencodes(self) -> int:
+        """Queue re-encodes interrupted by a restart"""
+        if not os.path.isdir(self.pending_path):
+            return 0
 
-        # Save as WebP for better compression
-        thumbnail_filename = f"{filename.rsplit('.', 1)[0]}_thumb.webp"
-        thumbnail_path = os.path.join(self.thumbnails_path, thumbnail_filename)
+        filenames = [f for f in os.listdir(self.pending_path) if not f.endswith(".tmp")]
+        for filename in filenames:
+            self._schedule_reencode(filename)
 
-        thumbnail.save(thumbnail_path, "WEBP", quality=75)
+        if filenames:
+            logger.info(f"Resumed {len(filenames)} pending image re-encode(s)")
+        return len(filenames)
 
+    def create_thumbnail(self, filename: str) -> str:
+        """Create the thumbnail for a stored image (synchronous). Returns the thumbnail filename."""
+        thumbnail_filename = thumbnail_filename_for(filename)
+        create_thumbnail(self.get_image_path(filename), self.get_thumbnail_path(thumbnail_filename))
         return thumbnail_filename
 
-    async def _create_thumbnail(self, image: Image.Image, filename: str) -> str:
-        # This is now handled by _sync_create_thumbnail, but keeping for compatibility if needed
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._sync_create_thumbnail, image, filename)
+    def resolve_thumbnail_path(self, filename: str, thumbnail_filename: Optional[str] = None) -> Optional[str]:
+        """
+        Path of an image's thumbnail, or None if it does not exist.
+        Shared by every caller that wants a thumbnail so naming stays in one place.
+        """
+        path = self.get_thumbnail_path(thumbnail_filename or thumbnail_filename_for(filename))
+        return path if os.path.exists(path) else None
+
+    def resolve_preview_path(self, filename: str, thumbnail_filename: Optional[str] = None) -> Optional[str]:
+        """Thumbnail path, falling back to the full image; None if neither exists."""
+        thumbnail_path = self.resolve_thumbnail_path(filename, thumbnail_filename)
+        if thumbnail_path:
+            return thumbnail_path
+        full_path = self.get_image_path(filename)
+        return full_path if os.path.exists(full_path) else None
 
     async def delete_image(self, filename: str, thumbnail_filename: str = None):
-        """Delete image and thumbnail"""
+        """Delete image, thumbnail and resized derivatives"""
         # Delete main image
         filepath = os.path.join(self.images_path, filename)
         if os.path.exists(filepath):
             os.remove(filepath)
 
+        image_derivative_service.delete_derivatives(filename)
+
         # Delete thumbnail
         if thumbnail_filename:
             thumbnail_path = os.path.join(self.thumbnails_path, thumbnail_filename)
@@ -0,0 +1,142 @@
+"""
+Dedicated process pool for CPU-heavy image work (decode, resize, WebP encode).
+
+Keeps transcoding off the default thread pool and out from under the GIL.
+Foreground tasks are bounded: once every worker is busy and the wait queue
+is full, new work is rejected with 503 so clients back off instead of
+piling up. Background tasks (e.g. high-compression re-encodes) run one at
+a time through the same pool and never count against that limit.
+
+If a worker process dies (e.g. killed for memory on a huge decode) the pool
+breaks; it is then replaced and the affected task retried once.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ImageWorkerPool:
+    """Bounded process pool plus a serial background queue."""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._background_queue: Optional[asyncio.Queue] = None
+        self._background_task: Optional[asyncio.Task] = None
+
+    @property
+    def max_pending(self) -> int:
+        """Foreground tasks allowed at once (running plus queued)."""
+        return settings.image_workers + settings.image_queue_depth
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=max(1, settings.image_workers),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken executor so the next task starts a fresh one."""
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.warning("Image worker process died, restarting the pool")
+
+    async def _execute(self, fn: Callable, *args) -> Any:
+        """Run a task in the pool, replacing the pool and retrying once if it broke."""
+        loop = asyncio.get_event_loop()
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                if attempt:
+                    raise
+
+    def start(self) -> None:
+        """Start the background queue consumer (must run inside the event loop)."""
+        self._get_executor()
+        if self._background_task is None:
+            self._background_queue = asyncio.Queue()
+            self._background_task = asyncio.create_task(self._background_worker())
+        logger.info(f"Image worker pool started ({settings.image_workers} processes)")
+
+    async def stop(self) -> None:
+        """Stop background work and shut the processes down."""
+        if self._background_task is not None:
+            self._background_task.cancel()
+            await asyncio.gather(self._background_task, return_exceptions=True)
+            self._background_task = None
+            self._background_queue = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("Image worker pool stopped")
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Run a picklable function in the pool and await its result.
+
+        Raises:
+            HTTPException(503): When the pool and its queue are full, or the
+                task broke the pool again after a retry
+        """
+        if self._in_flight >= self.max_pending:
+            raise HTTPException(
+                status_code=503,
+                detail="Image processing is busy, please retry shortly",
+                headers={"Retry-After": "5"}
+            )
+
+        self._in_flight += 1
+        try:
+            return await self._execute(fn, *args)
+        except BrokenProcessPool:
+            raise HTTPException(
+                status_code=503,
+                detail="Image processing failed, please retry shortly",
+                headers={"Retry-After": "5"}
+            )
+        finally:
+            self._in_flight -= 1
+
+    def run_in_background(self, fn: Callable, *args, on_done: Optional[Callable[[Any], None]] = None) -> bool:
+        """
+        Queue low-priority work; ``on_done`` receives the result in the event loop.
+
+        Returns:
+            False when the background queue is not running
+        """
+        if self._background_queue is None:
+            return False
+        self._background_queue.put_nowait((fn, args, on_done))
+        return True
+
+    async def _background_worker(self) -> None:
+        while True:
+            fn, args, on_done = await self._background_queue.get()
+            try:
+                result = await self._execute(fn, *args)
+                if on_done:
+                    on_done(result)
+            except Exception as e:
+                logger.error(f"Background image task {getattr(fn, '__name__', fn)} failed: {e}")
+            finally:
+                self._background_queue.task_done()
+
+
+# Singleton instance
+image_worker_pool = ImageWorkerPool()
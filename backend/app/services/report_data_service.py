@@ -0,0 +1,141 @@
+"""
+Data loading for insurance reports.
+
+Everything a report shows is fetched in a fixed number of queries (items with
+their category and location joined, images and documents subquery-loaded) and
+copied into a compact, read-only snapshot. The renderer works on the snapshot
+only, so it never triggers lazy loads and does not need the session at all.
+"""
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload, subqueryload
+
+from ..models.property import Property
+from ..models.insurance_policy import InsurancePolicy
+from ..models.item import Item, ItemCondition
+from ..models.document import DocumentType
+
+
+@dataclass(frozen=True, slots=True)
+class ReportImage:
+    id: str
+    filename: str
+    thumbnail_filename: Optional[str]
+    is_primary: bool
+    width: Optional[int]
+    height: Optional[int]
+
+
+@dataclass(frozen=True, slots=True)
+class ReportDocument:
+    id: str
+    filename: str
+    original_filename: str
+    mime_type: str
+    document_type: DocumentType
+
+
+@dataclass(frozen=True, slots=True)
+class ReportItem:
+    id: str
+    name: str
+    description: Optional[str]
+    category_name: Optional[str]
+    location_name: Optional[str]
+    manufacturer: Optional[str]
+    model_number: Optional[str]
+    serial_number: Optional[str]
+    condition: Optional[ItemCondition]
+    purchase_date: Optional[date]
+    purchase_price: Optional[Decimal]
+    current_value: Optional[Decimal]
+    images: Tuple[ReportImage, ...]
+    documents: Tuple[ReportDocument, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class ReportData:
+    """Snapshot of a property and everything its report shows."""
+    property: Mapping[str, Any]
+    policies: Tuple[Mapping[str, Any], ...]
+    items: Tuple[ReportItem, ...]
+
+
+def _record(obj) -> Mapping[str, Any]:
+    """Read-only column values of a row (templates read them like attributes)."""
+    return MappingProxyType({column.name: getattr(obj, column.name) for column in obj.__table__.columns})
+
+
+def _image(image) -> ReportImage:
+    return ReportImage(
+        id=image.id,
+        filename=image.filename,
+        thumbnail_filename=image.thumbnail_filename,
+        is_primary=bool(image.is_primary),
+        width=image.width,
+        height=image.height,
+    )
+
+
+def _document(doc) -> ReportDocument:
+    return ReportDocument(
+        id=doc.id,
+        filename=doc.filename,
+        original_filename=doc.original_filename,
+        mime_type=doc.mime_type or "",
+        document_type=doc.document_type,
+    )
+
+
+def _item(item: Item) -> ReportItem:
+    return ReportItem(
+        id=item.id,
+        name=item.name,
+        description=item.description,
+        category_name=item.category.name if item.category else None,
+        location_name=item.location.name if item.location else None,
+        manufacturer=item.manufacturer,
+        model_number=item.model_number,
+        serial_number=item.serial_number,
+        condition=item.condition,
+        purchase_date=item.purchase_date,
+        purchase_price=item.purchase_price,
+        current_value=item.current_value,
+        images=tuple(_image(image) for image in item.images),
+        documents=tuple(_document(doc) for doc in item.documents),
+    )
+
+
+def load_report_data(db: Session, property_id: str) -> Optional[ReportData]:
+    """
+    Load the report snapshot of a property in a fixed number of queries.
+
+    Returns:
+        The snapshot, or None if the property does not exist
+    """
+    property = db.query(Property).filter(Property.id == property_id).first()
+    if not property:
+        return None
+
+    policies = db.query(InsurancePolicy).filter(
+        InsurancePolicy.property_id == property_id
+    ).all()
+
+    items = db.query(Item).filter(
+        Item.property_id == property_id
+    ).options(
+        joinedload(Item.category),
+        joinedload(Item.location),
+        subqueryload(Item.images),
+        subqueryload(Item.documents)
+    ).all()
+
+    return ReportData(
+        property=_record(property),
+        policies=tuple(_record(policy) for policy in policies),
+        items=tuple(_item(item) for item in items),
+    )
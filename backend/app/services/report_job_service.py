@@ -0,0 +1,300 @@
+"""
+Background queue for insurance report generation.
+
+Jobs are persisted in the report_jobs table and their PDFs kept in an on-disk
+artifact cache, so a report can be requested in one call and downloaded once
+ready. Each job records a fingerprint of the data its report is built from;
+requesting a report for a property whose fingerprint has not changed returns
+the earlier job and its PDF instead of generating a new one.
+"""
+import os
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.property import Property
+from ..models.insurance_policy import InsurancePolicy
+from ..models.item import Item
+from ..models.location import Location
+from ..models.category import Category
+from ..models.image import Image
+from ..models.document import Document
+from ..models.report_job import ReportJob, ReportJobStatus
+from .report_pipeline import RENDER_VERSION
+from .report_service import ReportService
+from .report_data_service import load_report_data
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (ReportJobStatus.PENDING, ReportJobStatus.RUNNING)
+
+
+def _value_columns(model) -> list:
+    """All columns of a model except its timestamps"""
+    return [column for column in model.__table__.columns if column.name not in ("created_at", "updated_at")]
+
+
+class ReportJobQueue:
+    """Worker pool processing persisted report jobs."""
+
+    def __init__(self):
+        self.artifacts_path = os.path.join(settings.report_cache_path, "artifacts")
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._waiters: Dict[str, list] = {}  # job ID -> [event, number of waiters]
+        self._is_running = False
+
+    # ============== LIFECYCLE ==============
+
+    def start(self) -> None:
+        """Start the workers and re-queue unfinished jobs (must run inside the event loop)."""
+        if self._is_running:
+            logger.warning("Report job queue already running")
+            return
+
+        os.makedirs(self.artifacts_path, exist_ok=True)
+        self._queue = asyncio.Queue()
+        worker_count = max(1, settings.report_job_workers)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"report-worker-{n}")
+            for n in range(worker_count)
+        ]
+        self._is_running = True
+
+        self._recover_jobs()
+        logger.info(f"Report job queue started ({worker_count} workers)")
+
+    async def stop(self) -> None:
+        """Stop the workers. Interrupted jobs are picked up again on next start."""
+        if not self._is_running:
+            return
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        self._workers = []
+        self._is_running = False
+        logger.info("Report job queue stopped")
+
+    def is_running(self) -> bool:
+        """Check if the worker pool is running."""
+        return self._is_running
+
+    def _recover_jobs(self) -> None:
+        """Purge expired jobs and re-queue jobs left pending or running by a restart."""
+        db = SessionLocal()
+        try:
+            self.purge_expired(db)
+
+            unfinished = db.query(ReportJob).filter(
+                ReportJob.status.in_(ACTIVE_STATUSES)
+            ).order_by(ReportJob.created_at).all()
+
+            for job in unfinished:
+                job.status = ReportJobStatus.PENDING
+                self._queue.put_nowait(job.id)
+
+            db.commit()
+            if unfinished:
+                logger.info(f"Recovered {len(unfinished)} unfinished report job(s)")
+        finally:
+            db.close()
+
+    # ============== SUBMISSION ==============
+
+    def fingerprint(self, db: Session, property_id: str) -> str:
+        """
+        Hash of everything a property's report is built from.
+
+        Covers the values the report prints rather than modification times,
+        which only have one-second resolution and so miss quick edits. Skips
+        columns the report does not show (notes, tags, ...), so editing those
+        does not invalidate an earlier report.
+        """
+        item_ids = db.query(Item.id).filter(Item.property_id == property_id)
+        queries = [
+            db.query(*_value_columns(Property)).filter(Property.id == property_id),
+            db.query(*_value_columns(InsurancePolicy))
+            .filter(InsurancePolicy.property_id == property_id).order_by(InsurancePolicy.id),
+            db.query(Location.id, Location.name)
+            .filter(Location.property_id == property_id).order_by(Location.id),
+            db.query(Category.id, Category.name).order_by(Category.id),
+            db.query(
+                Item.id, Item.name, Item.description, Item.location_id, Item.category_id,
+                Item.manufacturer, Item.model_number, Item.serial_number, Item.condition,
+                Item.purchase_date, Item.purchase_price, Item.current_value
+            ).filter(Item.property_id == property_id).order_by(Item.id),
+            db.query(Image.id, Image.item_id, Image.filename, Image.thumbnail_filename, Image.is_primary)
+            .filter(Image.item_id.in_(item_ids)).order_by(Image.id),
+            db.query(Document.id, Document.item_id, Document.filename, Document.document_type,
+                     Document.original_filename, Document.mime_type)
+            .filter(Document.item_id.in_(item_ids)).order_by(Document.id),
+        ]
+
+        digest = hashlib.sha256(RENDER_VERSION.encode("utf-8"))
+        for query in queries:
+            for row in query:
+                digest.update(repr(tuple(row)).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def submit(self, db: Session, property_id: str) -> ReportJob:
+        """
+        Queue a report for a property.
+
+        The fingerprint reads every item of the property, so it is computed in
+        a thread to keep the event loop free.
+
+        Returns:
+            A new pending job, or the job of an earlier report of the same data
+            (pending, running or completed) when there is one
+        """
+        if not self._is_running:
+            raise RuntimeError("Report job queue is not running")
+
+        self.purge_expired(db)
+        loop = asyncio.get_event_loop()
+        fingerprint = await loop.run_in_executor(None, self.fingerprint, db, property_id)
+
+        existing = db.query(ReportJob).filter(
+            ReportJob.property_id == property_id,
+            ReportJob.fingerprint == fingerprint,
+            ReportJob.status.in_(ACTIVE_STATUSES + (ReportJobStatus.COMPLETED,))
+        ).order_by(ReportJob.created_at.desc()).first()
+
+        if existing and (existing.status != ReportJobStatus.COMPLETED or self.get_artifact_path(existing)):
+            if existing.status == ReportJobStatus.COMPLETED:
+                existing.expires_at = self._expiry()
+                db.commit()
+            logger.info(f"Reusing report job {existing.id} for property {property_id}")
+            return existing
+
+        job = ReportJob(property_id=property_id, status=ReportJobStatus.PENDING, fingerprint=fingerprint)
+        db.add(job)
+        db.commit()
+
+        self._queue.put_nowait(job.id)
+        logger.info(f"Queued report job {job.id} for property {property_id}")
+        return job
+
+    def get_artifact_path(self, job: ReportJob) -> Optional[str]:
+        """Path of a job's PDF, or None if there is none (any more)."""
+        if not job.artifact_filename:
+            return None
+        path = os.path.join(self.artifacts_path, job.artifact_filename)
+        return path if os.path.exists(path) else None
+
+    def expire(self, db: Session, job: ReportJob) -> None:
+        """Delete a finished job, and its PDF unless another job shares it."""
+        artifact_filename = job.artifact_filename
+        db.delete(job)
+        db.commit()
+
+        if artifact_filename:
+            shared = db.query(ReportJob.id).filter(ReportJob.artifact_filename == artifact_filename).first()
+            path = os.path.join(self.artifacts_path, artifact_filename)
+            if not shared and os.path.exists(path):
+                os.remove(path)
+
+    def purge_expired(self, db: Session) -> int:
+        """Expire finished jobs past their retention."""
+        expired = db.query(ReportJob).filter(
+            ReportJob.status.notin_(ACTIVE_STATUSES),
+            ReportJob.expires_at < datetime.utcnow()
+        ).all()
+
+        for job in expired:
+            self.expire(db, job)
+        return len(expired)
+
+    def _expiry(self) -> datetime:
+        return datetime.utcnow() + timedelta(hours=settings.report_job_retention_hours)
+
+    # ============== WAITING ==============
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for a job to finish (long polling)."""
+        entry = self._waiters.setdefault(job_id, [asyncio.Event(), 0])
+        entry[1] += 1
+        try:
+            await asyncio.wait_for(entry[0].wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Drop the event with its last waiter, e.g. when the job finished
+            # before anyone could be notified
+            entry[1] -= 1
+            if entry[1] == 0 and self._waiters.get(job_id) is entry:
+                del self._waiters[job_id]
+
+    def _notify(self, job_id: str) -> None:
+        entry = self._waiters.pop(job_id, None)
+        if entry:
+            entry[0].set()
+
+    # ============== PROCESSING ==============
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                logger.error(f"Report job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+            if not job or job.status not in ACTIVE_STATUSES:
+                return
+
+            job.status = ReportJobStatus.RUNNING
+            job.started_at = datetime.utcnow()
+            db.commit()
+
+            try:
+                # Loading reads the whole inventory - keep it off the event loop
+                loop = asyncio.get_event_loop()
+                data = await loop.run_in_executor(None, load_report_data, db, job.property_id)
+                if not data:
+                    raise ValueError("Property not found")
+
+                # Written straight into the artifact cache, moved into place when complete
+                artifact_filename = f"{job.fingerprint}.pdf"
+                path = os.path.join(self.artifacts_path, artifact_filename)
+                temp_path = f"{path}.{job.id}.tmp"
+                try:
+                    await ReportService().generate_insurance_report(data, temp_path)
+                    os.replace(temp_path, path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+
+                job.status = ReportJobStatus.COMPLETED
+                job.artifact_filename = artifact_filename
+                job.file_size = os.path.getsize(path)
+            except Exception as e:
+                logger.warning(f"Report job {job_id} failed: {e}")
+                job.status = ReportJobStatus.FAILED
+                job.error = str(e)
+
+            job.completed_at = datetime.utcnow()
+            job.expires_at = self._expiry()
+            db.commit()
+        finally:
+            db.close()
+            self._notify(job_id)
+
+
+# Singleton instance
+report_job_queue = ReportJobQueue()
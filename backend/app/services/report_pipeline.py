@@ -0,0 +1,271 @@
+"""
+Sectioned, cached rendering of report PDFs.
+
+A report is rendered as independent HTML sections (front matter, runs of
+locations, summary). WeasyPrint runs in a dedicated process pool so several
+sections render at once and the event loop stays free. Rendered sections are
+cached on disk under a hash of their HTML, so regenerating a report only
+re-renders the sections whose content changed.
+
+Stored images are referenced from the HTML by report:// URLs instead of being
+inlined. The URL fetcher answers them with JPEG copies scaled to the size they
+are printed at, generated on first use and cached next to the sections. Once
+the cache exceeds its size budget the least recently used files are evicted
+(file mtime is the LRU clock).
+"""
+import os
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote, urlsplit, parse_qs
+
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from weasyprint import HTML, default_url_fetcher
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when rendering changes in a way the section HTML does not capture
+RENDER_VERSION = "2"
+
+REPORT_URL_SCHEME = "report"
+
+# Stored file folders report:// URLs may point into
+_FOLDERS = {
+    "images": settings.images_path,
+    "documents": settings.documents_path,
+}
+
+# Bytes of image copies written by the current render (counted against the cache budget)
+_created_bytes = 0
+
+
+def render_pdf(html: str, pdf_path: str) -> int:
+    """
+    Render an HTML document to a PDF file.
+    Runs in the report worker processes, so it must stay a module-level function.
+
+    Returns:
+        Bytes added to the report cache (the PDF plus new image copies)
+    """
+    global _created_bytes
+    _created_bytes = 0
+
+    temp_path = f"{pdf_path}.{os.getpid()}.tmp"
+    HTML(string=html, url_fetcher=report_url_fetcher).write_pdf(temp_path)
+    os.replace(temp_path, pdf_path)
+    return os.path.getsize(pdf_path) + _created_bytes
+
+
+def report_file_url(path: str, size: int) -> str:
+    """
+    report:// URL of a stored image, printed at most size pixels on its long edge.
+
+    Args:
+        path: Path of a file in the images or documents folder
+    """
+    for folder, base_path in _FOLDERS.items():
+        relative = os.path.relpath(path, base_path)
+        if not relative.startswith(os.pardir):
+            return f"{REPORT_URL_SCHEME}://{folder}/{quote(relative)}?size={size}"
+    raise ValueError(f"Not a stored file: {path}")
+
+
+def report_url_fetcher(url: str) -> dict:
+    """
+    WeasyPrint URL fetcher answering report:// URLs with cached, report-sized JPEG copies.
+    Other URLs go to WeasyPrint's default fetcher.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != REPORT_URL_SCHEME:
+        return default_url_fetcher(url)
+
+    base_path = _FOLDERS.get(parts.netloc)
+    if base_path is None:
+        raise ValueError(f"Unknown report URL: {url}")
+
+    relative = unquote(parts.path.lstrip("/"))
+    source_path = os.path.realpath(os.path.join(base_path, relative))
+    if not source_path.startswith(os.path.realpath(base_path) + os.sep):
+        raise ValueError(f"Invalid report URL: {url}")
+
+    size = int(parse_qs(parts.query).get("size", ["0"])[0])
+    name = f"{parts.netloc}_{relative.replace('/', '_').rsplit('.', 1)[0]}_r{size}.jpg"
+    path = os.path.join(settings.report_cache_path, "images", name)
+
+    if os.path.exists(path):
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+    else:
+        _create_report_image(source_path, path, size)
+
+    return {"file_obj": open(path, "rb"), "mime_type": "image/jpeg", "redirected_url": url}
+
+
+def _create_report_image(source_path: str, dest_path: str, size: int) -> None:
+    """Write a JPEG copy of an image that fits in size x size (JPEG embeds in PDFs as-is)."""
+    global _created_bytes
+
+    with Image.open(source_path) as image:
+        image = image.convert("RGB")
+        if size:
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    temp_path = f"{dest_path}.{os.getpid()}.tmp"
+    image.save(temp_path, "JPEG", quality=85, optimize=True)
+    os.replace(temp_path, dest_path)
+    _created_bytes += os.path.getsize(dest_path)
+
+
+def section_key(html: str) -> str:
+    """Cache key of a section: hash of everything that goes into rendering it."""
+    return hashlib.sha256(f"{RENDER_VERSION}\0{html}".encode("utf-8")).hexdigest()
+
+
+class ReportPipeline:
+    """Process pool and on-disk cache for report sections."""
+
+    def __init__(self):
+        self.sections_path = os.path.join(settings.report_cache_path, "sections")
+        self.images_path = os.path.join(settings.report_cache_path, "images")
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._rendering: Dict[str, asyncio.Future] = {}
+        self._total_bytes: Optional[int] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=max(1, settings.report_workers),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken executor so the next render starts a fresh one."""
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.warning("Report worker process died, restarting the pool")
+
+    def shutdown(self) -> None:
+        """Shut the worker processes down (they are started again on demand)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("Report worker pool stopped")
+
+    async def render_sections(self, sections: List[str]) -> List[str]:
+        """
+        Render HTML sections to PDF, reusing cached renders.
+
+        Returns:
+            Paths of the section PDFs, in the order of the sections
+        """
+        os.makedirs(self.sections_path, exist_ok=True)
+        paths = []
+        renders = {}
+        cached = 0
+
+        for html in sections:
+            path = os.path.join(self.sections_path, f"{section_key(html)}.pdf")
+            paths.append(path)
+            if path in renders:
+                continue
+
+            if path not in self._rendering and os.path.exists(path):
+                # Mark as recently used for LRU eviction
+                os.utime(path)
+                cached += 1
+                continue
+
+            # Share a single render between concurrent reports
+            future = self._rendering.get(path)
+            if future is None:
+                future = asyncio.ensure_future(self._render(html, path))
+                self._rendering[path] = future
+                future.add_done_callback(lambda _, path=path: self._rendering.pop(path, None))
+            renders[path] = future
+
+        await asyncio.gather(*(asyncio.shield(future) for future in renders.values()))
+        logger.info(f"Report sections: {len(renders)} rendered, {cached} from cache")
+        return paths
+
+    async def _render(self, html: str, path: str) -> None:
+        loop = asyncio.get_event_loop()
+
+        # A dead worker breaks the pool: replace it and retry the render once
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                size = await loop.run_in_executor(executor, render_pdf, html, path)
+                break
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                if attempt:
+                    raise
+
+        if self._total_bytes is None:
+            self._total_bytes = self._scan_total_bytes()
+        else:
+            self._total_bytes += size
+
+        if self._total_bytes > settings.report_cache_max_mb * 1024 * 1024:
+            await loop.run_in_executor(None, self._evict)
+
+    def merge(self, paths: List[str]) -> PdfWriter:
+        """Concatenate section PDFs."""
+        writer = PdfWriter()
+        for path in paths:
+            writer.append(path)
+        return writer
+
+    def stamp(self, writer: PdfWriter, overlay_path: str) -> None:
+        """Draw each page of an overlay PDF (e.g. page footers) onto the matching page."""
+        overlay = PdfReader(overlay_path)
+        for page, overlay_page in zip(writer.pages, overlay.pages):
+            page.merge_page(overlay_page)
+
+    def _list_files(self) -> List[os.DirEntry]:
+        entries = []
+        for path in (self.sections_path, self.images_path):
+            if os.path.isdir(path):
+                entries.extend(entry for entry in os.scandir(path) if entry.is_file())
+        return entries
+
+    def _scan_total_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in self._list_files())
+
+    def _evict(self) -> None:
+        """Delete least recently used sections and image copies until 90% of the budget."""
+        target = settings.report_cache_max_mb * 1024 * 1024 * 0.9
+        entries = sorted(self._list_files(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+
+        removed = 0
+        for entry in entries:
+            if total <= target:
+                break
+            if entry.path in self._rendering:
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        self._total_bytes = total
+        if removed:
+            logger.info(f"Evicted {removed} cached report file(s)")
+
+
+# Singleton instance
+report_pipeline = ReportPipeline()
@@ -1,21 +1,26 @@
-import io
 import os
-import base64
+import asyncio
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Sequence
 from collections import defaultdict
 
 from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML, CSS
 from pypdf import PdfReader, PdfWriter
 
 from ..config import settings
-from ..models.property import Property
-from ..models.insurance_policy import InsurancePolicy
-from ..models.item import Item
-from ..models.location import Location
-from ..models.document import Document, DocumentType
-from ..models.image import Image
+from ..models.document import DocumentType
+from .image_service import ImageService
+from .report_data_service import ReportData, ReportItem, ReportDocument
+from .report_pipeline import report_pipeline, report_file_url
+
+# Pixel size images are embedded at: about 300 dpi at their printed size
+# (item images print at 80px, receipt images at up to 200px)
+ITEM_IMAGE_SIZE = 320
+RECEIPT_IMAGE_SIZE = 640
+
+# Locations are rendered in sections of about this many items: small locations
+# share a section and flow on one page, large ones get a section of their own
+SECTION_ITEM_BUDGET = 30
 
 
 class ReportService:
@@ -24,17 +29,27 @@ class ReportService:
         os.makedirs(template_dir, exist_ok=True)
         self.env = Environment(loader=FileSystemLoader(template_dir))
 
-    def generate_insurance_report(
-        self,
-        property: Property,
-        policies: List[InsurancePolicy],
-        items: List[Item],
-        locations: List[Location]
-    ) -> bytes:
-        """Generate a complete insurance report PDF for a property."""
+    def get_report_filename(self, property_name: str) -> str:
+        """Download filename of a property's insurance report."""
+        safe_name = property_name.replace(" ", "_").replace("/", "-")
+        return f"insurance_report_{safe_name}.pdf"
+
+    async def generate_insurance_report(self, data: ReportData, output_path: str) -> None:
+        """
+        Generate a complete insurance report PDF for a property.
+
+        Works on a snapshot from load_report_data. Sections are rendered in
+        the report worker pool; sections whose content did not change since
+        an earlier report come from the cache. The PDF is written to
+        output_path rather than returned, so it is never held in memory as bytes.
+        """
+        property = data.property
+        policies = data.policies
+        items = data.items
+        generated_at = datetime.now()
 
         # Group items by location
-        items_by_location = self._group_items_by_location(items, locations)
+        items_by_location = self._group_items_by_location(items)
 
         # Calculate totals
         total_items = len(items)
@@ -43,7 +58,7 @@ class ReportService:
         # Calculate value by category
         value_by_category = defaultdict(lambda: {"count": 0, "value": 0})
         for item in items:
-            cat_name = item.category.name if item.category else "Uncategorized"
+            cat_name = item.category_name or "Uncategorized"
             value_by_category[cat_name]["count"] += 1
             value_by_category[cat_name]["value"] += float(item.current_value or 0)
 
@@ -69,73 +84,108 @@ class ReportService:
         # Find items without receipts
         items_without_receipts = [item for item in items if item.id not in item_appendix_map]
 
-        # Load item images as base64
+        # Reference item images by URL; the pipeline embeds report-sized copies
         item_images = {}
         for item in items:
-            image_data = self._get_item_image_base64(item)
-            if image_data:
-                item_images[item.id] = image_data
+            image_url = self._get_item_image_url(item)
+            if image_url:
+                item_images[item.id] = image_url
 
-        # Load receipt images as base64
+        # Reference receipt images by URL
         receipt_images = {}
         for item_id, appendix_list in item_appendix_map.items():
             for label, doc in appendix_list:
                 if doc.mime_type.startswith('image/'):
-                    image_data = self._get_document_image_base64(doc)
-                    if image_data:
-                        receipt_images[doc.id] = image_data
-
-        # Prepare template data
-        template_data = {
-            "property": property,
-            "policies": policies,
-            "items_by_location": items_by_location,
-            "item_appendix_map": item_appendix_map,
-            "item_images": item_images,
-            "receipt_images": receipt_images,
-            "total_items": total_items,
-            "total_value": total_value,
-            "value_by_category": dict(value_by_category),
-            "items_without_receipts": items_without_receipts,
-            "appendix_items": appendix_items,
-            "generated_at": datetime.now(),
-            "images_path": settings.images_path,
-            "documents_path": settings.documents_path,
-        }
-
-        # Render HTML template
-        template = self.env.get_template("insurance_report.html")
-        html_content = template.render(**template_data)
-
-        # Generate main report PDF
-        main_pdf_bytes = HTML(string=html_content).write_pdf()
-
-        # If there are PDF receipt attachments, merge them
+                    image_url = self._get_document_image_url(doc)
+                    if image_url:
+                        receipt_images[doc.id] = image_url
+
+        # Render sections: front matter, runs of locations, summary. Each is
+        # rendered (or taken from the cache) separately and merged afterwards.
+        common = {"property": property}
+        sections = [self._render_template(
+            "report/front.html",
+            **common,
+            policies=policies,
+            total_items=total_items,
+            total_value=total_value,
+            generated_at=generated_at,
+        )]
+        for index, locations in enumerate(self._batch_locations(items_by_location)):
+            sections.append(self._render_template(
+                "report/location.html",
+                **common,
+                locations=locations,
+                first=index == 0,
+                item_appendix_map=item_appendix_map,
+                item_images=item_images,
+                receipt_images=receipt_images,
+            ))
+        sections.append(self._render_template(
+            "report/summary.html",
+            **common,
+            value_by_category=dict(value_by_category),
+            total_items=total_items,
+            total_value=total_value,
+            items_without_receipts=items_without_receipts,
+            generated_at=generated_at,
+        ))
+
+        section_paths = await report_pipeline.render_sections(sections)
+        writer = await self._run_in_thread(report_pipeline.merge, section_paths)
+
+        # Page numbers run across all sections, so they are stamped on after merging
+        page_numbers_path = (await report_pipeline.render_sections([
+            self._render_template("report/page_numbers.html", page_count=len(writer.pages))
+        ]))[0]
+
+        # If there are PDF receipt attachments, merge them behind cover pages
+        # rendered together in one document (one page per receipt)
         pdf_receipts = [
             item for item in appendix_items
             if item["document"].mime_type == "application/pdf"
         ]
-
+        covers_path = None
         if pdf_receipts:
-            final_pdf = self._merge_pdf_receipts(main_pdf_bytes, pdf_receipts)
-            return final_pdf
+            covers_path = (await report_pipeline.render_sections([
+                self._render_template("report/receipt_covers.html", receipts=pdf_receipts)
+            ]))[0]
+
+        await self._run_in_thread(
+            self._finish_report, writer, page_numbers_path, pdf_receipts, covers_path, output_path
+        )
+
+    def _render_template(self, name: str, **context) -> str:
+        return self.env.get_template(name).render(**context)
 
-        return main_pdf_bytes
+    async def _run_in_thread(self, fn, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, fn, *args)
 
-    def _group_items_by_location(
+    def _finish_report(
         self,
-        items: List[Item],
-        locations: List[Location]
-    ) -> List[Dict[str, Any]]:
-        """Group items by their location for the report."""
+        writer: PdfWriter,
+        page_numbers_path: str,
+        pdf_receipts: List[Dict[str, Any]],
+        covers_path: Optional[str],
+        output_path: str
+    ) -> None:
+        """Number the report pages, append PDF receipts and write the report to a file."""
+        report_pipeline.stamp(writer, page_numbers_path)
+
+        if pdf_receipts:
+            self._merge_pdf_receipts(writer, pdf_receipts, covers_path)
 
-        # Create location lookup
-        location_lookup = {loc.id: loc for loc in locations}
+        # Write final PDF
+        writer.write(output_path)
+
+    def _group_items_by_location(self, items: Sequence[ReportItem]) -> List[Dict[str, Any]]:
+        """Group items by their location for the report."""
 
         # Group items
         grouped = defaultdict(list)
         for item in items:
-            loc_name = item.location.name if item.location else "No Location"
+            loc_name = item.location_name or "No Location"
             grouped[loc_name].append(item)
 
         # Sort and calculate totals
@@ -152,58 +202,36 @@ class ReportService:
 
         return result
 
+    def _batch_locations(self, locations: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Split grouped locations into runs of up to SECTION_ITEM_BUDGET items.
+
+        A section always starts on a new page, so a section per location would
+        leave most of a page empty after every small location.
+        """
+        batches = []
+        batch_items = 0
+        for location in locations:
+            if batches and batch_items + location["item_count"] <= SECTION_ITEM_BUDGET:
+                batches[-1].append(location)
+                batch_items += location["item_count"]
+            else:
+                batches.append([location])
+                batch_items = location["item_count"]
+        return batches
+
     def _merge_pdf_receipts(
         self,
-        main_pdf_bytes: bytes,
-        pdf_receipts: List[Dict[str, Any]]
-    ) -> bytes:
-        """Merge PDF receipt documents into the main report."""
-
-        writer = PdfWriter()
-
-        # Add main report pages
-        main_reader = PdfReader(io.BytesIO(main_pdf_bytes))
-        for page in main_reader.pages:
-            writer.add_page(page)
-
-        # Add each PDF receipt with a cover page
-        for receipt_info in pdf_receipts:
+        writer: PdfWriter,
+        pdf_receipts: List[Dict[str, Any]],
+        covers_path: str
+    ) -> None:
+        """Append PDF receipt documents, each behind its cover page, to the report."""
+        covers = PdfReader(covers_path)
+
+        for receipt_info, cover_page in zip(pdf_receipts, covers.pages):
             doc = receipt_info["document"]
-            label = receipt_info["label"]
-            item_name = receipt_info["item_name"]
-
-            # Create cover page for this receipt
-            cover_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <style>
-                    @page {{ size: A4; margin: 2cm; }}
-                    body {{
-                        font-family: Arial, sans-serif;
-                        display: flex;
-                        flex-direction: column;
-                        justify-content: center;
-                        align-items: center;
-                        min-height: 90vh;
-                        text-align: center;
-                    }}
-                    .label {{ font-size: 48px; font-weight: bold; color: #333; }}
-                    .title {{ font-size: 24px; margin-top: 20px; color: #666; }}
-                    .filename {{ font-size: 14px; margin-top: 10px; color: #999; }}
-                </style>
-            </head>
-            <body>
-                <div class="label">Appendix {label}</div>
-                <div class="title">Receipt for: {item_name}</div>
-                <div class="filename">{doc.original_filename}</div>
-            </body>
-            </html>
-            """
-            cover_pdf = HTML(string=cover_html).write_pdf()
-            cover_reader = PdfReader(io.BytesIO(cover_pdf))
-            for page in cover_reader.pages:
-                writer.add_page(page)
+            writer.add_page(cover_page)
 
             # Add the actual receipt PDF
             receipt_path = os.path.join(settings.documents_path, doc.filename)
@@ -215,68 +243,30 @@ class ReportService:
                 except Exception as e:
                     print(f"Error reading receipt PDF {receipt_path}: {e}")
 
-        # Write final PDF
-        output = io.BytesIO()
-        writer.write(output)
-        return output.getvalue()
-
-    def get_item_primary_image_path(self, item: Item) -> Optional[str]:
+    def get_item_primary_image_path(self, item: ReportItem) -> Optional[str]:
         """Get the path to the primary image thumbnail for an item."""
         primary_image = next((img for img in item.images if img.is_primary), None)
         if not primary_image:
             primary_image = item.images[0] if item.images else None
 
         if primary_image:
-            thumbnail_path = os.path.join(
-                settings.images_path, "thumbnails", primary_image.filename
+            # Thumbnail, falling back to the full image
+            return ImageService().resolve_preview_path(
+                primary_image.filename, primary_image.thumbnail_filename
             )
-            if os.path.exists(thumbnail_path):
-                return thumbnail_path
-            # Fall back to full image
-            full_path = os.path.join(settings.images_path, primary_image.filename)
-            if os.path.exists(full_path):
-                return full_path
 
         return None
 
-    def _get_item_image_base64(self, item: Item) -> Optional[str]:
-        """Get the primary image for an item as base64 encoded string."""
-        primary_image = next((img for img in item.images if img.is_primary), None)
-        if not primary_image:
-            primary_image = item.images[0] if item.images else None
-
-        if not primary_image:
-            return None
-
-        # Try thumbnail first
-        thumbnail_path = os.path.join(
-            settings.images_path, "thumbnails", primary_image.filename
-        )
-        if os.path.exists(thumbnail_path):
-            try:
-                with open(thumbnail_path, "rb") as f:
-                    return base64.b64encode(f.read()).decode("utf-8")
-            except Exception:
-                pass
-
-        # Fall back to full image
-        full_path = os.path.join(settings.images_path, primary_image.filename)
-        if os.path.exists(full_path):
-            try:
-                with open(full_path, "rb") as f:
-                    return base64.b64encode(f.read()).decode("utf-8")
-            except Exception:
-                pass
-
+    def _get_item_image_url(self, item: ReportItem) -> Optional[str]:
+        """Get the report URL of an item's primary image (thumbnail first, falling back to the full image)."""
+        image_path = self.get_item_primary_image_path(item)
+        if image_path:
+            return report_file_url(image_path, ITEM_IMAGE_SIZE)
         return None
 
-    def _get_document_image_base64(self, doc: Document) -> Optional[str]:
-        """Get a document image as base64 encoded string."""
+    def _get_document_image_url(self, doc: ReportDocument) -> Optional[str]:
+        """Get the report URL of a document image."""
         doc_path = os.path.join(settings.documents_path, doc.filename)
         if os.path.exists(doc_path):
-            try:
-                with open(doc_path, "rb") as f:
-                    return base64.b64encode(f.read()).decode("utf-8")
-            except Exception:
-                pass
+            return report_file_url(doc_path, RECEIPT_IMAGE_SIZE)
         return None
@@ -1,16 +1,21 @@
 """
 Service for restoring data from a ZIP archive export.
+
+Rows are written with chunked bulk inserts: existing IDs are loaded once per
+table for merge mode, and category/location parents are set in one UPDATE
+pass after their table is inserted. Image and document files are streamed
+straight out of the archive into storage, so nothing is extracted first.
 """
 import json
+import hashlib
 import os
-import shutil
-import tempfile
 import zipfile
 import logging
 import uuid
-from datetime import datetime
-from typing import Dict, Any, List, Tuple
+from datetime import date, datetime
+from typing import Dict, Any, IO, List, Optional, Set, Tuple, Union
 
+from sqlalchemy import Date, DateTime, Enum
 from sqlalchemy.orm import Session
 
 from ..config import settings
@@ -21,35 +26,48 @@ from ..models.property import Property
 from ..models.insurance_policy import InsurancePolicy
 from ..models.image import Image
 from ..models.document import Document
+from .dashboard_stats_service import dashboard_stats_service
+from .file_lookup_cache import file_lookup_cache
+from .blob_store_service import blob_store_service, IMAGE, DOCUMENT
 
 logger = logging.getLogger(__name__)
 
+_BATCH_SIZE = 1000
+_CHUNK_SIZE = 256 * 1024
+
 
 class RestoreService:
     """Service for restoring data from ZIP archive export."""
 
-    def _parse_datetime(self, value: str) -> datetime:
+    def _parse_datetime(self, value: str) -> Optional[datetime]:
         """Parse ISO datetime string to datetime object."""
         if not value:
             return None
-        # Handle various ISO formats
-        value = value.rstrip('Z')
-        for fmt in [
-            '%Y-%m-%dT%H:%M:%S.%f',
-            '%Y-%m-%dT%H:%M:%S',
-            '%Y-%m-%d'
-        ]:
-            try:
-                return datetime.strptime(value, fmt)
-            except ValueError:
-                continue
-        return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
 
-    def _parse_date(self, value: str) -> str:
-        """Parse date string, return as-is if valid."""
+    def _parse_date(self, value: str) -> Optional[date]:
+        """Parse ISO date (or datetime) string to date object."""
         if not value:
             return None
-        return value.split('T')[0] if 'T' in value else value
+        try:
+            return date.fromisoformat(value.split('T')[0])
+        except ValueError:
+            return None
+
+    def _parse_enum(self, column, value: str):
+        """Enum member from its exported value (or name)."""
+        enum_class = column.type.enum_class
+        try:
+            return enum_class(value)
+        except ValueError:
+            pass
+        try:
+            return enum_class[value]
+        except KeyError:
+            raise ValueError(f"Invalid backup: unknown {column.table.name}.{column.name} value {value!r}")
 
     def _clear_all_data(self, db: Session) -> Dict[str, int]:
         """Clear all data from the database. Returns counts of deleted records."""
@@ -63,6 +81,7 @@ class RestoreService:
         counts['locations'] = db.query(Location).delete()
         counts['categories'] = db.query(Category).delete()
         counts['properties'] = db.query(Property).delete()
+        blob_store_service.clear(db)
 
         db.commit()
 
@@ -91,14 +110,48 @@ class RestoreService:
         logger.info(f"Cleared all data: {counts}")
         return counts
 
-    def _record_exists(self, db: Session, model, record_id: str) -> bool:
-        """Check if a record with given ID exists."""
-        return db.query(model).filter(model.id == record_id).first() is not None
+    def _existing_ids(self, db: Session, model) -> Set[str]:
+        """IDs already in a table, loaded in one query."""
+        return {record_id for (record_id,) in db.query(model.id)}
+
+    def _to_mapping(self, model, data: Dict[str, Any], **overrides) -> Dict[str, Any]:
+        """
+        Column values for a bulk insert.
+
+        Keys that are not columns of the model are dropped, values are coerced
+        to the column types and missing values fall back to the column defaults.
+        Every mapping of a model has the same keys so inserts batch together.
+        """
+        mapping = {}
+        for column in model.__table__.columns:
+            value = overrides[column.name] if column.name in overrides else data.get(column.name)
+
+            if value is None:
+                if column.default is not None and column.default.is_scalar:
+                    value = column.default.arg
+            elif isinstance(column.type, DateTime):
+                value = self._parse_datetime(value)
+            elif isinstance(column.type, Date):
+                value = self._parse_date(value)
+            elif isinstance(column.type, Enum) and column.type.enum_class is not None:
+                value = self._parse_enum(column, value)
+
+            mapping[column.name] = value
+
+        if mapping.get("created_at") is None:
+            mapping["created_at"] = datetime.utcnow()
+        if "updated_at" in mapping and mapping["updated_at"] is None:
+            mapping["updated_at"] = mapping["created_at"]
+        return mapping
+
+    def _bulk_insert(self, db: Session, model, mappings: List[Dict[str, Any]]) -> None:
+        for start in range(0, len(mappings), _BATCH_SIZE):
+            db.bulk_insert_mappings(model, mappings[start:start + _BATCH_SIZE])
 
     def restore_from_zip(
         self,
         db: Session,
-        zip_path: str,
+        zip_file: Union[str, IO[bytes]],
         mode: str = "merge"
     ) -> Dict[str, Any]:
         """
@@ -106,13 +159,13 @@ class RestoreService:
 
         Args:
             db: Database session
-            zip_path: Path to the ZIP file
+            zip_file: Path to the ZIP file, or a seekable binary file object
             mode: "merge" (add new, skip existing) or "replace" (clear all, then restore)
 
         Returns:
             Summary dict with counts of imported/skipped records
         """
-        logger.info(f"Starting restore from {zip_path} in {mode} mode")
+        logger.info(f"Starting restore in {mode} mode")
 
         result = {
             "mode": mode,
@@ -122,380 +175,235 @@ class RestoreService:
             "files_restored": {"images": 0, "documents": 0}
         }
 
-        # Extract ZIP to temp directory
-        temp_dir = tempfile.mkdtemp(prefix="homeregistry_restore_")
-
         try:
-            # Extract ZIP
-            with zipfile.ZipFile(zip_path, 'r') as zipf:
-                zipf.extractall(temp_dir)
-
-            # Load data.json
-            json_path = os.path.join(temp_dir, "data.json")
-            if not os.path.exists(json_path):
-                raise ValueError("Invalid backup: data.json not found")
-
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Clear data if replace mode
-            if mode == "replace":
-                cleared = self._clear_all_data(db)
-                result["cleared"] = cleared
-
-            # Import in order: properties -> categories -> locations -> items -> images -> documents -> insurance_policies
-
-            # 1. Properties
-            imported, skipped = self._import_properties(db, data.get("properties", []), mode)
-            result["imported"]["properties"] = imported
-            result["skipped"]["properties"] = skipped
-
-            # 2. Categories (handle hierarchy)
-            imported, skipped = self._import_categories(db, data.get("categories", []), mode)
-            result["imported"]["categories"] = imported
-            result["skipped"]["categories"] = skipped
-
-            # 3. Locations (handle hierarchy)
-            imported, skipped = self._import_locations(db, data.get("locations", []), mode)
-            result["imported"]["locations"] = imported
-            result["skipped"]["locations"] = skipped
-
-            # 4. Items
-            imported, skipped = self._import_items(db, data.get("items", []), mode)
-            result["imported"]["items"] = imported
-            result["skipped"]["items"] = skipped
-
-            # 5. Images (metadata + files)
-            imported, skipped, files_count = self._import_images(
-                db, data.get("images", []), temp_dir, mode
-            )
-            result["imported"]["images"] = imported
-            result["skipped"]["images"] = skipped
-            result["files_restored"]["images"] = files_count
-
-            # 6. Documents (metadata + files)
-            imported, skipped, files_count = self._import_documents(
-                db, data.get("documents", []), temp_dir, mode
-            )
-            result["imported"]["documents"] = imported
-            result["skipped"]["documents"] = skipped
-            result["files_restored"]["documents"] = files_count
-
-            # 7. Insurance policies
-            imported, skipped = self._import_insurance_policies(
-                db, data.get("insurance_policies", []), mode
-            )
-            result["imported"]["insurance_policies"] = imported
-            result["skipped"]["insurance_policies"] = skipped
+            with zipfile.ZipFile(zip_file, 'r') as zipf:
+                # Load data.json
+                if "data.json" not in zipf.namelist():
+                    raise ValueError("Invalid backup: data.json not found")
+
+                with zipf.open("data.json") as f:
+                    data = json.load(f)
+
+                # Clear data if replace mode
+                if mode == "replace":
+                    cleared = self._clear_all_data(db)
+                    result["cleared"] = cleared
+
+                # Import in order: properties -> categories -> locations -> items -> images -> documents -> insurance_policies
+
+                # 1. Properties
+                imported, skipped = self._import_rows(db, Property, data.get("properties", []), mode)
+                result["imported"]["properties"] = imported
+                result["skipped"]["properties"] = skipped
+
+                # 2. Categories (handle hierarchy)
+                imported, skipped = self._import_rows(db, Category, data.get("categories", []), mode)
+                result["imported"]["categories"] = imported
+                result["skipped"]["categories"] = skipped
+
+                # 3. Locations (handle hierarchy)
+                imported, skipped = self._import_rows(db, Location, data.get("locations", []), mode)
+                result["imported"]["locations"] = imported
+                result["skipped"]["locations"] = skipped
+
+                # 4. Items
+                imported, skipped = self._import_rows(db, Item, data.get("items", []), mode)
+                result["imported"]["items"] = imported
+                result["skipped"]["items"] = skipped
+
+                # 5. Images (metadata + files)
+                imported, skipped, files_count = self._import_files(
+                    db, zipf, IMAGE, data.get("images", []), mode
+                )
+                result["imported"]["images"] = imported
+                result["skipped"]["images"] = skipped
+                result["files_restored"]["images"] = files_count
+
+                # 6. Documents (metadata + files)
+                imported, skipped, files_count = self._import_files(
+                    db, zipf, DOCUMENT, data.get("documents", []), mode
+                )
+                result["imported"]["documents"] = imported
+                result["skipped"]["documents"] = skipped
+                result["files_restored"]["documents"] = files_count
+
+                # 7. Insurance policies
+                imported, skipped = self._import_rows(
+                    db, InsurancePolicy, data.get("insurance_policies", []), mode
+                )
+                result["imported"]["insurance_policies"] = imported
+                result["skipped"]["insurance_policies"] = skipped
 
             db.commit()
+
+            # Bulk inserts and replace mode's bulk deletes bypass incremental stats maintenance
+            dashboard_stats_service.rebuild(db)
+            # Cached image/document lookups may point at replaced files
+            file_lookup_cache.clear()
             logger.info(f"Restore completed: {result}")
 
+        except zipfile.BadZipFile as e:
+            db.rollback()
+            raise ValueError(f"Invalid backup: {e}")
         except Exception as e:
             db.rollback()
             logger.error(f"Restore failed: {e}")
             result["errors"].append(str(e))
             raise
-        finally:
-            # Clean up temp directory
-            shutil.rmtree(temp_dir, ignore_errors=True)
 
         return result
 
-    def _import_properties(
-        self, db: Session, properties: List[Dict], mode: str
+    def _import_rows(
+        self, db: Session, model, rows: List[Dict], mode: str
     ) -> Tuple[int, int]:
-        """Import properties. Returns (imported_count, skipped_count)."""
-        imported = 0
-        skipped = 0
-
-        for prop_data in properties:
-            prop_id = prop_data.get("id")
-
-            if mode == "merge" and self._record_exists(db, Property, prop_id):
-                skipped += 1
-                continue
-
-            prop = Property(
-                id=prop_id,
-                name=prop_data.get("name"),
-                address=prop_data.get("address"),
-                property_type=prop_data.get("property_type"),
-                notes=prop_data.get("notes"),
-                created_at=self._parse_datetime(prop_data.get("created_at")) or datetime.utcnow()
-            )
-            db.add(prop)
-            imported += 1
-
-        db.flush()
-        return imported, skipped
-
-    def _import_categories(
-        self, db: Session, categories: List[Dict], mode: str
-    ) -> Tuple[int, int]:
-        """Import categories, handling parent-child relationships."""
-        imported = 0
-        skipped = 0
-
-        # First pass: import categories without parent_id
-        for cat_data in categories:
-            cat_id = cat_data.get("id")
-
-            if mode == "merge" and self._record_exists(db, Category, cat_id):
-                skipped += 1
-                continue
-
-            cat = Category(
-                id=cat_id,
-                name=cat_data.get("name"),
-                description=cat_data.get("description"),
-                icon=cat_data.get("icon"),
-                parent_id=None,  # Set later
-                created_at=self._parse_datetime(cat_data.get("created_at")) or datetime.utcnow()
-            )
-            db.add(cat)
-            imported += 1
-
-        db.flush()
-
-        # Second pass: update parent_id relationships
-        for cat_data in categories:
-            parent_id = cat_data.get("parent_id")
-            if parent_id:
-                cat = db.query(Category).filter(Category.id == cat_data.get("id")).first()
-                if cat:
-                    cat.parent_id = parent_id
-
-        db.flush()
-        return imported, skipped
+        """
+        Bulk insert the rows of one table. Returns (imported_count, skipped_count).
 
-    def _import_locations(
-        self, db: Session, locations: List[Dict], mode: str
-    ) -> Tuple[int, int]:
-        """Import locations, handling parent-child relationships."""
-        imported = 0
+        Self-referencing parents are inserted as NULL and set in a single
+        UPDATE pass afterwards, so rows may come in any order.
+        """
+        existing = self._existing_ids(db, model) if mode == "merge" else set()
+        hierarchical = "parent_id" in model.__table__.columns
+        mappings = []
+        parents = []
         skipped = 0
 
-        # First pass: import locations without parent_id
-        for loc_data in locations:
-            loc_id = loc_data.get("id")
-
-            if mode == "merge" and self._record_exists(db, Location, loc_id):
+        for data in rows:
+            record_id = data.get("id")
+            if record_id in existing:
                 skipped += 1
                 continue
+            existing.add(record_id)
 
-            loc = Location(
-                id=loc_id,
-                name=loc_data.get("name"),
-                description=loc_data.get("description"),
-                property_id=loc_data.get("property_id"),
-                parent_id=None,  # Set later
-                created_at=self._parse_datetime(loc_data.get("created_at")) or datetime.utcnow()
-            )
-            db.add(loc)
-            imported += 1
+            mapping = self._to_mapping(model, data)
+            if hierarchical and mapping["parent_id"]:
+                parents.append({"id": record_id, "parent_id": mapping["parent_id"]})
+                mapping["parent_id"] = None
+            mappings.append(mapping)
 
-        db.flush()
+        self._bulk_insert(db, model, mappings)
+        if parents:
+            db.bulk_update_mappings(model, parents)
 
-        # Second pass: update parent_id relationships
-        for loc_data in locations:
-            parent_id = loc_data.get("parent_id")
-            if parent_id:
-                loc = db.query(Location).filter(Location.id == loc_data.get("id")).first()
-                if loc:
-                    loc.parent_id = parent_id
+        return len(mappings), skipped
 
-        db.flush()
-        return imported, skipped
-
-    def _import_items(
-        self, db: Session, items: List[Dict], mode: str
-    ) -> Tuple[int, int]:
-        """Import items."""
-        imported = 0
-        skipped = 0
-
-        for item_data in items:
-            item_id = item_data.get("id")
-
-            if mode == "merge" and self._record_exists(db, Item, item_id):
-                skipped += 1
-                continue
-
-            item = Item(
-                id=item_id,
-                name=item_data.get("name"),
-                description=item_data.get("description"),
-                property_id=item_data.get("property_id"),
-                category_id=item_data.get("category_id"),
-                location_id=item_data.get("location_id"),
-                manufacturer=item_data.get("manufacturer"),
-                model_number=item_data.get("model_number"),
-                serial_number=item_data.get("serial_number"),
-                barcode=item_data.get("barcode"),
-                purchase_date=self._parse_date(item_data.get("purchase_date")),
-                purchase_price=item_data.get("purchase_price"),
-                purchase_location=item_data.get("purchase_location"),
-                current_value=item_data.get("current_value"),
-                currency=item_data.get("currency", "NOK"),
-                condition=item_data.get("condition"),
-                quantity=item_data.get("quantity", 1),
-                warranty_expiration=self._parse_date(item_data.get("warranty_expiration")),
-                notes=item_data.get("notes"),
-                tags=item_data.get("tags"),
-                custom_fields=item_data.get("custom_fields"),
-                created_at=self._parse_datetime(item_data.get("created_at")) or datetime.utcnow(),
-                updated_at=self._parse_datetime(item_data.get("updated_at"))
-            )
-            db.add(item)
-            imported += 1
-
-        db.flush()
-        return imported, skipped
-
-    def _import_images(
-        self, db: Session, images: List[Dict], temp_dir: str, mode: str
+    def _import_files(
+        self, db: Session, zipf: zipfile.ZipFile, kind: str, rows: List[Dict], mode: str
     ) -> Tuple[int, int, int]:
-        """Import image metadata and copy files. Returns (imported, skipped, files_copied)."""
-        imported = 0
+        """
+        Import image or document metadata and their files. Returns (imported, skipped, files_copied).
+
+        Files are copied out of the archive and hashed in the same pass;
+        content that is already stored is shared instead of kept twice.
+        """
+        model = Image if kind == IMAGE else Document
+        folder = "images" if kind == IMAGE else "documents"
+        base_path = settings.images_path if kind == IMAGE else settings.documents_path
+        default_filename = "image.jpg" if kind == IMAGE else "document.pdf"
+
+        existing = self._existing_ids(db, model) if mode == "merge" else set()
+        members = set(zipf.namelist())
+        used: Set[str] = set()
+        image_service = None
+        mappings = []
         skipped = 0
         files_copied = 0
 
-        for img_data in images:
-            img_id = img_data.get("id")
+        for data in rows:
+            # Exports record each file's archive name; for older ones, replay the
+            # numbering (every exported row took a name, including skipped ones)
+            if "archive_name" in data:
+                arcname = data["archive_name"]
+            else:
+                arcname = self._archive_name(used, folder, data)
 
-            if mode == "merge" and self._record_exists(db, Image, img_id):
+            record_id = data.get("id")
+            if record_id in existing:
                 skipped += 1
                 continue
+            existing.add(record_id)
 
-            # Create new filename for the image
-            original_filename = img_data.get("original_filename", "image.jpg")
-            ext = os.path.splitext(original_filename)[1] or ".jpg"
+            # Create new filename for the file
+            original_filename = data.get("original_filename") or default_filename
+            ext = os.path.splitext(original_filename)[1] or os.path.splitext(default_filename)[1]
             new_filename = f"{uuid.uuid4()}{ext}"
 
-            img = Image(
-                id=img_id,
-                item_id=img_data.get("item_id"),
+            mapping = self._to_mapping(
+                model, data,
                 filename=new_filename,
                 original_filename=original_filename,
-                file_size=img_data.get("file_size"),
-                mime_type=img_data.get("mime_type"),
-                width=img_data.get("width"),
-                height=img_data.get("height"),
-                is_primary=img_data.get("is_primary", False),
-                ai_analysis=img_data.get("ai_analysis"),
-                created_at=self._parse_datetime(img_data.get("created_at")) or datetime.utcnow()
+                content_hash=None,
+                **({"thumbnail_filename": None} if kind == IMAGE else {})
             )
-            db.add(img)
-            imported += 1
+            mappings.append(mapping)
 
-            # Copy image file
-            item_id = img_data.get("item_id")
-            old_original_filename = img_data.get("original_filename")
+            if arcname not in members:
+                continue
 
-            if item_id and old_original_filename:
-                # Look for the file in the export
-                src_path = os.path.join(temp_dir, "images", item_id, old_original_filename)
+            dst_path = os.path.join(base_path, new_filename)
+            mapping["content_hash"] = self._extract(zipf, arcname, dst_path)
 
-                if os.path.exists(src_path):
-                    dst_path = os.path.join(settings.images_path, new_filename)
-                    shutil.copy2(src_path, dst_path)
-                    files_copied += 1
+            # Identical files share one stored copy
+            blob = blob_store_service.claim(kind, mapping["content_hash"], db=db)
+            if blob is not None:
+                os.remove(dst_path)
+                mapping["filename"] = blob["filename"]
+                if kind == IMAGE:
+                    mapping["thumbnail_filename"] = blob["thumbnail_filename"]
+                continue
 
-                    # Try to create thumbnail
-                    try:
+            files_copied += 1
+            if kind == IMAGE:
+                # Try to create thumbnail
+                try:
+                    if image_service is None:
                         from .image_service import ImageService
                         image_service = ImageService()
-                        image_service.create_thumbnail(new_filename)
-                    except Exception as e:
-                        logger.warning(f"Failed to create thumbnail for {new_filename}: {e}")
-
-        db.flush()
-        return imported, skipped, files_copied
-
-    def _import_documents(
-        self, db: Session, documents: List[Dict], temp_dir: str, mode: str
-    ) -> Tuple[int, int, int]:
-        """Import document metadata and copy files. Returns (imported, skipped, files_copied)."""
-        imported = 0
-        skipped = 0
-        files_copied = 0
-
-        for doc_data in documents:
-            doc_id = doc_data.get("id")
-
-            if mode == "merge" and self._record_exists(db, Document, doc_id):
-                skipped += 1
-                continue
-
-            # Create new filename for the document
-            original_filename = doc_data.get("original_filename", "document.pdf")
-            ext = os.path.splitext(original_filename)[1] or ".pdf"
-            new_filename = f"{uuid.uuid4()}{ext}"
-
-            doc = Document(
-                id=doc_id,
-                item_id=doc_data.get("item_id"),
-                filename=new_filename,
-                original_filename=original_filename,
-                file_size=doc_data.get("file_size"),
-                mime_type=doc_data.get("mime_type"),
-                document_type=doc_data.get("document_type", "other"),
-                created_at=self._parse_datetime(doc_data.get("created_at")) or datetime.utcnow()
+                    mapping["thumbnail_filename"] = image_service.create_thumbnail(new_filename)
+                except Exception as e:
+                    logger.warning(f"Failed to create thumbnail for {new_filename}: {e}")
+
+            blob_store_service.register(
+                kind, mapping["content_hash"], new_filename, os.path.getsize(dst_path),
+                thumbnail_filename=mapping.get("thumbnail_filename"),
+                width=mapping.get("width"), height=mapping.get("height"), db=db
             )
-            db.add(doc)
-            imported += 1
-
-            # Copy document file
-            item_id = doc_data.get("item_id")
-            old_original_filename = doc_data.get("original_filename")
-
-            if item_id and old_original_filename:
-                # Look for the file in the export
-                src_path = os.path.join(temp_dir, "documents", item_id, old_original_filename)
 
-                if os.path.exists(src_path):
-                    dst_path = os.path.join(settings.documents_path, new_filename)
-                    shutil.copy2(src_path, dst_path)
-                    files_copied += 1
+        self._bulk_insert(db, model, mappings)
+        return len(mappings), skipped, files_copied
 
-        db.flush()
-        return imported, skipped, files_copied
-
-    def _import_insurance_policies(
-        self, db: Session, policies: List[Dict], mode: str
-    ) -> Tuple[int, int]:
-        """Import insurance policies."""
-        imported = 0
-        skipped = 0
-
-        for policy_data in policies:
-            policy_id = policy_data.get("id")
-
-            if mode == "merge" and self._record_exists(db, InsurancePolicy, policy_id):
-                skipped += 1
-                continue
-
-            policy = InsurancePolicy(
-                id=policy_id,
-                property_id=policy_data.get("property_id"),
-                provider=policy_data.get("provider"),
-                policy_number=policy_data.get("policy_number"),
-                policy_type=policy_data.get("policy_type"),
-                coverage_amount=policy_data.get("coverage_amount"),
-                deductible=policy_data.get("deductible"),
-                premium=policy_data.get("premium"),
-                premium_frequency=policy_data.get("premium_frequency"),
-                start_date=self._parse_date(policy_data.get("start_date")),
-                end_date=self._parse_date(policy_data.get("end_date")),
-                notes=policy_data.get("notes"),
-                created_at=self._parse_datetime(policy_data.get("created_at")) or datetime.utcnow()
-            )
-            db.add(policy)
-            imported += 1
+    def _archive_name(self, used: Set[str], folder: str, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Name an older export (without archive_name in data.json) gave a row's
+        file: <folder>/<item_id>/<original filename>, numbered on repeats.
+        """
+        filename = data.get("original_filename") or data.get("filename")
+        item_id = data.get("item_id")
+        if not item_id or not filename:
+            return None
 
-        db.flush()
-        return imported, skipped
+        arcname = f"{folder}/{item_id}/{filename}"
+        counter = 1
+        base, ext = os.path.splitext(filename)
+        while arcname in used:
+            arcname = f"{folder}/{item_id}/{base}_{counter}{ext}"
+            counter += 1
+        used.add(arcname)
+        return arcname
+
+    def _extract(self, zipf: zipfile.ZipFile, arcname: str, dst_path: str) -> str:
+        """Copy an archive member to dst_path. Returns the SHA-256 hex digest of its content."""
+        digest = hashlib.sha256()
+        try:
+            with zipf.open(arcname) as src, open(dst_path, "wb") as dst:
+                for chunk in iter(lambda: src.read(_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+        except BaseException:
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+            raise
+        return digest.hexdigest()
 
 
 # Singleton instance
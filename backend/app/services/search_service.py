@@ -0,0 +1,143 @@
+"""
+Full-text search for items backed by an SQLite FTS5 index.
+"""
+import re
+import logging
+from typing import Optional
+
+from sqlalchemy import or_, false, text, table, column, func, select, literal_column
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Query
+
+from ..database import engine
+from ..models.item import Item
+
+logger = logging.getLogger(__name__)
+
+# Columns mirrored from the items table, in index order
+FTS_COLUMNS = ["name", "description", "manufacturer", "model_number", "serial_number", "tags", "notes"]
+
+# bm25 weights per column (same order as FTS_COLUMNS) - name matches rank highest
+FTS_WEIGHTS = [10.0, 2.0, 4.0, 4.0, 4.0, 3.0, 1.0]
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+items_fts = table("items_fts", column("rowid"), column("items_fts"))
+
+
+class SearchService:
+    """Service for maintaining and querying the items full-text index."""
+
+    def __init__(self):
+        self.available = False
+
+    def _create_statements(self) -> list[str]:
+        """DDL for the external-content FTS5 table and its sync triggers."""
+        cols = ", ".join(FTS_COLUMNS)
+        new_cols = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+        old_cols = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+        return [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+                {cols},
+                content='items',
+                content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            )""",
+            f"""CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+                INSERT INTO items_fts(rowid, {cols}) VALUES (new.rowid, {new_cols});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+                INSERT INTO items_fts(items_fts, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE ON items BEGIN
+                INSERT INTO items_fts(items_fts, rowid, {cols}) VALUES ('delete', old.rowid, {old_cols});
+                INSERT INTO items_fts(rowid, {cols}) VALUES (new.rowid, {new_cols});
+            END""",
+        ]
+
+    def init_index(self) -> None:
+        """
+        Create the FTS5 index and triggers if missing, and rebuild it when it
+        is new or out of sync with the items table.
+
+        Falls back to LIKE-based search if SQLite was built without FTS5.
+        """
+        try:
+            with engine.connect() as conn:
+                existed = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'"
+                )).first() is not None
+
+                for statement in self._create_statements():
+                    conn.execute(text(statement))
+                conn.commit()
+
+                needs_rebuild = not existed
+                if existed:
+                    # VACUUM may renumber rowids of the items table, so verify
+                    # the index still matches its content table
+                    try:
+                        conn.execute(text("INSERT INTO items_fts(items_fts, rank) VALUES ('integrity-check', 1)"))
+                    except OperationalError:
+                        needs_rebuild = True
+
+                if needs_rebuild:
+                    logger.info("Rebuilding items full-text search index")
+                    conn.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+                conn.commit()
+
+            self.available = True
+        except OperationalError as e:
+            self.available = False
+            logger.warning(f"FTS5 search index unavailable, falling back to LIKE search: {e}")
+
+    def build_match_expression(self, search: str) -> Optional[str]:
+        """
+        Convert free text into an FTS5 MATCH expression.
+
+        Every token is quoted (so user input can't inject FTS syntax) and
+        prefix-matched; tokens are ANDed together.
+        """
+        tokens = _TOKEN_PATTERN.findall(search)
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def apply_search(self, query: Query, search: str, ranked: bool = True) -> Query:
+        """
+        Filter an Item query by a search string.
+
+        Uses the FTS5 index when available, ordering by bm25 relevance if
+        ``ranked`` is set. Otherwise falls back to infix LIKE matching.
+        """
+        match = self.build_match_expression(search) if self.available else None
+
+        if match is None:
+            if self.available:
+                # Only punctuation - nothing the index can match on
+                return query.filter(false())
+            search_filter = f"%{search}%"
+            return query.filter(
+                or_(
+                    Item.name.ilike(search_filter),
+                    Item.description.ilike(search_filter),
+                    Item.manufacturer.ilike(search_filter),
+                    Item.model_number.ilike(search_filter),
+                    Item.serial_number.ilike(search_filter)
+                )
+            )
+
+        matches = select(
+            items_fts.c.rowid.label("rowid"),
+            func.bm25(literal_column("items_fts"), *FTS_WEIGHTS).label("rank")
+        ).where(items_fts.c.items_fts.op("MATCH")(match)).subquery("fts_matches")
+
+        query = query.join(matches, literal_column("items.rowid") == matches.c.rowid)
+        if ranked:
+            query = query.order_by(matches.c.rank)
+        return query
+
+
+# Singleton instance
+search_service = SearchService()
@@ -1,7 +1,9 @@
 import os
 import uuid
-import aiofiles
+import shutil
+import asyncio
 from ..config import settings
+from .blob_store_service import blob_store_service, DOCUMENT
 
 
 class StorageService:
@@ -10,29 +12,40 @@ class StorageService:
     def __init__(self):
         self.documents_path = settings.documents_path
 
-    async def save_document(self, file_content: bytes, original_filename: str) -> tuple[str, int]:
+    async def save_document(self, source_path: str, original_filename: str) -> tuple[str, int, str]:
         """
         Save document file
 
+        Uploads are deduplicated by content: if the same bytes were uploaded
+        before, the stored file is reused and the upload is left in place.
+
         Args:
-            file_content: File content in bytes
+            source_path: Path to the uploaded (spooled) file; moved into storage
             original_filename: Original filename
 
         Returns:
-            Tuple of (filename, file_size)
+            Tuple of (filename, file_size, content_hash)
         """
-        # Generate unique filename
-        ext = original_filename.split(".")[-1].lower() if "." in original_filename else "bin"
-        filename = f"{uuid.uuid4()}.{ext}"
-        filepath = os.path.join(self.documents_path, filename)
+        content_hash = await blob_store_service.hash_file(source_path)
+
+        async with blob_store_service.lock(DOCUMENT, content_hash):
+            blob = blob_store_service.claim(DOCUMENT, content_hash)
+            if blob is not None:
+                return blob["filename"], blob["file_size"], content_hash
+
+            # Generate unique filename
+            ext = original_filename.split(".")[-1].lower() if "." in original_filename else "bin"
+            filename = f"{uuid.uuid4()}.{ext}"
+            filepath = os.path.join(self.documents_path, filename)
 
-        # Save file
-        async with aiofiles.open(filepath, "wb") as f:
-            await f.write(file_content)
+            # Move file (a rename when the spool is on the same filesystem)
+            file_size = os.path.getsize(source_path)
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, shutil.move, source_path, filepath)
 
-        file_size = len(file_content)
+            blob_store_service.register(DOCUMENT, content_hash, filename, file_size)
 
-        return filename, file_size
+        return filename, file_size, content_hash
 
     async def delete_document(self, filename: str):
         """Delete document file"""
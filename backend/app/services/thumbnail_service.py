@@ -0,0 +1,132 @@
+"""
+Thumbnail integrity checking and backfill.
+
+Scans image records in batches, regenerates thumbnails that are missing or
+recorded under the wrong name (in parallel through the image worker pool)
+and stores the thumbnail filename on each Image row.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.image import Image
+from .image_service import ImageService, thumbnail_filename_for, create_thumbnail
+from .image_worker_pool import image_worker_pool
+from .file_lookup_cache import file_lookup_cache
+
+logger = logging.getLogger(__name__)
+
+_BATCH_SIZE = 200
+
+
+class ThumbnailService:
+    """Service for verifying and regenerating image thumbnails."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_result: Optional[Dict] = None
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start_backfill(self, only_unrecorded: bool = False) -> bool:
+        """Start a backfill in the background. Returns False if one is already running."""
+        if self.is_running():
+            return False
+        self._task = asyncio.create_task(self.backfill(only_unrecorded))
+        return True
+
+    async def stop(self) -> None:
+        if self.is_running():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def backfill(self, only_unrecorded: bool = False) -> Dict:
+        """
+        Check every image and repair its thumbnail.
+
+        Args:
+            only_unrecorded: Only check images without a recorded thumbnail
+                filename (cheap enough to run at every startup)
+
+        Returns:
+            Counts of images checked, thumbnails regenerated, filenames
+            recorded and images whose source file is missing
+        """
+        image_service = ImageService()
+        result = {"checked": 0, "regenerated": 0, "recorded": 0, "missing_source": 0, "failed": 0}
+        started_at = datetime.utcnow()
+        # Leave headroom in the pool for uploads
+        limit = asyncio.Semaphore(max(1, settings.image_workers - 1))
+
+        async def regenerate(filename: str, thumbnail_filename: str) -> bool:
+            async with limit:
+                try:
+                    await image_worker_pool.run(
+                        create_thumbnail,
+                        image_service.get_image_path(filename),
+                        image_service.get_thumbnail_path(thumbnail_filename)
+                    )
+                    return True
+                except Exception as e:
+                    logger.warning(f"Thumbnail generation failed for {filename}: {e}")
+                    return False
+
+        last_id = ""
+        while True:
+            db = SessionLocal()
+            try:
+                query = db.query(Image.id, Image.filename, Image.thumbnail_filename).filter(Image.id > last_id)
+                if only_unrecorded:
+                    query = query.filter(Image.thumbnail_filename.is_(None))
+                images = query.order_by(Image.id).limit(_BATCH_SIZE).all()
+                if not images:
+                    break
+                last_id = images[-1].id
+
+                updates = {}
+                pending = []
+                for image in images:
+                    result["checked"] += 1
+                    expected = thumbnail_filename_for(image.filename)
+
+                    if os.path.exists(image_service.get_thumbnail_path(expected)):
+                        if image.thumbnail_filename != expected:
+                            updates[image.id] = expected
+                    elif os.path.exists(image_service.get_image_path(image.filename)):
+                        pending.append((image.id, image.filename, expected))
+                    else:
+                        result["missing_source"] += 1
+
+                outcomes = await asyncio.gather(*[
+                    regenerate(filename, expected) for _, filename, expected in pending
+                ])
+                for (image_id, _, expected), ok in zip(pending, outcomes):
+                    if ok:
+                        result["regenerated"] += 1
+                        updates[image_id] = expected
+                    else:
+                        result["failed"] += 1
+
+                for image_id, thumbnail_filename in updates.items():
+                    db.query(Image).filter(Image.id == image_id).update(
+                        {"thumbnail_filename": thumbnail_filename}, synchronize_session=False
+                    )
+                    file_lookup_cache.invalidate("image", image_id)
+                result["recorded"] += len(updates)
+                db.commit()
+            finally:
+                db.close()
+
+        result["duration_seconds"] = round((datetime.utcnow() - started_at).total_seconds(), 2)
+        self.last_result = result
+        logger.info(f"Thumbnail backfill finished: {result}")
+        return result
+
+
+# Singleton instance
+thumbnail_service = ThumbnailService()
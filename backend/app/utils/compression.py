@@ -0,0 +1,95 @@
+"""
+Streaming gzip/zstd compression for backup files.
+
+The codec is recognised from the file suffix (.gz / .zst), so readers do not
+need to know how a file was written. zstd needs the optional zstandard
+package; without it, zstd falls back to gzip.
+"""
+import gzip
+import logging
+import shutil
+from typing import IO, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def resolve_compression(name: Optional[str]) -> Optional[str]:
+    """Normalise a configured codec name; None means uncompressed."""
+    name = (name or "").strip().lower()
+    if name in ("", "none", "off"):
+        return None
+    if name not in SUFFIXES:
+        raise ValueError(f"Unknown compression: {name}")
+    if name == "zstd" and not ZSTD_AVAILABLE:
+        logger.warning("zstandard is not installed, using gzip compression")
+        return "gzip"
+    return name
+
+
+def compression_of(filename: str) -> Optional[str]:
+    """Codec a file was written with, from its suffix."""
+    for name, suffix in SUFFIXES.items():
+        if filename.endswith(suffix):
+            return name
+    return None
+
+
+def strip_compression_suffix(filename: str) -> str:
+    compression = compression_of(filename)
+    return filename[:-len(SUFFIXES[compression])] if compression else filename
+
+
+def open_compressed(path: str, mode: str = "rb", compression: Optional[str] = None,
+                    level: Optional[int] = None) -> IO[bytes]:
+    """
+    Open a file for streaming binary reads or writes through its codec.
+
+    Args:
+        mode: "rb" or "wb"
+        compression: Codec to use; detected from the path when omitted
+        level: Compression level for writes (codec default when omitted)
+    """
+    compression = compression or compression_of(path)
+    if compression is None:
+        return open(path, mode)
+
+    level = level if level is not None else DEFAULT_LEVELS[compression]
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=level) if mode == "wb" else gzip.open(path, mode)
+
+    if zstandard is None:
+        raise RuntimeError("Reading or writing .zst files requires the zstandard package")
+    if mode == "wb":
+        return zstandard.ZstdCompressor(level=level).stream_writer(open(path, "wb"), closefd=True)
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+
+def compress_file(source_path: str, dest_path: str, compression: str, level: Optional[int] = None) -> None:
+    """Stream source_path into dest_path through the given codec."""
+    with open(source_path, "rb") as src, open_compressed(dest_path, "wb", compression, level) as dst:
+        shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+
+
+def decompress_file(source_path: str, dest_path: str) -> None:
+    """Stream a (possibly) compressed file into an uncompressed copy."""
+    with open_compressed(source_path, "rb") as src, open(dest_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+
+
+def iter_decompressed(path: str, chunk_size: int = _CHUNK_SIZE):
+    """Yield the decompressed content of a file in chunks."""
+    with open_compressed(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield chunk
@@ -0,0 +1,154 @@
+import os
+import re
+import typing
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# ASGI extension letting the server send file bytes straight from the descriptor (sendfile)
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: typing.Optional[str], size: int) -> typing.Optional[typing.Tuple[int, int]]:
+    """
+    Parse a single-range Range header into an inclusive (start, end) pair.
+
+    Returns None when the header is absent, malformed or asks for several
+    ranges (the full file is served then, as RFC 9110 allows).
+
+    Raises:
+        ValueError: When the range cannot be satisfied
+    """
+    if not header:
+        return None
+
+    match = _RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse with HTTP Range support (206 Partial Content) and zero-copy
+    transfer when the ASGI server offers the zerocopysend extension.
+
+    Only single byte ranges are honoured; If-Range is compared against the
+    response's ETag so a changed file is sent in full.
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        request: Request,
+        stat_result: os.stat_result,
+        **kwargs
+    ) -> None:
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        size = stat_result.st_size
+        self.headers["accept-ranges"] = "bytes"
+        self.range: typing.Optional[typing.Tuple[int, int]] = None
+
+        if_range = request.headers.get("if-range")
+        if if_range and if_range.strip() != self.headers.get("etag"):
+            return
+
+        try:
+            self.range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            self.status_code = 416
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+            return
+
+        if self.range is not None:
+            start, end = self.range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        start, end = self.range or (0, self.stat_result.st_size - 1)
+        remaining = end - start + 1
+
+        if scope["method"].upper() == "HEAD" or self.status_code == 416 or remaining <= 0:
+            # No body to send (an empty file included), but the response must still end
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": file.fileno(),
+                    "offset": start,
+                    "count": remaining,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    })
+                if remaining > 0:
+                    # File shrank underneath us - end the body cleanly
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        if self.background is not None:
+            await self.background()
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that leaves stored-file downloads alone.
+
+    Images and documents are already compressed, compressing them again
+    breaks Content-Length/Content-Range for partial responses, and the gzip
+    wrapper would drop zero-copy send messages.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        exclude_paths: typing.Sequence[str] = ()
+    ) -> None:
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_patterns = [re.compile(pattern) for pattern in exclude_paths]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and any(pattern.match(scope["path"]) for pattern in self.exclude_patterns):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
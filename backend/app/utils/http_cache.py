@@ -0,0 +1,39 @@
+import os
+from fastapi import Request
+from fastapi.responses import Response
+
+# Stored files are named by UUID and never rewritten in place, so clients may keep them forever
+IMMUTABLE_PUBLIC = "public, max-age=31536000, immutable"
+IMMUTABLE_PRIVATE = "private, max-age=31536000, immutable"
+
+# For the one exception: a new image awaiting its background re-encode, which
+# replaces the file once. Clients must revalidate (by ETag) until then.
+REVALIDATE_PUBLIC = "public, no-cache"
+
+
+def make_etag(filepath: str, size: int) -> str:
+    """Strong ETag for a stored file (UUID filename plus size)"""
+    return f'"{os.path.basename(filepath)}-{size:x}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """304 response carrying the validator and caching headers"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    """Headers for a full response of a cacheable file"""
+    return {"ETag": etag, "Cache-Control": cache_control}
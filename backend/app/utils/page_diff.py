@@ -0,0 +1,145 @@
+"""
+Page-level differences between two SQLite database files.
+
+A diff holds the pages of a snapshot that differ from a base file (pages past
+the end of the base count as changed), plus the snapshot's page count so a
+database that shrank is truncated on reassembly. Layout:
+
+    MAGIC | header length (uint32) | JSON header | (page number (uint32) | page)*
+
+Base and diff files may be gzip/zstd compressed (recognised by suffix); they
+are only ever read and written sequentially.
+"""
+import json
+import os
+import struct
+from typing import IO, Dict, Optional
+
+from .compression import open_compressed, compression_of, decompress_file
+
+MAGIC = b"HRPGDIFF1\n"
+_UINT32 = struct.Struct(">I")
+
+
+def _page_size(path: str) -> int:
+    """Read the page size from a SQLite database header."""
+    with open_compressed(path, "rb") as f:
+        header = _read_exact(f, 100)
+    if len(header) < 100 or not header.startswith(b"SQLite format 3\0"):
+        raise ValueError(f"Not a SQLite database: {path}")
+    size = int.from_bytes(header[16:18], "big")
+    return 65536 if size == 1 else size
+
+
+def write_page_diff(base_path: str, snapshot_path: str, diff_path: str, base_name: str,
+                    max_ratio: float = 1.0, level: Optional[int] = None) -> Optional[Dict]:
+    """
+    Write the pages of snapshot_path that differ from base_path to diff_path.
+
+    Args:
+        base_name: Base file name recorded in the diff header
+        max_ratio: Give up (and return None) once the changed pages exceed
+            this fraction of the snapshot - a full copy is better then
+        level: Compression level when diff_path has a .gz/.zst suffix
+
+    Returns:
+        Header dict with changed_pages added, or None if the diff was abandoned
+    """
+    page_size = _page_size(snapshot_path)
+    if _page_size(base_path) != page_size:
+        return None
+
+    snapshot_size = os.path.getsize(snapshot_path)
+    page_count = snapshot_size // page_size
+    limit = int(page_count * max_ratio)
+    header = {"base": base_name, "page_size": page_size, "page_count": page_count}
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    changed = 0
+    partial_path = f"{diff_path}.partial"
+    try:
+        with open_compressed(base_path, "rb") as base, open(snapshot_path, "rb") as snapshot, \
+                open_compressed(partial_path, "wb", compression_of(diff_path), level) as out:
+            out.write(MAGIC)
+            out.write(_UINT32.pack(len(header_bytes)))
+            out.write(header_bytes)
+
+            for page_number in range(page_count):
+                page = snapshot.read(page_size)
+                if _read_exact(base, page_size) == page:
+                    continue
+                changed += 1
+                if changed > limit:
+                    raise _DiffTooLarge()
+                out.write(_UINT32.pack(page_number))
+                out.write(page)
+    except _DiffTooLarge:
+        os.remove(partial_path)
+        return None
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    os.replace(partial_path, diff_path)
+    return {**header, "changed_pages": changed}
+
+
+def read_diff_header(diff_path: str) -> Dict:
+    """Read the JSON header of a page diff."""
+    with open_compressed(diff_path, "rb") as f:
+        return _read_header(f, diff_path)
+
+
+def apply_page_diff(base_path: str, diff_path: str, dest_path: str) -> Dict:
+    """
+    Reassemble the snapshot a diff was taken from into dest_path.
+
+    Returns:
+        The diff header
+    """
+    partial_path = f"{dest_path}.partial"
+    try:
+        decompress_file(base_path, partial_path)
+        with open_compressed(diff_path, "rb") as diff, open(partial_path, "r+b") as out:
+            header = _read_header(diff, diff_path)
+            page_size = header["page_size"]
+            while True:
+                number = _read_exact(diff, _UINT32.size)
+                if not number:
+                    break
+                page = _read_exact(diff, page_size)
+                if len(number) != _UINT32.size or len(page) != page_size:
+                    raise ValueError(f"Truncated backup diff: {diff_path}")
+                out.seek(_UINT32.unpack(number)[0] * page_size)
+                out.write(page)
+            out.truncate(header["page_count"] * page_size)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    os.replace(partial_path, dest_path)
+    return header
+
+
+def _read_exact(f: IO[bytes], size: int) -> bytes:
+    """Read size bytes (fewer only at end of file); decompressing readers may return short reads."""
+    data = f.read(size)
+    while len(data) < size:
+        more = f.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def _read_header(f: IO[bytes], diff_path: str) -> Dict:
+    if _read_exact(f, len(MAGIC)) != MAGIC:
+        raise ValueError(f"Not a backup diff: {diff_path}")
+    (length,) = _UINT32.unpack(_read_exact(f, _UINT32.size))
+    return json.loads(_read_exact(f, length).decode("utf-8"))
+
+
+class _DiffTooLarge(Exception):
+    pass
@@ -0,0 +1,60 @@
+import os
+import tempfile
+from typing import Optional, Tuple
+from fastapi import HTTPException, UploadFile
+
+# Bytes read from the upload per iteration when spooling
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def get_upload_extension(filename: Optional[str], default: str = "bin") -> str:
+    """Lowercase file extension of an uploaded filename, without the dot"""
+    if filename and "." in filename:
+        return filename.rsplit(".", 1)[-1].lower()
+    return default
+
+
+async def spool_upload(
+    file: UploadFile,
+    max_size_mb: int,
+    directory: Optional[str] = None
+) -> Tuple[str, int]:
+    """
+    Stream an uploaded file to disk in chunks, enforcing a size limit.
+
+    The upload is never held in memory as a whole. Oversized files are
+    rejected with 413 as soon as the limit is crossed (or up front when the
+    size is already known), and the partial file is removed. The caller owns
+    the returned file and must move or delete it.
+
+    Args:
+        file: The uploaded file
+        max_size_mb: Maximum allowed size in megabytes
+        directory: Directory for the spooled file (system temp dir by default)
+
+    Returns:
+        Tuple of (spooled file path, size in bytes)
+    """
+    max_bytes = max_size_mb * 1024 * 1024
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"{file.filename or 'File'} exceeds the {max_size_mb} MB upload limit"
+    )
+
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+
+    fd, path = tempfile.mkstemp(suffix=f".{get_upload_extension(file.filename)}", dir=directory)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise too_large
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return path, size
@@ -0,0 +1,124 @@
+"""
+Benchmark dashboard aggregates: live queries vs. the materialized stats table.
+
+Creates a throwaway database, fills it with synthetic items and times both
+paths. Run from the backend directory:
+
+    python -m scripts.benchmark_dashboard --items 10000 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+# Point the app at a scratch data directory before importing it
+_data_dir = tempfile.mkdtemp(prefix="homeregistry_bench_")
+os.environ["DATABASE_URL"] = os.path.join(_data_dir, "bench.db")
+os.environ["IMAGES_PATH"] = os.path.join(_data_dir, "images")
+os.environ["DOCUMENTS_PATH"] = os.path.join(_data_dir, "documents")
+os.environ["BACKUP_DIR"] = os.path.join(_data_dir, "backups")
+
+from sqlalchemy import func, text  # noqa: E402
+
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app.models import Item, Image, Document, Category, Location  # noqa: E402
+from app.services.dashboard_stats_service import dashboard_stats_service  # noqa: E402
+
+
+def populate(item_count: int) -> None:
+    """Insert synthetic categories, locations, items, images and documents."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    category_ids = [str(uuid.uuid4()) for _ in range(20)]
+    location_ids = [str(uuid.uuid4()) for _ in range(40)]
+
+    with engine.begin() as conn:
+        conn.execute(Category.__table__.insert(), [{"id": c, "name": f"Category {i}"} for i, c in enumerate(category_ids)])
+        conn.execute(Location.__table__.insert(), [
+            {"id": l, "name": f"Location {i}", "location_type": "ROOM"} for i, l in enumerate(location_ids)
+        ])
+
+        batch = 5000
+        for start in range(0, item_count, batch):
+            items, images, documents = [], [], []
+            for _ in range(min(batch, item_count - start)):
+                item_id = str(uuid.uuid4())
+                items.append({
+                    "id": item_id,
+                    "name": f"Item {start}",
+                    "category_id": random.choice(category_ids),
+                    "location_id": random.choice(location_ids),
+                    "current_value": random.randint(0, 20000),
+                    "quantity": 1,
+                    "currency": "NOK",
+                })
+                if random.random() < 0.7:
+                    images.append({"id": str(uuid.uuid4()), "item_id": item_id, "filename": "x.webp",
+                                   "original_filename": "x.jpg", "file_size": 1, "mime_type": "image/webp"})
+                if random.random() < 0.4:
+                    documents.append({"id": str(uuid.uuid4()), "item_id": item_id, "filename": "x.pdf",
+                                      "original_filename": "x.pdf", "document_type": "RECEIPT",
+                                      "file_size": 1, "mime_type": "application/pdf"})
+            conn.execute(Item.__table__.insert(), items)
+            if images:
+                conn.execute(Image.__table__.insert(), images)
+            if documents:
+                conn.execute(Document.__table__.insert(), documents)
+
+
+def live_aggregates(db) -> None:
+    """The per-request aggregate queries the dashboard used to run."""
+    db.query(func.count(Item.id), func.sum(Item.current_value)).first()
+    db.query(Category.name, func.count(Item.id)).join(Item, Category.id == Item.category_id, isouter=True).group_by(Category.name).all()
+    db.query(Location.name, func.count(Item.id)).join(Item, Location.id == Item.location_id, isouter=True).group_by(Location.name).all()
+    items_with_docs = db.query(Document.item_id).distinct()
+    items_with_images = db.query(Image.item_id).distinct()
+    db.query(Item).filter(Item.id.in_(items_with_docs), Item.id.in_(items_with_images)).count()
+    db.query(Item.property_id, func.sum(Item.current_value)).filter(Item.property_id.isnot(None)).group_by(Item.property_id).all()
+
+
+def materialized_aggregates(db) -> None:
+    """The single summary read plus the small name lookups."""
+    dashboard_stats_service.get_summary(db)
+    db.query(Category.id, Category.name).all()
+    db.query(Location.id, Location.name).all()
+
+
+def timed(fn, db, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(db)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for item_count in args.items:
+        populate(item_count)
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            dashboard_stats_service.rebuild(db)
+            rebuild_ms = (time.perf_counter() - start) * 1000
+            db.execute(text("ANALYZE"))
+
+            live_ms = timed(live_aggregates, db, args.repeat)
+            materialized_ms = timed(materialized_aggregates, db, args.repeat)
+        finally:
+            db.close()
+
+        print(
+            f"{item_count:>8} items | live: {live_ms:8.1f} ms | materialized: {materialized_ms:6.2f} ms "
+            f"| speedup: {live_ms / materialized_ms:6.1f}x | rebuild: {rebuild_ms:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark document downloads: Starlette's FileResponse vs. RangeFileResponse.
+
+Writes a scratch file and drives both ASGI responses directly with a
+byte-counting send, reporting throughput and peak Python memory for full
+downloads and for ranged reads. Run from the backend directory:
+
+    python -m scripts.benchmark_downloads --size-mb 64 256 --runs 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from fastapi.responses import FileResponse
+from starlette.requests import Request
+
+from app.utils.file_responses import RangeFileResponse
+
+
+def make_request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/documents/bench",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "extensions": {},
+    })
+
+
+async def drive(response, request: Request) -> int:
+    """Run a response against a sink and return the number of body bytes sent."""
+    received = 0
+
+    async def receive():
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    await response(request.scope, receive, send)
+    return received
+
+
+def measure(label: str, build, runs: int) -> None:
+    best, peak, sent = float("inf"), 0, 0
+    for _ in range(runs):
+        response, request = build()
+        tracemalloc.start()
+        started = time.perf_counter()
+        sent = asyncio.run(drive(response, request))
+        elapsed = time.perf_counter() - started
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best = min(best, elapsed)
+
+    throughput = sent / best / (1024 * 1024) if best else 0
+    print(f"  {label:<34} {sent / 1024 / 1024:>8.1f} MB  {throughput:>8.0f} MB/s  peak {peak / 1024:>8.0f} KB")
+
+
+def run(size_mb: int, runs: int) -> None:
+    fd, path = tempfile.mkstemp(prefix="homeregistry_bench_", suffix=".bin")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            chunk = os.urandom(1024 * 1024)
+            for _ in range(size_mb):
+                f.write(chunk)
+        stat_result = os.stat(path)
+        tail = f"bytes={stat_result.st_size // 2}-"
+
+        print(f"\n{size_mb} MB file, best of {runs}")
+        measure("FileResponse (full)", lambda: (
+            FileResponse(path, stat_result=stat_result), make_request({})
+        ), runs)
+        measure("RangeFileResponse (full)", lambda: (
+            RangeFileResponse(path, make_request({}), stat_result=stat_result), make_request({})
+        ), runs)
+        measure("FileResponse (Range ignored)", lambda: (
+            FileResponse(path, stat_result=stat_result), make_request({"Range": tail})
+        ), runs)
+        measure("RangeFileResponse (second half)", lambda: (
+            RangeFileResponse(path, make_request({"Range": tail}), stat_result=stat_result),
+            make_request({"Range": tail})
+        ), runs)
+    finally:
+        os.remove(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, nargs="+", default=[64, 256])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for size_mb in args.size_mb:
+        run(size_mb, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Check that loading report data takes a fixed number of queries.
+
+Creates a throwaway database, fills a property with synthetic items (with
+categories, locations, images and documents) and counts the SQL statements
+load_report_data issues, next to what lazy loading the same relationships
+costs. Exits non-zero if the count grows with the number of items. Run from
+the backend directory:
+
+    python -m scripts.check_report_queries --items 100 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+# Point the app at a scratch data directory before importing it
+_data_dir = tempfile.mkdtemp(prefix="homeregistry_bench_")
+os.environ["DATABASE_URL"] = os.path.join(_data_dir, "bench.db")
+os.environ["IMAGES_PATH"] = os.path.join(_data_dir, "images")
+os.environ["DOCUMENTS_PATH"] = os.path.join(_data_dir, "documents")
+os.environ["BACKUP_DIR"] = os.path.join(_data_dir, "backups")
+
+from sqlalchemy import event  # noqa: E402
+
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app.models import Item, Image, Document, Category, Location, Property  # noqa: E402
+from app.services.report_data_service import load_report_data  # noqa: E402
+
+# Property, policies, items (category and location joined), images, documents
+EXPECTED_QUERIES = 5
+
+
+def populate(item_count: int) -> str:
+    """Insert a property with synthetic items. Returns the property ID."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    property_id = str(uuid.uuid4())
+    category_ids = [str(uuid.uuid4()) for _ in range(20)]
+    location_ids = [str(uuid.uuid4()) for _ in range(40)]
+
+    with engine.begin() as conn:
+        conn.execute(Property.__table__.insert(), [{
+            "id": property_id, "name": "Bench", "address_street": "-", "address_city": "-",
+            "address_state": "-", "address_postal_code": "-", "address_country": "-",
+            "primary_contact_name": "-",
+        }])
+        conn.execute(Category.__table__.insert(), [{"id": c, "name": f"Category {i}"} for i, c in enumerate(category_ids)])
+        conn.execute(Location.__table__.insert(), [
+            {"id": l, "name": f"Location {i}", "location_type": "ROOM", "property_id": property_id}
+            for i, l in enumerate(location_ids)
+        ])
+
+        items, images, documents = [], [], []
+        for n in range(item_count):
+            item_id = str(uuid.uuid4())
+            items.append({
+                "id": item_id,
+                "name": f"Item {n}",
+                "property_id": property_id,
+                "category_id": random.choice(category_ids),
+                "location_id": random.choice(location_ids),
+                "current_value": random.randint(0, 20000),
+                "quantity": 1,
+                "currency": "NOK",
+            })
+            images.append({"id": str(uuid.uuid4()), "item_id": item_id, "filename": "x.webp",
+                           "original_filename": "x.jpg", "file_size": 1, "mime_type": "image/webp"})
+            if random.random() < 0.4:
+                documents.append({"id": str(uuid.uuid4()), "item_id": item_id, "filename": "x.pdf",
+                                  "original_filename": "x.pdf", "document_type": "RECEIPT",
+                                  "file_size": 1, "mime_type": "application/pdf"})
+        conn.execute(Item.__table__.insert(), items)
+        conn.execute(Image.__table__.insert(), images)
+        if documents:
+            conn.execute(Document.__table__.insert(), documents)
+
+    return property_id
+
+
+def lazy_load(db, property_id: str) -> None:
+    """What the report used to do: plain query, relationships touched per item."""
+    for item in db.query(Item).filter(Item.property_id == property_id).all():
+        _ = item.category, item.location, list(item.images), list(item.documents)
+
+
+def count_queries(fn, *args) -> tuple:
+    """Run fn and return (statements executed, milliseconds)."""
+    count = 0
+
+    def before_cursor_execute(*_):
+        nonlocal count
+        count += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        start = time.perf_counter()
+        fn(*args)
+        return count, (time.perf_counter() - start) * 1000
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 2000])
+    args = parser.parse_args()
+
+    failed = False
+    for item_count in args.items:
+        property_id = populate(item_count)
+
+        db = SessionLocal()
+        try:
+            loader_queries, loader_ms = count_queries(load_report_data, db, property_id)
+        finally:
+            db.close()
+
+        db = SessionLocal()
+        try:
+            lazy_queries, lazy_ms = count_queries(lazy_load, db, property_id)
+        finally:
+            db.close()
+
+        ok = loader_queries <= EXPECTED_QUERIES
+        failed |= not ok
+        print(
+            f"{item_count:>8} items | loader: {loader_queries:3d} queries {loader_ms:8.1f} ms "
+            f"| lazy: {lazy_queries:6d} queries {lazy_ms:8.1f} ms | {'ok' if ok else 'FAIL'}"
+        )
+
+    if failed:
+        print(f"load_report_data must not take more than {EXPECTED_QUERIES} queries")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Check that item search finds tags, including non-ASCII ones.
+
+Creates a throwaway database with items tagged in ASCII and non-ASCII text
+(one of them stored the old way, with \\uXXXX escapes, to exercise the
+migration) and runs searches through the full-text index. Exits non-zero if
+any search misses. Run from the backend directory:
+
+    python -m scripts.check_search
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+# Point the app at a scratch data directory before importing it
+_data_dir = tempfile.mkdtemp(prefix="homeregistry_search_")
+os.environ["DATABASE_URL"] = os.path.join(_data_dir, "search.db")
+os.environ["IMAGES_PATH"] = os.path.join(_data_dir, "images")
+os.environ["DOCUMENTS_PATH"] = os.path.join(_data_dir, "documents")
+os.environ["BACKUP_DIR"] = os.path.join(_data_dir, "backups")
+
+from sqlalchemy import text  # noqa: E402
+
+import app.models  # noqa: E402,F401
+from app.database import engine, SessionLocal, init_db  # noqa: E402
+from app.models import Item  # noqa: E402
+from app.services.search_service import search_service  # noqa: E402
+
+# Search text -> name of the item it must find
+EXPECTED = {
+    "kjøkken": "Kettle",
+    "kjøk": "Kettle",
+    "garage": "Drill",
+    "bad": "Mirror",
+    "bäd": "Mirror",
+    "Spülmaschine": "Dishwasher",
+    "spulmaschine": "Dishwasher",
+}
+
+
+def populate() -> None:
+    """Insert tagged items. One row gets escaped tags, as written before the fix."""
+    init_db()
+
+    db = SessionLocal()
+    try:
+        db.add_all([
+            Item(name="Kettle", tags=["kjøkken", "elektrisk"]),
+            Item(name="Drill", tags=["garage"]),
+            Item(name="Dishwasher", tags=["Spülmaschine"]),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO items (id, name, tags, quantity, currency) VALUES (:id, 'Mirror', :tags, 1, 'NOK')"),
+            {"id": str(uuid.uuid4()), "tags": '["b\\u00e4d"]'}
+        )
+
+
+def main() -> None:
+    populate()
+    # Second start: migrates the escaped row and checks the index
+    init_db()
+
+    if not search_service.available:
+        print("SQLite was built without FTS5; nothing to check")
+        return
+
+    failed = False
+    db = SessionLocal()
+    try:
+        for search, expected in EXPECTED.items():
+            names = [item.name for item in search_service.apply_search(db.query(Item), search)]
+            ok = expected in names
+            failed |= not ok
+            print(f"{search:>14}: {', '.join(names) or '-':<20} {'ok' if ok else 'FAIL'}")
+    finally:
+        db.close()
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Reassemble a backup into a complete SQLite database.
+
+Full backups are copied (decompressed if .gz/.zst); differential backups
+(.diff) are applied on top of the full backup they were taken against, which
+must be in the same directory. Run from the backend directory:
+
+    python -m scripts.restore_backup /data/backups/homeregistry_backup_20240101_120000.diff restored.db
+
+Stop the application before copying the result over the live database.
+"""
+import argparse
+import os
+import sqlite3
+
+from app.utils.compression import strip_compression_suffix, decompress_file
+from app.utils.page_diff import read_diff_header, apply_page_diff
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("backup", help="Full (.db) or differential (.diff) backup file, optionally .gz/.zst")
+    parser.add_argument("output", help="Path of the database to write")
+    args = parser.parse_args()
+
+    if strip_compression_suffix(args.backup).endswith(".diff"):
+        header = read_diff_header(args.backup)
+        base_path = os.path.join(os.path.dirname(os.path.abspath(args.backup)), header["base"])
+        if not os.path.exists(base_path):
+            parser.error(f"Base backup not found: {base_path}")
+        apply_page_diff(base_path, args.backup, args.output)
+        print(f"Applied {os.path.basename(args.backup)} to {header['base']}")
+    else:
+        decompress_file(args.backup, args.output)
+
+    conn = sqlite3.connect(args.output)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    print(f"Wrote {args.output} (integrity check: {result})")
+
+
+if __name__ == "__main__":
+    main()
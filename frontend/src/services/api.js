@@ -164,6 +164,31 @@ export default {
     })
   },
 
+  submitAnalysisJobs(files, mode = 'single') {
+    const formData = new FormData()
+    files.forEach(file => {
+      formData.append('files', file)
+    })
+    formData.append('mode', mode)
+    return api.post('/analysis-jobs', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data'
+      }
+    })
+  },
+
+  getAnalysisJobs(params = {}) {
+    return api.get('/analysis-jobs', { params })
+  },
+
+  getAnalysisJob(jobId, wait = 0) {
+    return api.get(`/analysis-jobs/${jobId}`, { params: { wait } })
+  },
+
+  deleteAnalysisJob(jobId) {
+    return api.delete(`/analysis-jobs/${jobId}`)
+  },
+
   addItemImage(itemId, file) {
     const formData = new FormData()
     formData.append('file', file)
@@ -183,7 +208,10 @@ export default {
     return api.put(`/images/${id}/primary`)
   },
 
-  getImageUrl(id, thumbnail = false) {
+  getImageUrl(id, thumbnail = false, width = null) {
+    if (width) {
+      return `${API_BASE}/images/${id}/file?w=${width}`
+    }
     return `${API_BASE}/images/${id}/file${thumbnail ? '?thumbnail=true' : ''}`
   },
 
@@ -261,6 +289,22 @@ export default {
     return `${API_BASE}/reports/insurance/${propertyId}`
   },
 
+  createInsuranceReportJob(propertyId) {
+    return api.post(`/reports/insurance/${propertyId}/jobs`)
+  },
+
+  getReportJob(jobId, wait = 0) {
+    return api.get(`/reports/jobs/${jobId}`, { params: { wait } })
+  },
+
+  getReportJobDownloadUrl(jobId) {
+    return `${API_BASE}/reports/jobs/${jobId}/download`
+  },
+
+  deleteReportJob(jobId) {
+    return api.delete(`/reports/jobs/${jobId}`)
+  },
+
   // Public (no auth required)
   getPublicItem(id) {
     return api.get(`/public/items/${id}`)